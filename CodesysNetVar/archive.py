@@ -0,0 +1,193 @@
+import bisect
+import datetime
+import mmap
+import socket
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple
+
+from loguru import logger
+
+from network.server import QueueMessage
+from settings.settings import settings
+from utils.statistics import statistic, Counter
+
+MAGIC = b"CNVARCH1"
+SEGMENT_HEADER = struct.Struct("<8sQ")  # magic, used bytes of segment
+RECORD_HEADER = struct.Struct("<q4sHHI")  # receive time in ns from epoch, IPv4, port, list ID, length of payload
+INDEX_ENTRY = struct.Struct("<qQ")  # receive time in ns from epoch, offset of record
+SEGMENT_SUFFIX = ".nvla"
+INDEX_SUFFIX = ".idx"
+
+
+class ArchivedFrame(NamedTuple):
+    ts_ns: int
+    client: tuple[str, int]
+    list_id: int
+    payload: memoryview
+
+    @property
+    def ts(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.ts_ns / 1e9)
+
+
+def _to_ns(ts: datetime.datetime) -> int:
+    return round(ts.timestamp() * 1e9)
+
+
+class FrameArchive:
+    def __init__(self, directory: Path, segment_bytes: int = 64 << 20, index_interval_ms: int = 1000) -> None:
+        """
+        append-only archive of raw datagrams in memory-mapped segment files of fixed size.
+        Every segment has the index file: time and offset of a record not more often than index_interval_ms
+        :param directory: directory for segment files
+        :param segment_bytes: size of one segment, the sealed segment is cut to its used size
+        :param index_interval_ms: period of index entries
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.index_interval_ns = index_interval_ms * 1_000_000
+        segments = sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+        self.number = int(segments[-1].stem) + 1 if segments else 0
+        self.path: Path | None = None
+        self.mm: mmap.mmap | None = None
+        self.index_file: BinaryIO | None = None
+        self.offset = 0
+        self.last_index_ns = 0
+        self.frames: Counter = statistic.counter("archive/frames", "Archive: frames written")
+        self.bytes: Counter = statistic.counter("archive/bytes", "Archive: bytes written")
+
+    def _new_segment(self, min_size: int) -> tuple[mmap.mmap, BinaryIO]:
+        self.seal()
+        self.path = self.directory.joinpath(f"{self.number:012d}{SEGMENT_SUFFIX}")
+        self.number += 1
+        size = max(self.segment_bytes, SEGMENT_HEADER.size + min_size)
+        with open(self.path, "w+b") as f:
+            f.truncate(size)
+            mm = self.mm = mmap.mmap(f.fileno(), size)
+        self.offset = SEGMENT_HEADER.size
+        SEGMENT_HEADER.pack_into(mm, 0, MAGIC, self.offset)
+        index_file = self.index_file = open(self.path.with_suffix(INDEX_SUFFIX), "wb")
+        self.last_index_ns = 0
+        return mm, index_file
+
+    def append(self, qm: QueueMessage) -> None:
+        """
+        :param qm: datagram with receive time and address of sender
+        """
+        ts_ns = _to_ns(qm.ts)
+        size = RECORD_HEADER.size + len(qm.message)
+        mm, index_file = self.mm, self.index_file
+        if mm is None or index_file is None or self.offset + size > len(mm):
+            mm, index_file = self._new_segment(size)
+        list_id = int.from_bytes(qm.message[8:10], "little") if len(qm.message) >= 10 else 0
+        RECORD_HEADER.pack_into(mm, self.offset, ts_ns, socket.inet_aton(qm.client[0]), qm.client[1],
+                                list_id, len(qm.message))
+        mm[self.offset + RECORD_HEADER.size: self.offset + size] = qm.message
+        if ts_ns - self.last_index_ns >= self.index_interval_ns:
+            index_file.write(INDEX_ENTRY.pack(ts_ns, self.offset))
+            index_file.flush()
+            self.last_index_ns = ts_ns
+        self.offset += size
+        SEGMENT_HEADER.pack_into(mm, 0, MAGIC, self.offset)  # the record is visible for readers
+        self.frames.value += 1
+        self.bytes.value += size
+
+    def seal(self) -> None:
+        """
+        close the current segment and cut it to the used size
+        """
+        if self.mm is None or self.index_file is None or self.path is None:
+            return
+        self.mm.flush()
+        self.mm.close()
+        self.index_file.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.offset)
+        self.mm = self.index_file = None
+
+    def close(self) -> None:
+        self.seal()
+
+
+class ArchiveReader:
+    def __init__(self, directory: Path) -> None:
+        """
+        read frames of the archive, also of the segment which is written now.
+        The payloads are memoryview of mapped segments, they are valid until close()
+        :param directory: directory of the archive
+        """
+        self.directory = Path(directory)
+        self.mms: list[mmap.mmap] = []
+
+    def segments(self) -> list[Path]:
+        return sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+
+    @staticmethod
+    def read_index(segment: Path) -> list[tuple[int, int]]:
+        path = segment.with_suffix(INDEX_SUFFIX)
+        if not path.exists():
+            return []
+        data = path.read_bytes()
+        return list(INDEX_ENTRY.iter_unpack(data[: len(data) - len(data) % INDEX_ENTRY.size]))
+
+    def frames(self, start: datetime.datetime | None = None,
+               end: datetime.datetime | None = None) -> Iterator[ArchivedFrame]:
+        """
+        frames with start <= receive time < end, in order of receiving
+        :param start: None - from the first frame
+        :param end: None - till the last frame
+        """
+        start_ns = _to_ns(start) if start else None
+        end_ns = _to_ns(end) if end else None
+        segments = self.segments()
+        indexes = [self.read_index(segment) for segment in segments]
+        for i, (segment, index) in enumerate(zip(segments, indexes)):
+            if end_ns is not None and index and index[0][0] >= end_ns:
+                break
+            next_index = indexes[i + 1] if i + 1 < len(indexes) else []
+            if start_ns is not None and next_index and next_index[0][0] < start_ns:
+                continue  # all frames of the segment are before start
+            yield from self._segment_frames(segment, index, start_ns, end_ns)
+
+    def _segment_frames(self, segment: Path, index: list[tuple[int, int]],
+                        start_ns: int | None, end_ns: int | None) -> Iterator[ArchivedFrame]:
+        if segment.stat().st_size < SEGMENT_HEADER.size:
+            return
+        with open(segment, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mms.append(mm)
+        magic, used = SEGMENT_HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            logger.warning(f"{segment.name} is not a segment of archive")
+            return
+        offset = SEGMENT_HEADER.size
+        if start_ns is not None and index:
+            position = bisect.bisect_right(index, (start_ns, 0)) - 1
+            if position >= 0:
+                offset = index[position][1]
+        view = memoryview(mm)
+        while offset + RECORD_HEADER.size <= used:
+            ts_ns, ip, port, list_id, length = RECORD_HEADER.unpack_from(mm, offset)
+            payload_offset = offset + RECORD_HEADER.size
+            offset = payload_offset + length
+            if start_ns is not None and ts_ns < start_ns:
+                continue
+            if end_ns is not None and ts_ns >= end_ns:
+                return
+            yield ArchivedFrame(ts_ns, (socket.inet_ntoa(ip), port), list_id, view[payload_offset: offset])
+
+    def close(self) -> None:
+        for mm in self.mms:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # a payload is still used, the map is closed by garbage collector
+        self.mms.clear()
+
+
+def create_archive() -> FrameArchive | None:
+    if settings.archive.mode == "off":
+        return None
+    return FrameArchive(settings.archive.path, settings.archive.segment_mb << 20, settings.archive.index_interval_ms)
@@ -0,0 +1,128 @@
+"""
+Rows, size of SQLite file and CPU time of a replayed capture with every frame stored, with change-only
+persistence and with deadbands.
+
+Run from the CodesysNetVar directory:
+    python -m benchmarks.bench_change_filter --frames 20000 --variables 100
+    python -m benchmarks.bench_change_filter --archive archive/ --gvl external/exp.gvl --deadband "1%"
+
+Without --archive a capture is recorded first (100 ms between frames): the discrete variables change with
+probability --change-rate per frame, every --analog-every REAL/LREAL is an analog signal with noise, the others
+are set points. The deadband is applied to every REAL/LREAL variable.
+"""
+import argparse
+import datetime
+import math
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import create_engine, MetaData
+
+from archive import FrameArchive, ArchiveReader
+from benchmarks.conftest import create_options
+from codesys.data_types import CReal
+from codesys.frame_decoder import FrameDecoder
+from codesys.nvl_parser import NvlOptions, NvlParser
+from data_packer import DataPacker
+from db_connector import create_table, BatchWriter
+from loadgen import CONSTANT
+from network.parser import HEADER, Rcv
+from network.server import QueueMessage
+from persistence import persistence
+from settings.settings import settings
+
+
+def record_capture(directory: Path, options: NvlOptions, n_frames: int, change_rate: float,
+                   analog_every: int) -> None:
+    declaration = DataPacker.generate_instance_datatype(options.declarations)
+    packer = FrameDecoder(declaration).struct
+    rnd = random.Random(1)
+    formats = [c_type.struct_format for c_type in declaration]
+    values: list = [bytes(int(f[:-1])) if f.endswith("s") else False if f == "?" else 0 for f in formats]
+    archive = FrameArchive(directory)
+    start = datetime.datetime(2023, 1, 1)
+    for n in range(n_frames):
+        for i, (c_type, fmt) in enumerate(zip(declaration, formats)):
+            if isinstance(c_type, CReal) and analog_every and i % analog_every == 0:  # analog signal
+                values[i] = 50 + 20 * math.sin(n / 3000 + i) + rnd.gauss(0, 0.05)
+            elif rnd.random() < change_rate:
+                if fmt.endswith("s"):
+                    values[i] = rnd.randbytes(int(fmt[:-1]))
+                else:
+                    values[i] = not values[i] if fmt == "?" else rnd.randrange(1000)
+        body = packer.pack(*values)
+        message = HEADER.pack(CONSTANT, options.list_id, 0, len(declaration), HEADER.size + len(body), n) + body
+        archive.append(QueueMessage(client=("10.0.0.1", 1202), message=message,
+                                    ts=start + datetime.timedelta(milliseconds=100 * n)))
+    archive.close()
+
+
+def replay(reader: ArchiveReader, options: NvlOptions, db_path: Path) -> tuple[int, float, float]:
+    """
+    :return: rows, CPU seconds of decoding and filtering, CPU seconds of writing to DB
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+    declaration = DataPacker.generate_instance_datatype(options.declarations)
+    writer = BatchWriter(create_table(options.list_id, declaration, MetaData(bind=engine)), engine, 100, 60_000)
+    data_packer = DataPacker(options, db_writer=writer)
+    persistence.mq.maxsize = 0  # the rows are written after the replay, not by the thread of persistence
+    start = time.process_time()
+    for frame in reader.frames():
+        data_packer.put_data(Rcv(bytes(frame.payload), frame.client, ts=frame.ts))
+    decode_time = time.process_time() - start
+    rows = persistence.mq.qsize()
+    start = time.process_time()
+    while not persistence.mq.empty():
+        sink, row = persistence.mq.get_nowait()
+        sink.add(row)
+    writer.flush()
+    engine.dispose()
+    return rows, decode_time, time.process_time() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--archive", type=Path, help="capture of CNV_ARCHIVE___MODE, recorded if not set")
+    parser.add_argument("--gvl", type=Path, help="NVL config of the capture")
+    parser.add_argument("--frames", type=int, default=20_000)
+    parser.add_argument("--variables", type=int, default=100)
+    parser.add_argument("--change-rate", type=float, default=0.005)
+    parser.add_argument("--analog-every", type=int, default=2, help="every N-th REAL/LREAL is analog, 0 - none")
+    parser.add_argument("--deadband", default="1%", help="absolute value or percentage")
+    parser.add_argument("--heartbeat-ms", type=int, default=60_000)
+    args = parser.parse_args()
+    logger.remove()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.archive:
+            options, directory = NvlParser(args.gvl).parse(), args.archive
+        else:
+            options, directory = create_options(args.variables), Path(tmp) / "archive"
+            record_capture(directory, options, args.frames, args.change_rate, args.analog_every)
+        reals = [c_type.name for c_type in DataPacker.generate_instance_datatype(options.declarations)
+                 if isinstance(c_type, CReal)]
+        modes = {
+            "every frame": (False, {}),
+            "change only": (True, {}),
+            f"deadband {args.deadband}": (True, {f"{options.list_id}/{name}": args.deadband for name in reals}),
+        }
+        settings.storage.heartbeat_ms = args.heartbeat_ms
+        reader = ArchiveReader(directory)
+        baseline = None
+        for n, (mode, (change_only, deadbands)) in enumerate(modes.items()):
+            settings.storage.change_only, settings.storage.deadbands = change_only, deadbands
+            db_path = Path(tmp) / f"{n}.sqlite"
+            rows, decode_time, write_time = replay(reader, options, db_path)
+            size = db_path.stat().st_size
+            baseline = baseline or (rows, size, decode_time + write_time)
+            print(f"{mode:>16}: {rows:>7} rows ({rows / baseline[0]:6.1%}), {size / 1e6:8.2f} MB "
+                  f"({size / baseline[1]:6.1%}), CPU decode {decode_time:6.2f} s + DB {write_time:6.2f} s "
+                  f"({(decode_time + write_time) / baseline[2]:6.1%})")
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Memory and CPU of Codesys type objects for a large declaration.
+
+Run from the CodesysNetVar directory:
+    python -m benchmarks.bench_ctypes --variables 10000
+"""
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from loguru import logger
+
+from codesys.data_types import CBool, CInt, CReal, CTime, CArray, CTypeDeclaration
+from codesys.frame_decoder import FrameDecoder
+
+TYPES = (CReal, CInt, CBool, CTime)
+
+
+def create_declaration(n_variables: int) -> CTypeDeclaration:
+    declaration = CTypeDeclaration()
+    for i in range(n_variables):
+        declaration.append(TYPES[i % len(TYPES)](f"var_{i}"))
+    return declaration
+
+
+def measure_memory(n_variables: int) -> int:
+    tracemalloc.start()
+    declaration = create_declaration(n_variables)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del declaration
+    return size
+
+
+def decode_legacy(declaration: CTypeDeclaration, data: bytes) -> None:
+    ts = datetime.datetime.now()  # one timestamp per frame
+    start = 0
+    for c_type in declaration:
+        c_type.put(data[start: start + c_type.size], ts)
+        start += c_type.size
+
+
+def measure_cpu(n_variables: int, n_frames: int) -> tuple[float, float]:
+    declaration = create_declaration(n_variables)
+    data = bytes(sum(c_type.size for c_type in declaration))
+    start = time.process_time()
+    for _ in range(n_frames):
+        decode_legacy(declaration, data)
+    legacy = (time.process_time() - start) / n_frames
+    decoder = FrameDecoder(declaration)
+    start = time.process_time()
+    for _ in range(n_frames):
+        decoder.decode(data, datetime.datetime.now())
+    compiled = (time.process_time() - start) / n_frames
+    return legacy, compiled
+
+
+def measure_array(count: int, n_frames: int) -> tuple[int, float, float]:
+    tracemalloc.start()
+    c_array = CArray("array", CReal("_"), count)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    data = bytes(c_array.size)
+    ts = datetime.datetime.now()
+    start = time.process_time()
+    for _ in range(n_frames):
+        c_array.put(data, ts)
+    put = (time.process_time() - start) / n_frames
+    start = time.process_time()
+    for _ in range(n_frames):
+        c_array.put(data, ts)
+        c_array.value  # noqa
+    put_and_read = (time.process_time() - start) / n_frames
+    return memory, put, put_and_read
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variables", type=int, default=10_000)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--array", type=int, default=10_000, help="count of elements of ARRAY OF REAL")
+    args = parser.parse_args()
+    logger.remove()
+
+    memory = measure_memory(args.variables)
+    legacy, compiled = measure_cpu(args.variables, args.frames)
+    print(f"{args.variables} variables")
+    print(f"memory of objects      : {memory / 1024:.0f} KiB ({memory / args.variables:.0f} B/variable)")
+    print(f"put() per frame        : {legacy * 1e3:.2f} ms")
+    print(f"FrameDecoder per frame : {compiled * 1e3:.2f} ms")
+
+    memory, put, put_and_read = measure_array(args.array, args.frames)
+    print(f"ARRAY[0..{args.array - 1}] OF REAL")
+    print(f"memory of objects      : {memory / 1024:.0f} KiB")
+    print(f"put() per frame        : {put * 1e3:.3f} ms")
+    print(f"put() and value        : {put_and_read * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Rows per second of the per-row ORM commit and of BatchWriter on SQLite file.
+
+Run from the CodesysNetVar directory:
+    python -m benchmarks.bench_db_writer --rows 2000 --variables 50
+"""
+import argparse
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+from sqlalchemy import create_engine, MetaData
+from sqlalchemy.orm import mapper, Session
+
+from codesys.data_types import CReal, CInt, CBool, CTypeDeclaration
+from db_connector import create_table, BatchWriter, Row
+
+TYPES = (CReal, CInt, CBool)
+
+
+def create_declaration(n_variables: int) -> CTypeDeclaration:
+    declaration = CTypeDeclaration()
+    for i in range(n_variables):
+        declaration.append(TYPES[i % len(TYPES)](f"var_{i}"))
+    return declaration
+
+
+def create_row(declaration: CTypeDeclaration, i: int) -> Row:
+    row: Row = {"ts": datetime.datetime.now()}
+    for c_type in declaration:
+        row[c_type.name] = i % 2 == 0 if isinstance(c_type, CBool) else i
+    return row
+
+
+def measure_per_row(path: Path, declaration: CTypeDeclaration, n_rows: int) -> float:
+    engine = create_engine(f"sqlite:///{path}")
+
+    class Record:
+        pass
+
+    mapper(Record, create_table(1, declaration, MetaData(bind=engine)))
+    session = Session(bind=engine)
+    start = time.perf_counter()
+    for i in range(n_rows):
+        record = Record()
+        for name, value in create_row(declaration, i).items():
+            setattr(record, name, value)
+        session.add(record)
+        session.commit()
+    return n_rows / (time.perf_counter() - start)
+
+
+def measure_batch(path: Path, declaration: CTypeDeclaration, n_rows: int, batch_size: int) -> float:
+    engine = create_engine(f"sqlite:///{path}")
+    writer = BatchWriter(create_table(1, declaration, MetaData(bind=engine)), engine, batch_size, 1000)
+    start = time.perf_counter()
+    for i in range(n_rows):
+        writer.add(create_row(declaration, i))
+    writer.close()
+    return n_rows / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--variables", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    logger.remove()
+
+    declaration = create_declaration(args.variables)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.rows} rows of {args.variables} variables, SQLite file")
+        rate = measure_per_row(Path(directory, "per_row.sqlite"), declaration, args.rows)
+        print(f"{'per-row commit':<20}: {rate:>10.0f} rows/s")
+        for batch_size in args.batch_sizes:
+            rate = measure_batch(Path(directory, f"batch_{batch_size}.sqlite"), declaration, args.rows, batch_size)
+            print(f"{f'batch of {batch_size}':<20}: {rate:>10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
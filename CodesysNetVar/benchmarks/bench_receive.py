@@ -0,0 +1,111 @@
+"""
+Loopback benchmark of the UDP receive modes.
+
+Run from the CodesysNetVar directory:
+    python -m benchmarks.bench_receive --packets 200000 --senders 4
+
+A sender process blasts datagrams to 127.0.0.1, this process receives them with the chosen server
+and drains the queue the same way Main does. CPU time is process time of the receiving process.
+"""
+import argparse
+import multiprocessing
+import queue
+import socket
+import threading
+import time
+from typing import Callable
+
+from loguru import logger
+
+from network.server import get_udp_thread_server, get_udp_asyncio_server, BatchUdpReceiver
+
+SERVERS: dict[str, Callable[..., threading.Thread | BatchUdpReceiver]] = {
+    "thread": get_udp_thread_server,
+    "asyncio": get_udp_asyncio_server,
+    "batch": BatchUdpReceiver,
+    "batch-x4": lambda mq, address: BatchUdpReceiver(mq, address, workers=4),
+}
+IDLE_TIMEOUT = 1.0
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def sender(address: tuple[str, int], n_packets: int, size: int, rate: int) -> None:
+    packet = bytes(size)
+    pause = 1 / rate if rate else 0.0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        next_send = time.perf_counter()
+        for _ in range(n_packets):
+            sock.sendto(packet, address)
+            if pause:
+                next_send += pause
+                while time.perf_counter() < next_send:
+                    pass
+
+
+def consume(mq: queue.Queue, result: dict[str, float]) -> None:
+    received = 0
+    while True:
+        try:
+            mq.get(timeout=IDLE_TIMEOUT)
+        except queue.Empty:
+            break
+        received += 1
+        result["last"] = time.perf_counter()
+        mq.task_done()
+    result["received"] = received
+
+
+def run(mode: str, n_packets: int, size: int, rate: int, queue_size: int, senders: int) -> dict[str, float]:
+    address = ("127.0.0.1", get_free_port())
+    mq: queue.Queue = queue.Queue(queue_size)
+    SERVERS[mode](mq, address).start()
+    time.sleep(0.2)
+    result: dict[str, float] = {"received": 0, "last": 0.0}
+    consumer = threading.Thread(target=consume, args=(mq, result))
+    consumer.start()
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    procs = [multiprocessing.Process(target=sender, args=(address, n_packets // senders, size, rate // senders))
+             for _ in range(senders)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    consumer.join()
+    cpu = time.process_time() - cpu_start
+    elapsed = (result["last"] or time.perf_counter()) - start
+    received = result["received"]
+    return {
+        "sent": n_packets // senders * senders,
+        "received": received,
+        "packets/s": received / elapsed if elapsed > 0 else 0.0,
+        "cpu us/packet": cpu / received * 1e6 if received else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=100_000)
+    parser.add_argument("--size", type=int, default=120, help="datagram size in bytes")
+    parser.add_argument("--rate", type=int, default=0, help="packets/s of the sender, 0 - as fast as possible")
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--senders", type=int, default=1, help="count of sender processes (source ports)")
+    parser.add_argument("--modes", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+    logger.remove()
+
+    print(f"{'mode':<10}| {'sent':>9} | {'received':>9} | {'packets/s':>10} | {'cpu us/packet':>13}")
+    for mode in args.modes:
+        res = run(mode, args.packets, args.size, args.rate, args.queue_size, args.senders)
+        print(f"{mode:<10}| {res['sent']:>9} | {res['received']:>9} | {res['packets/s']:>10.0f} | "
+              f"{res['cpu us/packet']:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
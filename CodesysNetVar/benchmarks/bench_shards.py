@@ -0,0 +1,85 @@
+"""
+Decoded packets per second of one process and of ShardPool with 1..N worker processes.
+
+Run from the CodesysNetVar directory:
+    python -m benchmarks.bench_shards --variables 100 --sources 64 --packets 50000 --processes 1 2 4 8
+
+The datagrams are generated in memory (loadgen), so the numbers do not include the socket. The dispatcher cost is
+the time of the main process per datagram: ShardPool scales until the workers together are faster than it.
+"""
+import argparse
+import os
+import time
+
+from loguru import logger
+
+from benchmarks.conftest import create_options
+from dispatch import Dispatcher, NvlTemplate
+from loadgen import NvlTraffic, source_address
+from network.server import QueueMessage
+from shard import ShardPool
+
+
+def create_messages(n_variables: int, n_sources: int, n_packets: int) -> list[QueueMessage]:
+    traffic = NvlTraffic(create_options(n_variables))
+    messages = []
+    while len(messages) < n_packets:
+        packet = traffic.next_frame()[0]
+        messages.extend(QueueMessage(client=(source_address(k), 1202), message=packet) for k in range(n_sources))
+    return messages[:n_packets]
+
+
+def measure_single(n_variables: int, messages: list[QueueMessage]) -> float:
+    options = create_options(n_variables)
+    dispatcher = Dispatcher({options.list_id: NvlTemplate(options, per_source=True, max_sources=len(messages))})
+    start = time.perf_counter()
+    for data in messages:
+        dispatcher.process(data)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def measure_pool(n_variables: int, messages: list[QueueMessage], processes: int) -> tuple[float, float]:
+    """
+    :return: packets per second, seconds of the dispatcher per packet
+    """
+    options = create_options(n_variables)
+    pool = ShardPool([(options, True)], processes, ring_bytes=1 << 24, max_sources=len(messages))
+    pool.start()
+    try:
+        dispatch_time = 0.0
+        start = time.perf_counter()
+        for data in messages:
+            t = time.perf_counter()
+            pool.process(data)
+            dispatch_time += time.perf_counter() - t
+            while pool.dropped.value:  # the ring is full, the benchmark waits instead of dropping
+                pool.dropped.value = 0
+                time.sleep(0.0001)
+                pool.process(data)
+        while pool.processed() < len(messages):
+            time.sleep(0.0001)
+        return len(messages) / (time.perf_counter() - start), dispatch_time / len(messages)
+    finally:
+        pool.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variables", type=int, default=100)
+    parser.add_argument("--sources", type=int, default=64, help="PLCs with the same list, pairs of sharding")
+    parser.add_argument("--packets", type=int, default=50_000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    logger.remove()
+
+    messages = create_messages(args.variables, args.sources, args.packets)
+    print(f"{args.packets} packets of {args.variables} variables from {args.sources} sources, "
+          f"{os.cpu_count()} CPUs")
+    print(f"one process: {measure_single(args.variables, messages):,.0f} packets/s")
+    for processes in args.processes:
+        rate, dispatch = measure_pool(args.variables, messages, processes)
+        print(f"{processes} workers: {rate:,.0f} packets/s, dispatcher {dispatch * 1e6:.2f} us/packet")
+
+
+if __name__ == "__main__":
+    main()
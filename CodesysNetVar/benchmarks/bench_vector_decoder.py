@@ -0,0 +1,68 @@
+"""
+Benchmark of the NumPy batch decoder against the per-object decoding of packed frames.
+
+Run from the CodesysNetVar directory:
+    python -m benchmarks.bench_vector_decoder --frames 1000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from loguru import logger
+
+from codesys.data_types import CReal, CWord, CInt, CTime, CDate, CString, CArray, CTypeDeclaration
+from codesys.frame_decoder import FrameDecoder
+from codesys.vector_decoder import VectorDecoder
+
+
+def create_declaration() -> CTypeDeclaration:
+    # the same as external/exp.gvl
+    declaration = CTypeDeclaration()
+    for c_type in (CReal("sinus"), CReal("cosine"), CWord("some_word"), CInt("integer"), CTime("my_time"),
+                   CDate("my_date"), CString("my_string20", 20), CArray("my_array", CInt("_"), 5)):
+        declaration.append(c_type)
+    return declaration
+
+
+def create_frames(frame_size: int, count: int) -> bytes:
+    frame = bytearray(random.randbytes(frame_size))
+    frame[12:16] = (12345678).to_bytes(4, "little")  # valid TIME
+    frame[20:41] = b"some string".ljust(21, b"\x00")
+    return bytes(frame) * count
+
+
+def bench_per_object(frames: bytes, frame_size: int) -> float:
+    decoder = FrameDecoder(create_declaration())
+    view = memoryview(frames)
+    start = time.perf_counter()
+    for offset in range(0, len(frames), frame_size):
+        decoder.decode(view[offset: offset + frame_size])
+    return time.perf_counter() - start
+
+
+def bench_vector(frames: bytes) -> float:
+    decoder = VectorDecoder(create_declaration())
+    start = time.perf_counter()
+    decoder.decode(frames)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    logger.remove()
+
+    frame_size = FrameDecoder(create_declaration()).size
+    print(f"{'frames':>9} | {'per-object, s':>13} | {'vector, s':>9} | {'frames/s per-object':>19} | "
+          f"{'frames/s vector':>15}")
+    for count in args.frames:
+        frames = create_frames(frame_size, count)
+        per_object = bench_per_object(frames, frame_size)
+        vector = bench_vector(frames)
+        print(f"{count:>9} | {per_object:>13.4f} | {vector:>9.4f} | {count / per_object:>19.0f} | "
+              f"{count / vector:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
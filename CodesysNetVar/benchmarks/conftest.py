@@ -0,0 +1,74 @@
+"""
+Benchmark suite of the pipeline: receive, parse, decode and persist (pytest-benchmark).
+
+Run from the CodesysNetVar directory:
+    python -m pytest benchmarks --benchmark-json=benchmark.json
+    python -m pytest benchmarks --benchmark-autosave            # saved to .benchmarks/ with commit id
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+The declarations have from 10 to 5000 variables of mixed types.
+"""
+import socket
+from pathlib import Path
+
+import pytest
+from loguru import logger
+
+from codesys.nvl_parser import NvlOptions, NvlDeclarations
+from loadgen import NvlTraffic
+
+SIZES = [10, 100, 1000, 5000]
+TYPES = ["REAL", "INT", "BOOL", "DINT", "TIME", "LREAL", "WORD", "UDINT"]
+
+GVL_TEMPLATE = """<GVL>
+  <Declarations><![CDATA[VAR_GLOBAL
+{declarations}
+END_VAR]]></Declarations>
+  <NetvarSettings Protocol="UDP">
+    <ListIdentifier>{list_id}</ListIdentifier>
+    <Pack>{pack}</Pack>
+    <Checksum>False</Checksum>
+    <Acknowledge>False</Acknowledge>
+    <ProtocolSettings>
+      <ProtocolSetting Name="Broadcast Adr." Value="{ip}" />
+      <ProtocolSetting Name="Port" Value="{port}" />
+    </ProtocolSettings>
+  </NetvarSettings>
+</GVL>"""
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    logger.remove()
+
+
+def create_declarations(n_variables: int) -> list[NvlDeclarations]:
+    return [NvlDeclarations(name=f"var_{i}", type=[TYPES[i % len(TYPES)]]) for i in range(n_variables)]
+
+
+def create_options(n_variables: int, pack: bool = True, list_id: int = 1, port: int = 1202) -> NvlOptions:
+    return NvlOptions(declarations=create_declarations(n_variables), list_id=list_id, pack=pack, checksum=False,
+                      acknowledge=False, ip_address="127.0.0.1", port=port)
+
+
+def write_gvl(path: Path, options: NvlOptions) -> Path:
+    declarations = "\n".join(f"\t{d['name']} : {' OF '.join(d['type'])};" for d in options.declarations)
+    path.write_text(GVL_TEMPLATE.format(declarations=declarations, list_id=options.list_id, pack=options.pack,
+                                        ip=options.ip_address, port=options.port))
+    return path
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}vars")
+def n_variables(request: pytest.FixtureRequest) -> int:
+    return request.param
+
+
+@pytest.fixture
+def packed_traffic(n_variables: int) -> tuple[NvlOptions, NvlTraffic]:
+    options = create_options(n_variables)
+    return options, NvlTraffic(options)
@@ -0,0 +1,27 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, MetaData
+
+from data_packer import DataPacker
+from db_connector import create_table, BatchWriter
+from benchmarks.conftest import create_options
+
+ROWS = 100
+
+
+@pytest.mark.parametrize("n_columns", [10, 100, 1000], ids=lambda n: f"{n}vars")  # SQLite has max 2000 columns
+@pytest.mark.parametrize("batch_size", [1, 100], ids=lambda n: f"batch{n}")
+def test_sqlite_write(benchmark, tmp_path, n_columns, batch_size):
+    declaration = DataPacker.generate_instance_datatype(create_options(n_columns).declarations)
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    writer = BatchWriter(create_table(1, declaration, MetaData(bind=engine)), engine, batch_size, 60_000)
+    row = {"ts": datetime.datetime.now(), **{c_type.name: None for c_type in declaration}}
+
+    def write_rows() -> None:
+        for _ in range(ROWS):
+            writer.add(row)
+        writer.flush()
+
+    benchmark.extra_info["rows"] = ROWS
+    benchmark.pedantic(write_rows, rounds=5, iterations=1)
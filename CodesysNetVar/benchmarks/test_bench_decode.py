@@ -0,0 +1,63 @@
+import datetime
+
+import pytest
+
+from codesys.data_types import CArray, CReal, CInt
+from data_packer import DataPacker
+from network.parser import Rcv
+from settings.settings import settings
+from utils.statistics import Statistics
+from benchmarks.conftest import create_options, SIZES
+from loadgen import NvlTraffic
+
+CLIENT = ("127.0.0.1", 1202)
+
+
+def test_rcv_parse(benchmark, packed_traffic):
+    _, traffic = packed_traffic
+    packet = traffic.next_frame()[0]
+    rcv = benchmark(Rcv, packet, CLIENT)
+    assert rcv.count_bytes == len(packet)
+
+
+@pytest.mark.parametrize("compiled", [True, False], ids=["compiled", "per_variable"])
+def test_put_data_packed(benchmark, monkeypatch, packed_traffic, compiled):
+    monkeypatch.setattr(settings.nvl, "compiled_decoder", compiled)
+    options, traffic = packed_traffic
+    data_packer = DataPacker(options)
+    rcv = Rcv(traffic.next_frame()[0], CLIENT)
+    benchmark(data_packer.put_data, rcv)
+    assert data_packer.c_types_declarations[0].value is not None
+
+
+def test_put_data_unpacked(benchmark, n_variables):
+    options = create_options(n_variables, pack=False)
+    data_packer = DataPacker(options)
+    traffic = NvlTraffic(options)
+
+    def put_frame() -> None:
+        for packet in traffic.next_frame():  # n_sends is new for every frame
+            data_packer.put_data(Rcv(packet, CLIENT))
+
+    benchmark(put_frame)
+    assert data_packer.frame_assembler.completed.value > 0
+
+
+@pytest.mark.parametrize("c_type", [CReal, CInt], ids=["REAL", "INT"])
+def test_c_array_put(benchmark, n_variables, c_type):
+    c_array = CArray("array", c_type("_"), n_variables)
+    data = bytes(c_array.size)
+    ts = datetime.datetime.now()
+    benchmark(c_array.put, data, ts)
+    assert len(c_array.value) == n_variables
+
+
+@pytest.mark.parametrize("timed", [False, True], ids=["bare", "timer"])
+def test_statistics_timer(benchmark, timed):
+    statistic = Statistics()
+
+    def noop() -> None:
+        pass
+
+    func = statistic.timer("noop")(noop) if timed else noop
+    benchmark(func)
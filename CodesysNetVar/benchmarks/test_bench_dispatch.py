@@ -0,0 +1,106 @@
+import itertools
+import queue
+import threading
+import time
+
+import pytest
+
+from codesys.nvl_parser import NvlParser
+from dispatch import Dispatcher, NvlTemplate
+from loadgen import NvlTraffic, generate, source_address
+from network.parser import Rcv
+from settings.settings import settings
+from benchmarks.conftest import create_options, write_gvl, get_free_port
+
+SOURCES = [1, 1000]
+
+
+@pytest.fixture(params=SOURCES, ids=lambda n: f"{n}sources")
+def dispatched(request) -> tuple[Dispatcher, list[Rcv]]:
+    """
+    the template of list 1 with 10 variables is registered for every source
+    """
+    options = create_options(10)
+    dispatcher = Dispatcher({options.list_id: NvlTemplate(options, per_source=True, max_sources=request.param)})
+    traffic = NvlTraffic(options)
+    packets = [Rcv(traffic.next_frame()[0], (source_address(k), 1202)) for k in range(request.param)]
+    for rcv in packets:
+        dispatcher.route(rcv)
+    return dispatcher, packets
+
+
+def test_route(benchmark, dispatched):
+    dispatcher, packets = dispatched
+    rcvs = itertools.cycle(packets)
+    route = benchmark(lambda: dispatcher.route(next(rcvs)))
+    assert route is not None
+
+
+def test_route_and_decode(benchmark, dispatched):
+    dispatcher, packets = dispatched
+    rcvs = itertools.cycle(packets)
+
+    def process() -> None:
+        rcv = next(rcvs)
+        route = dispatcher.route(rcv)
+        route.sequence_tracker.check(rcv.n_sends)
+        route.data_packer.put_data(rcv)
+
+    benchmark(process)
+    assert len(dispatcher.routes) == len(packets)
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as mp:
+        yield mp
+
+
+@pytest.fixture(scope="module")
+def template_app(tmp_path_factory, monkeypatch_module):
+    port = get_free_port()
+    options = create_options(10, port=port)
+    path = write_gvl(tmp_path_factory.mktemp("gvl") / "template.gvl", options)
+    monkeypatch_module.setattr(settings.network, "local_ip", options.ip_address)
+    monkeypatch_module.setattr(settings.network, "local_port", port)
+    monkeypatch_module.setattr(settings.network, "queue_size", 10_000)
+    monkeypatch_module.setattr(settings.network, "receive_buffer", 1 << 22)  # a burst of 1000 datagrams
+    monkeypatch_module.setattr(settings.nvl, "paths", [])
+    monkeypatch_module.setattr(settings.nvl, "templates", [path])
+    NvlParser.list_id.clear()
+    from main import Main
+    from loguru import logger
+    logger.remove()
+    application = Main()
+    application.udp_server_thread.start()
+    time.sleep(0.2)
+    return application, NvlTraffic(options)
+
+
+def test_main_loopback_1000_sources(benchmark, template_app):
+    """
+    one frame of the template from every of 1000 PLCs (127.0.0.1 ... 127.0.3.232) over loopback UDP
+    """
+    application, traffic = template_app
+    address = (str(settings.network.local_ip), settings.network.local_port)
+    n_sources = 1000
+
+    def burst() -> int:
+        sender = threading.Thread(target=generate, args=([traffic], address, 0, 60),
+                                  kwargs={"sources": n_sources, "cycles": 1})
+        sender.start()
+        processed = 0
+        while processed < n_sources:
+            try:
+                data = application.mq_from_client.get(timeout=0.5)
+            except queue.Empty:
+                break
+            application.data_processing(data)
+            application.mq_from_client.task_done()
+            processed += 1
+        sender.join()
+        return processed
+
+    processed = benchmark.pedantic(burst, rounds=5, iterations=1)
+    benchmark.extra_info["processed"] = processed
+    assert len(application.dispatcher.routes) == n_sources
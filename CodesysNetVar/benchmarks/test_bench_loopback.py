@@ -0,0 +1,71 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from codesys.nvl_parser import NvlParser
+from loadgen import NvlTraffic, generate
+from settings.settings import settings
+from benchmarks.conftest import create_options, write_gvl, get_free_port
+
+FRAMES = 200
+RATE = 2000  # frames/s, the kernel buffer of socket drops faster bursts of big frames
+
+
+@pytest.fixture(params=[10, 1000], ids=lambda size: f"{size}vars")
+def app(request, tmp_path_factory, monkeypatch_module):
+    port = get_free_port()
+    options = create_options(request.param, port=port)
+    path = write_gvl(tmp_path_factory.mktemp("gvl") / "bench.gvl", options)
+    monkeypatch_module.setattr(settings.network, "local_ip", options.ip_address)
+    monkeypatch_module.setattr(settings.network, "local_port", port)
+    monkeypatch_module.setattr(settings.network, "queue_size", FRAMES)
+    monkeypatch_module.setattr(settings.nvl, "paths", [path])
+    NvlParser.list_id.clear()
+    from main import Main
+    from loguru import logger
+    logger.remove()  # main sets up the logger
+    application = Main()
+    application.udp_server_thread.start()
+    time.sleep(0.2)
+    return application, NvlTraffic(options)
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as mp:
+        yield mp
+
+
+def test_main_loopback(benchmark, app):
+    """
+    synthetic frames to Main over loopback UDP: receive, parse, sequence check, decode
+    """
+    application, traffic = app
+    address = (str(settings.network.local_ip), settings.network.local_port)
+
+    cpu: list[float] = []
+
+    def burst() -> int:
+        start = time.process_time()
+        sender = threading.Thread(target=generate, args=([traffic], address, RATE, 60), kwargs={"cycles": FRAMES})
+        sender.start()
+        processed = 0
+        while processed < FRAMES:
+            try:
+                data = application.mq_from_client.get(timeout=0.5)
+            except queue.Empty:
+                break  # the rest is lost in the socket
+            application.data_processing(data)
+            application.mq_from_client.task_done()
+            processed += 1
+        sender.join()
+        cpu.append(time.process_time() - start)
+        return processed
+
+    processed = benchmark.pedantic(burst, rounds=5, iterations=1)
+    benchmark.extra_info["frames"] = FRAMES
+    benchmark.extra_info["processed"] = processed
+    benchmark.extra_info["cpu_s_per_frame_with_sender"] = sum(cpu) / len(cpu) / FRAMES
+    assert processed > 0
@@ -0,0 +1,112 @@
+import datetime
+import struct
+from typing import NamedTuple
+
+from loguru import logger
+
+from codesys.data_types import CReal, CArray, CTypeDeclaration
+from settings.settings import settings
+from utils.exeptions import UnsupportedType
+from utils.statistics import statistic, Counter
+
+
+class Deadband(NamedTuple):
+    absolute: float = 0.0
+    percent: float = 0.0  # of the stored value
+
+
+def parse_deadband(value: float | str) -> Deadband:
+    """
+    :param value: 0.5 - absolute, "2%" - percentage of the stored value
+    """
+    if isinstance(value, str) and value.strip().endswith("%"):
+        return Deadband(percent=float(value.strip()[:-1]))
+    return Deadband(absolute=float(value))
+
+
+class ChangeFilter:
+    def __init__(self, list_id: int, c_types_declarations: CTypeDeclaration,
+                 deadbands: dict[str, Deadband] | None = None, heartbeat_ms: int = 0) -> None:
+        """
+        a frame is stored only if it differs from the last stored frame. The raw frames are compared first:
+        a frame equal to the previous one is not decoded again, an unchanged frame costs one compare of bytes.
+        REAL and LREAL variables (and arrays of them) with a deadband are changed only if the difference
+        to the stored value is more than the deadband
+        :param list_id: list ID for the statistics
+        :param c_types_declarations: declarations of the NVL
+        :param deadbands: deadbands by name of variable
+        :param heartbeat_ms: an unchanged frame is stored after this time since the last stored frame, 0 - never
+        """
+        deadbands = deadbands or {}
+        self.exact: list[slice] = []  # parts of the frame without deadbands, they are compared as bytes
+        self.deadbands: list[tuple[struct.Struct, int, Deadband]] = []  # unpacker of values, offset, deadband
+        offset = exact_start = 0
+        for c_type in c_types_declarations:
+            if (deadband := deadbands.get(c_type.name)) is not None:
+                element = c_type.c_type if isinstance(c_type, CArray) else c_type
+                if not isinstance(element, CReal):
+                    raise UnsupportedType(f"Deadband of {c_type.name} is not supported, only REAL and LREAL")
+                count = c_type.count if isinstance(c_type, CArray) else 1
+                self.deadbands.append((struct.Struct(f"<{count}{element.struct_format}"), offset, deadband))
+                if exact_start < offset:
+                    self.exact.append(slice(exact_start, offset))
+                exact_start = offset + c_type.size
+            offset += c_type.size
+        if exact_start < offset:
+            self.exact.append(slice(exact_start, offset))
+        if unknown := set(deadbands) - {c_type.name for c_type in c_types_declarations}:
+            logger.warning(f"List {list_id} has no variables {sorted(unknown)}, their deadbands are not used")
+        self.heartbeat = datetime.timedelta(milliseconds=heartbeat_ms) if heartbeat_ms else None
+        self.last: bytes | None = None  # the last stored frame
+        self.last_ts: datetime.datetime | None = None
+        self.previous: bytes | None = None  # the last checked frame
+        self.skipped: Counter = statistic.counter(f"change_filter/{list_id}/skipped",
+                                                  f"Change filter: frames of list {list_id} are not stored",
+                                                  "cnv_frames_not_stored_total", {"list_id": list_id})
+
+    def is_repeated(self, data: bytes) -> bool:
+        """
+        the frame is the same as the previous one, its values are already decoded
+        """
+        return data == self.previous
+
+    def check(self, data: bytes, ts: datetime.datetime) -> bool:
+        """
+        :param data: data of the decoded frame, bytes (a compare of memoryview is by items, 20 times slower)
+        :param ts: receive time of the frame
+        :return: True - the frame has to be stored, it is the new stored frame
+        """
+        self.previous = data
+        if self.last is None or (data != self.last and self._is_changed(data)) \
+                or (self.heartbeat and ts - self.last_ts >= self.heartbeat):  # type: ignore
+            self.last, self.last_ts = data, ts
+            return True
+        self.skipped.value += 1
+        return False
+
+    def _is_changed(self, data: bytes) -> bool:
+        if not self.deadbands:
+            return True
+        last: bytes = self.last  # type: ignore
+        for part in self.exact:
+            if data[part] != last[part]:
+                return True
+        for unpacker, offset, (absolute, percent) in self.deadbands:
+            for new, old in zip(unpacker.unpack_from(data, offset), unpacker.unpack_from(last, offset)):
+                if not abs(new - old) <= max(absolute, abs(old) * percent / 100):  # NaN is a change
+                    return True
+        return False
+
+
+def create_change_filter(list_id: int, c_types_declarations: CTypeDeclaration) -> ChangeFilter | None:
+    """
+    the deadbands of the list are in settings by key "<list ID>/<variable>"
+    """
+    if not settings.storage.change_only:
+        return None
+    deadbands = {}
+    for key, value in settings.storage.deadbands.items():
+        key_list_id, _, name = key.partition("/")
+        if key_list_id == str(list_id):
+            deadbands[name] = parse_deadband(value)
+    return ChangeFilter(list_id, c_types_declarations, deadbands, settings.storage.heartbeat_ms)
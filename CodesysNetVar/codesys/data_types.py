@@ -1,7 +1,9 @@
 import abc
+import array
 import datetime
 import struct
-from typing import TypeVar, Any
+import sys
+from typing import TypeVar, Any, Iterable, SupportsIndex
 
 
 from sqlalchemy import Boolean, LargeBinary, Integer, BigInteger, Float, Date, String, ARRAY, Time, DateTime
@@ -13,9 +15,25 @@ MICROS_IN_MS = 1000
 MS_IN_SECOND = 1000
 MS_IN_MINUTE = 60 * MS_IN_SECOND
 MS_IN_HOUR = 3600 * MS_IN_SECOND
+MAX_MS_IN_DAY = 86399999
+
+_SIGNED_INT_FORMATS = {1: "b", 2: "h", 4: "i", 8: "q"}
+_UNSIGNED_INT_FORMATS = {1: "B", 2: "H", 4: "I", 8: "Q"}
+_FLOAT_FORMATS = {4: "f", 8: "d"}
+
+
+def _ms_to_time(int_value: int) -> datetime.time:
+    modulo_h, hour = int_value % MS_IN_HOUR, int_value // MS_IN_HOUR
+    modulo_m, minute = modulo_h % MS_IN_MINUTE, modulo_h // MS_IN_MINUTE
+    modulo_s, second = modulo_m % MS_IN_SECOND, modulo_m // MS_IN_SECOND
+    millisecond = modulo_s % MS_IN_SECOND
+    microsecond = millisecond * MICROS_IN_MS
+    return datetime.time(hour=hour, minute=minute, second=second, microsecond=microsecond)
 
 
 class CType:
+    __slots__ = ("name", "size", "value", "sql_alchemy_type", "ts")
+
     def __init__(self, name: str):
         self.name = name
         self.size: int = 0
@@ -23,17 +41,42 @@ class CType:
         self.sql_alchemy_type: TypeEngine | None = None
         self.ts: datetime.datetime | None = None
 
-    def put(self, value: bytes) -> None:
+    def put(self, value: bytes | memoryview, ts: datetime.datetime | None = None) -> None:
+        """
+        :param value: raw bytes of the value
+        :param ts: receive time of the frame, all variables of one frame have the same timestamp
+        """
         if len(value) != self.size:
             raise DataWrongLen(f"The data has different length for this Data type. "
                                f"Codesys type {self.__class__.__name__} has to has {self.size} bytes. "
                                f"Input value had {len(value)} bytes.")
         self._put(value)
+        self.ts = ts or datetime.datetime.now()
 
     @abc.abstractmethod
-    def _put(self, value: bytes) -> None:
+    def _put(self, value: bytes | memoryview) -> None:
         pass
 
+    @property
+    def struct_format(self) -> str:
+        """
+        format of the type for the struct module without byte order character (data is little-endian)
+        """
+        return f"{self.size}s"
+
+    def convert(self, raw: Any) -> Any:
+        """
+        convert the value unpacked with struct_format to the value of the type
+        """
+        return raw
+
+    def load(self, value: Any, ts: datetime.datetime) -> None:
+        """
+        set the value, which is already decoded
+        """
+        self.value = value
+        self.ts = ts
+
     def clear(self) -> None:
         self.value = None
         self.ts = None
@@ -46,28 +89,36 @@ CodesysType = TypeVar("CodesysType", bound=CType)
 
 
 class CBool(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 1
         self.sql_alchemy_type = Boolean
 
-    def _put(self, value: bytes) -> None:
+    def _put(self, value: bytes | memoryview) -> None:
         self.value = bool.from_bytes(value, "little")
-        self.ts = datetime.datetime.now()
+
+    @property
+    def struct_format(self) -> str:
+        return "?"
 
 
 class CByte(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 1
         self.sql_alchemy_type = LargeBinary
 
-    def _put(self, value: bytes) -> None:
-        self.value = value
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        self.value = bytes(value)
 
 
 class CWord(CByte):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 2
@@ -75,6 +126,8 @@ class CWord(CByte):
 
 
 class CDWord(CByte):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
@@ -82,6 +135,8 @@ class CDWord(CByte):
 
 
 class CLWord(CByte):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 8
@@ -89,28 +144,40 @@ class CLWord(CByte):
 
 
 class CInt(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 2
         self.sql_alchemy_type = Integer
 
-    def _put(self, value: bytes) -> None:
+    def _put(self, value: bytes | memoryview) -> None:
         self.value = int.from_bytes(value, "little", signed=True)
-        self.ts = datetime.datetime.now()
+
+    @property
+    def struct_format(self) -> str:
+        return _SIGNED_INT_FORMATS[self.size]
 
 
 class CUInt(CInt):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 2
         self.sql_alchemy_type = Integer
 
-    def _put(self, value: bytes) -> None:
+    def _put(self, value: bytes | memoryview) -> None:
         self.value = int.from_bytes(value, "little", signed=False)
-        self.ts = datetime.datetime.now()
+
+    @property
+    def struct_format(self) -> str:
+        return _UNSIGNED_INT_FORMATS[self.size]
 
 
 class CDInt(CInt):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
@@ -118,6 +185,8 @@ class CDInt(CInt):
 
 
 class CLInt(CInt):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 8
@@ -125,6 +194,8 @@ class CLInt(CInt):
 
 
 class CUDInt(CUInt):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
@@ -132,6 +203,8 @@ class CUDInt(CUInt):
 
 
 class CULInt(CUInt):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 8
@@ -139,17 +212,24 @@ class CULInt(CUInt):
 
 
 class CReal(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
         self.sql_alchemy_type = Float
 
-    def _put(self, value: bytes) -> None:
-        self.value = struct.unpack("f", value)[0]
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        self.value = struct.unpack("<" + self.struct_format, value)[0]
+
+    @property
+    def struct_format(self) -> str:
+        return _FLOAT_FORMATS[self.size]
 
 
 class CLReal(CReal):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 8
@@ -157,109 +237,313 @@ class CLReal(CReal):
 
 
 class CTime(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
         self.sql_alchemy_type = Time
 
-    def _put(self, value: bytes) -> None:
-        int_value = int.from_bytes(value, "little")
-        modulo_h, hour = int_value % MS_IN_HOUR, int_value // MS_IN_HOUR
-        modulo_m, minute = modulo_h % MS_IN_MINUTE, modulo_h // MS_IN_MINUTE
-        modulo_s, second = modulo_m % MS_IN_SECOND, modulo_m // MS_IN_SECOND
-        millisecond = modulo_s % MS_IN_SECOND
-        microsecond = millisecond * MICROS_IN_MS
-        self.value = datetime.time(hour=hour, minute=minute, second=second, microsecond=microsecond)
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        self.value = self.convert(int.from_bytes(value, "little"))
+
+    @property
+    def struct_format(self) -> str:
+        return "I"
+
+    def convert(self, raw: int) -> datetime.time:
+        return _ms_to_time(raw)
 
 
 class CTimeOfDay(CTime):
-    def _put(self, value: bytes) -> None:
-        int_value = int.from_bytes(value, "little", signed=False)
-        if int_value > 86399999:
+    __slots__ = ()
+
+    def convert(self, raw: int) -> datetime.time:
+        if raw > MAX_MS_IN_DAY:
             raise OutOfRange(f"The value is out of range."
-                             f"Codesys type {self.__class__.__name__} has to has values from 0 to 86399999."
-                             f"Input value is {int_value}.")
-        modulo_h, hour = int_value % MS_IN_HOUR, int_value // MS_IN_HOUR
-        modulo_m, minute = modulo_h % MS_IN_MINUTE, modulo_h // MS_IN_MINUTE
-        modulo_s, second = modulo_m % MS_IN_SECOND, modulo_m // MS_IN_SECOND
-        millisecond = modulo_s % MS_IN_SECOND
-        microsecond = millisecond * MICROS_IN_MS
-        self.value = datetime.time(hour=hour, minute=minute, second=second, microsecond=microsecond)
-        self.ts = datetime.datetime.now()
+                             f"Codesys type {self.__class__.__name__} has to has values from 0 to {MAX_MS_IN_DAY}."
+                             f"Input value is {raw}.")
+        return _ms_to_time(raw)
 
 
 class CDate(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
         self.sql_alchemy_type = Date
 
-    def _put(self, value: bytes) -> None:
-        n_seconds = int.from_bytes(value, "little")
-        self.value = datetime.date.fromtimestamp(0) + datetime.timedelta(seconds=n_seconds)
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        self.value = self.convert(int.from_bytes(value, "little"))
+
+    @property
+    def struct_format(self) -> str:
+        return "I"
+
+    def convert(self, raw: int) -> datetime.date:
+        return datetime.date.fromtimestamp(0) + datetime.timedelta(seconds=raw)
 
 
 class CDateAndTime(CType):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name)
         self.size = 4
         self.sql_alchemy_type = DateTime
 
-    def _put(self, value: bytes):
-        n_seconds = int.from_bytes(value, 'little')
-        self.value = datetime.datetime(year=1970, month=1, day=1) + datetime.timedelta(seconds=n_seconds)
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        self.value = self.convert(int.from_bytes(value, "little"))
+
+    @property
+    def struct_format(self) -> str:
+        return "I"
+
+    def convert(self, raw: int) -> datetime.datetime:
+        return datetime.datetime(year=1970, month=1, day=1) + datetime.timedelta(seconds=raw)
 
 
 class CString(CType):
+    __slots__ = ()
+
     def __init__(self, name: str, size: int):
         super().__init__(name)
         self.size = size + 1
         self.sql_alchemy_type = String
 
-    def _put(self, value: bytes) -> None:
-        self.value = value[: value.find(b"\x00")].decode("ascii")
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        self.value = self.convert(bytes(value))
+
+    def convert(self, raw: bytes) -> str:
+        return raw[: raw.find(b"\x00")].decode("ascii")
+
+
+def _get_array_typecode(c_type: CType) -> str | None:
+    """
+    typecode of array.array with the same item as the numeric Codesys type, None for other types
+    """
+    if type(c_type).convert is not CType.convert:
+        return None  # TIME, DATE etc. are converted to python objects
+    element_format = c_type.struct_format
+    if element_format in ("f", "d"):
+        return element_format
+    if element_format not in _SIGNED_INT_FORMATS.values() and element_format not in _UNSIGNED_INT_FORMATS.values():
+        return None
+    for typecode in ("b", "h", "i", "l", "q"):
+        typecode = typecode if element_format.islower() else typecode.upper()
+        if array.array(typecode).itemsize == c_type.size:
+            return typecode
+    return None
 
 
 class CArray(CType):
+    __slots__ = ("c_type", "count", "_typecode", "_struct", "_values", "_value_list", "_structure")
+
     def __init__(self, name: str, c_type: CodesysType, count: int):
-        super().__init__(name)
+        """
+        numeric elements are stored in one array.array, which is filled from bytes without unpacking every element,
+        other elements are stored in a list. The element objects are created only if the structure is requested
+        :param name: name of variable
+        :param c_type: instance of the element type
+        :param count: count of elements
+        """
         self.c_type = c_type
         self.count = count
-        self.structure: list[CodesysType] = [self.c_type.__class__("_") for _ in range(self.count)]
-        self.__value = [None] * self.count
+        self._typecode = _get_array_typecode(c_type)
+        element_format = c_type.struct_format
+        self._struct = struct.Struct(f"<{count}{element_format}" if len(element_format) == 1
+                                     else "<" + element_format * count)
+        self._structure: list[CArrayItem] | None = None
+        self._values: array.array | list[Any] | None = None  # array.array for numeric elements
+        self._value_list: list[Any] | None = None  # the values as list, created on request
+        super().__init__(name)
         self.size = self.c_type.size * self.count
         self.sql_alchemy_type = ARRAY(self.c_type.sql_alchemy_type)
 
-    def _put(self, value: bytes) -> None:
-        start = 0
-        for ctype_instance in self.structure:
-            ctype_instance.put(value[start: start + ctype_instance.size])
-            start += ctype_instance.size
-        self.ts = datetime.datetime.now()
+    def _put(self, value: bytes | memoryview) -> None:
+        if self._typecode:
+            values = array.array(self._typecode)
+            values.frombytes(value)
+            if sys.byteorder == "big":
+                values.byteswap()
+            self._values, self._value_list = values, None
+        else:
+            self.value = self.convert(self._struct.unpack(value))
+
+    def put_item(self, index: int, value: bytes | memoryview, ts: datetime.datetime | None = None) -> None:
+        """
+        put one element, elements which are not received yet are None (or 0 for numeric elements)
+        :param index: index of element from 0
+        :param value: raw bytes of the element
+        :param ts: receive time of the frame
+        """
+        if len(value) != self.c_type.size:
+            raise DataWrongLen(f"The data has different length for this Data type. "
+                               f"Codesys type {self.c_type.__class__.__name__} has to has {self.c_type.size} bytes. "
+                               f"Input value had {len(value)} bytes.")
+        self.set_item(index, self.c_type.convert(struct.unpack("<" + self.c_type.struct_format, value)[0]))
+        self.ts = ts or datetime.datetime.now()
+
+    def get_item(self, index: int) -> Any:
+        return None if self._values is None else self._values[index]
+
+    def set_item(self, index: int, value: Any) -> None:
+        if self._values is None:
+            self._values = array.array(self._typecode, bytes(self.size)) if self._typecode else [None] * self.count
+        self._values[index] = value
+        self._value_list = None
+
+    @property
+    def struct_format(self) -> str:
+        if self._typecode:
+            return f"{self.size}s"  # numeric elements are copied as raw bytes to array.array
+        return self._struct.format[1:]
+
+    @property
+    def is_compact(self) -> bool:
+        """
+        numeric array is stored in array.array and takes one item of struct_format
+        """
+        return self._typecode is not None
+
+    def convert(self, raw: Any) -> Any:
+        if self._typecode:
+            values = array.array(self._typecode)
+            values.frombytes(raw)
+            if sys.byteorder == "big":
+                values.byteswap()
+            return values
+        return [self.c_type.convert(r) for r in raw]
 
     @property
     def value(self) -> list[Any]:
-        return [v.value for v in self.structure]
+        if self._value_list is None:
+            if self._values is None:
+                self._value_list = [None] * self.count
+            elif isinstance(self._values, array.array):
+                self._value_list = self._values.tolist()
+            else:
+                self._value_list = self._values
+        return self._value_list
+
+    @value.setter
+    def value(self, value: Any) -> None:
+        if self._typecode and value is not None and not isinstance(value, array.array):
+            value = array.array(self._typecode, value)
+        elif isinstance(value, tuple):
+            value = list(value)
+        self._values, self._value_list = value, None
+
+    @property
+    def structure(self) -> list["CArrayItem"]:
+        if self._structure is None:
+            self._structure = [CArrayItem(self, i) for i in range(self.count)]
+        return self._structure
+
+
+class CArrayItem(CType):
+    __slots__ = ("array", "index")
+
+    def __init__(self, c_array: CArray, index: int):
+        """
+        element of CArray, the value and the timestamp are stored in the array
+        :param c_array: array of the element
+        :param index: index of element from 0
+        """
+        self.array = c_array
+        self.index = index
+        super().__init__(f"{c_array.name}[{index}]")
+        self.size = c_array.c_type.size
+        self.sql_alchemy_type = c_array.c_type.sql_alchemy_type
+
+    def put(self, value: bytes | memoryview, ts: datetime.datetime | None = None) -> None:
+        self.array.put_item(self.index, value, ts)
+
+    def _put(self, value: bytes | memoryview) -> None:
+        self.array.put_item(self.index, value)
+
+    @property
+    def struct_format(self) -> str:
+        return self.array.c_type.struct_format
+
+    def convert(self, raw: Any) -> Any:
+        return self.array.c_type.convert(raw)
+
+    @property  # type: ignore
+    def value(self) -> Any:
+        return self.array.get_item(self.index)
 
     @value.setter
-    def value(self, value: list[Any]) -> None:
-        self.__value = value
+    def value(self, value: Any) -> None:
+        if value is not None:
+            self.array.set_item(self.index, value)
+
+    @property  # type: ignore
+    def ts(self) -> datetime.datetime | None:
+        return self.array.ts
+
+    @ts.setter
+    def ts(self, value: datetime.datetime | None) -> None:
+        pass  # the timestamp is set by the array
+
+    def clear(self) -> None:
+        pass  # the whole array is cleared by CArray.clear
 
 
 class CTypeDeclaration(list[CType]):
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self._names: dict[str, CType] | None = None  # index of get_via_name, built on request
+
     def append(self, obj: CodesysType) -> None:
         assert issubclass(obj.__class__, CType), "Appended object is not subclass of Codesys"
         super().append(obj)  # noqa
+        self._names = None
+
+    # every change of the list drops the index of names
+    def extend(self, *args: Any) -> None:
+        super().extend(*args)
+        self._names = None
+
+    def insert(self, *args: Any) -> None:
+        super().insert(*args)
+        self._names = None
+
+    def __setitem__(self, *args: Any) -> None:
+        super().__setitem__(*args)
+        self._names = None
+
+    def __delitem__(self, *args: Any) -> None:
+        super().__delitem__(*args)
+        self._names = None
+
+    def __iadd__(self, other: Iterable[CType]) -> "CTypeDeclaration":  # type: ignore[override, misc]
+        self._names = None
+        return super().__iadd__(other)
+
+    def __imul__(self, count: SupportsIndex) -> "CTypeDeclaration":
+        self._names = None
+        return super().__imul__(count)
+
+    def remove(self, *args: Any) -> None:
+        super().remove(*args)
+        self._names = None
+
+    def pop(self, *args: Any) -> Any:
+        self._names = None
+        return super().pop(*args)
+
+    def clear(self) -> None:
+        super().clear()
+        self._names = None
 
     def get_via_name(self, name: str) -> CType | None:
-        for i in self:
-            if i.name == name:
-                return i
-        return None
+        if (names := self._names) is None:
+            names = self._names = {}
+            for i in self:
+                names.setdefault(i.name, i)
+        return names.get(name)
 
     def get_elementary_type_list(self) -> list[CType]:
         elementary_types = []
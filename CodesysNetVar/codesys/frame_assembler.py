@@ -0,0 +1,98 @@
+import datetime
+from dataclasses import dataclass
+
+from loguru import logger
+
+from codesys.data_types import CArray, CTypeDeclaration
+from utils.exeptions import DataWrongLen, PacketWrongNumber
+from utils.statistics import statistic, Counter
+
+MAX_PENDING_FRAMES = 16
+
+
+@dataclass
+class PendingFrame:
+    ts_ns: int
+    ts: datetime.datetime
+    slots: list[bytes | memoryview | None]
+    received: int = 0  # bitmap of received slots
+
+
+class FrameAssembler:
+    def __init__(self, list_id: int, c_types_declarations: CTypeDeclaration, timeout_ms: int,
+                 source: str | None = None):
+        """
+        reassembly of not packed NVL. Every packet has one elementary variable, the number of the packet is the index
+        of the variable. The packets of one frame have the same "Common Packet number" (n_sends).
+        The index of elementary variables is computed once, received slots are tracked in a bitmap by n_sends.
+        The frame is complete exactly when all slots are received, its data is the same as the data of packed NVL
+        :param list_id: ID of the list for the statistics
+        :param c_types_declarations: declarations of the NVL
+        :param timeout_ms: incomplete frame is expired after this time
+        :param source: IP of the sender of a template for the statistics, None - the list is not per source
+        """
+        self.slot_sizes: list[int] = []
+        for c_type in c_types_declarations:
+            if isinstance(c_type, CArray):
+                self.slot_sizes.extend([c_type.c_type.size] * c_type.count)
+            else:
+                self.slot_sizes.append(c_type.size)
+        self.full_mask = (1 << len(self.slot_sizes)) - 1
+        self.timeout_ns = timeout_ms * 1_000_000
+        self.pending: dict[int, PendingFrame] = {}
+        key = f"assembler/{list_id}/{source}" if source else f"assembler/{list_id}"
+        text = f"Assembler of list {list_id}{f' from {source}' if source else ''}:"
+        labels: dict[str, str | int] = {"list_id": list_id} | ({"source": source} if source else {})
+
+        def counter(kind: str, description: str, metric: str) -> Counter:
+            return statistic.counter(f"{key}/{kind}", f"{text} {description}", metric, labels)
+
+        self.completed = counter("completed", "complete frames", "cnv_frames_completed_total")
+        self.incomplete = counter("incomplete", "dropped incomplete frames, too many frames were pending",
+                                  "cnv_frames_incomplete_total")
+        self.expired = counter("expired", "dropped incomplete frames by timeout", "cnv_frames_expired_total")
+        self.duplicates = counter("duplicates", "duplicated packets of pending frames",
+                                  "cnv_frames_duplicated_packets_total")
+
+    def put(self, number: int, n_sends: int, data: bytes | memoryview, ts_ns: int, ts: datetime.datetime
+            ) -> tuple[bytes, datetime.datetime] | None:
+        """
+        :param number: number of the packet in the frame (index of elementary variable)
+        :param n_sends: common packet number of the frame
+        :param data: data of the packet
+        :param ts_ns: receive time of the packet, monotonic clock
+        :param ts: receive time of the packet, wall clock
+        :return: data and receive time of the first packet of the frame, when the frame is complete, else None
+        """
+        if not 0 <= number < len(self.slot_sizes):
+            raise PacketWrongNumber(f"Number of packet {number} is out of NVL with {len(self.slot_sizes)} variables")
+        if len(data) != self.slot_sizes[number]:
+            raise DataWrongLen(f"The data has different length for variable number {number}. "
+                               f"It has to has {self.slot_sizes[number]} bytes. Input value had {len(data)} bytes.")
+        self.expire(ts_ns)
+        if (frame := self.pending.get(n_sends)) is None:
+            if len(self.pending) >= MAX_PENDING_FRAMES:
+                self.pending.pop(next(iter(self.pending)))
+                self.incomplete.value += 1
+            frame = self.pending[n_sends] = PendingFrame(ts_ns, ts, [None] * len(self.slot_sizes))
+        bit = 1 << number
+        if frame.received & bit:
+            self.duplicates.value += 1
+            return None
+        frame.received |= bit
+        frame.slots[number] = data
+        if frame.received != self.full_mask:
+            return None
+        del self.pending[n_sends]
+        self.completed.value += 1
+        return b"".join(frame.slots), frame.ts  # type: ignore
+
+    def expire(self, now_ns: int) -> None:
+        while self.pending:
+            n_sends, frame = next(iter(self.pending.items()))
+            if now_ns - frame.ts_ns <= self.timeout_ns:
+                break
+            del self.pending[n_sends]
+            self.expired.value += 1
+            logger.debug(f"Incomplete frame {n_sends} is expired, "
+                         f"{bin(frame.received).count('1')}/{len(self.slot_sizes)} packets were received")
@@ -0,0 +1,52 @@
+import datetime
+import struct
+from typing import Any, Callable
+
+from codesys.data_types import CType, CArray, CTypeDeclaration
+from utils.exeptions import DataWrongLen
+
+
+class FrameDecoder:
+    def __init__(self, c_types_declarations: CTypeDeclaration):
+        """
+        compile the layout of packed NVL to one struct format. CArray and CString are flattened into it,
+        so the whole frame is decoded with one unpack_from, only TIME, DATE, STRING etc. are converted after it
+        :param c_types_declarations: declarations of the NVL
+        """
+        self.c_types_declarations = c_types_declarations
+        self.struct = struct.Struct("<" + "".join(c_type.struct_format for c_type in c_types_declarations))
+        self.layout: list[tuple[CType, int | slice, Callable[[Any], Any] | None]] = []
+        index = 0
+        for c_type in c_types_declarations:
+            converter = c_type.convert if self._need_convert(c_type) else None
+            if isinstance(c_type, CArray) and not c_type.is_compact:
+                self.layout.append((c_type, slice(index, index + c_type.count), converter))
+                index += c_type.count
+            else:
+                self.layout.append((c_type, index, converter))
+                index += 1
+
+    @staticmethod
+    def _need_convert(c_type: CType) -> bool:
+        if isinstance(c_type, CArray) and not c_type.is_compact:
+            return type(c_type.c_type).convert is not CType.convert
+        return type(c_type).convert is not CType.convert
+
+    @property
+    def size(self) -> int:
+        return self.struct.size
+
+    def decode(self, data: bytes | memoryview, ts: datetime.datetime | None = None) -> None:
+        """
+        :param data: data of the packed frame
+        :param ts: receive time of the frame
+        """
+        if len(data) != self.struct.size:
+            raise DataWrongLen(f"The data has different length for this NVL. "
+                               f"NVL has to has {self.struct.size} bytes. "
+                               f"Input value had {len(data)} bytes.")
+        values = self.struct.unpack_from(data)
+        ts = ts or datetime.datetime.now()
+        for c_type, key, converter in self.layout:
+            value = values[key]
+            c_type.load(converter(value) if converter else value, ts)
@@ -0,0 +1,62 @@
+import bisect
+import struct
+from typing import Any, Callable, NamedTuple
+
+from codesys.data_types import CType, CArray, CTypeDeclaration
+
+
+class Field(NamedTuple):
+    offset: int
+    unpacker: struct.Struct
+    is_list: bool  # the value is unpacked as several items (array which is not compact)
+    converter: Callable[[Any], Any] | None
+
+
+class FrameIndex:
+    def __init__(self, c_types_declarations: CTypeDeclaration):
+        """
+        offsets of the variables in the packed frame by path: the name of variable and "name[i]" of array element
+        (the index from 0 as in CArrayItem). A value is unpacked from the frame without decoding of the whole frame
+        :param c_types_declarations: declarations of the NVL
+        """
+        self.fields: dict[str, Field] = {}
+        self.variables: list[str] = []  # names of variables without array elements
+        offset = 0
+        for c_type in c_types_declarations:
+            self.fields[c_type.name] = self._get_field(c_type, offset)
+            self.variables.append(c_type.name)
+            if isinstance(c_type, CArray):
+                element_size = c_type.c_type.size
+                for i in range(c_type.count):
+                    self.fields[f"{c_type.name}[{i}]"] = self._get_field(c_type.c_type, offset + i * element_size)
+            offset += c_type.size
+        self.size = offset
+        self.sorted_paths = sorted(self.fields)
+
+    @staticmethod
+    def _get_field(c_type: CType, offset: int) -> Field:
+        is_list = isinstance(c_type, CArray) and not c_type.is_compact
+        converter = c_type.convert if is_list or type(c_type).convert is not CType.convert else None
+        return Field(offset, struct.Struct("<" + c_type.struct_format), is_list, converter)
+
+    def unpack(self, buffer: Any, path: str, base: int = 0) -> Any:
+        """
+        :param buffer: object with buffer protocol, which contains the frame
+        :param path: path of variable
+        :param base: offset of the frame in the buffer
+        """
+        offset, unpacker, is_list, converter = self.fields[path]
+        raw = unpacker.unpack_from(buffer, base + offset)
+        value = raw if is_list else raw[0]
+        return converter(value) if converter else value
+
+    def find_prefix(self, prefix: str) -> list[str]:
+        """
+        paths which start with prefix, in alphabetical order
+        """
+        paths = []
+        for i in range(bisect.bisect_left(self.sorted_paths, prefix), len(self.sorted_paths)):
+            if not self.sorted_paths[i].startswith(prefix):
+                break
+            paths.append(self.sorted_paths[i])
+        return paths
@@ -87,7 +87,10 @@ class NvlParser:
                     nvl_declaration.append(NvlDeclarations(name=v_name, type=v_type))
         return nvl_declaration
 
-    def parse(self) -> NvlOptions:
+    def parse(self, check: bool = True) -> NvlOptions:
+        """
+        :param check: check the settings of NVL for receiving and uniq list ID, False - only parse the file
+        """
         parse_result: Any = {}
         root = self.get_root_of_tree(self._path)
         parse_result["declarations"] = self.nvl_declaration_filler(
@@ -117,8 +120,9 @@ class NvlParser:
         parse_result["port"] = element_protocol_settings[1].attrib["Value"]
 
         nvl_options = NvlOptions.parse_obj(parse_result)
-        self.check_settings(nvl_options)
-        self.check_uniq_list_id(nvl_options.list_id)
+        if check:
+            self.check_settings(nvl_options)
+            self.check_uniq_list_id(nvl_options.list_id)
         logger.info(f'Result parse of nvl file "{self._path}":')
         logger.info(nvl_options)
         return nvl_options
@@ -0,0 +1,96 @@
+import datetime
+from typing import Any
+
+import numpy as np
+
+from codesys.data_types import (
+    CBool,
+    CTime,
+    CTimeOfDay,
+    CDate,
+    CDateAndTime,
+    CString,
+    CArray,
+    CType,
+    CTypeDeclaration,
+    MAX_MS_IN_DAY,
+)
+from utils.exeptions import DataWrongLen, OutOfRange
+
+SECONDS_IN_DAY = 86400
+_NUMPY_KINDS = {"?": "u", "b": "i", "h": "i", "i": "i", "q": "i", "B": "u", "H": "u", "I": "u", "Q": "u",
+                "f": "f", "d": "f"}
+
+
+class VectorDecoder:
+    def __init__(self, c_types_declarations: CTypeDeclaration, header_size: int = 0):
+        """
+        batch decoder of packed NVL frames. The declaration is turned to a packed little-endian NumPy
+        structured dtype, N frames are decoded with one np.frombuffer into columns.
+        Columns of TIME and TIME_OF_DAY are timedelta64[ms] since midnight, DATE is datetime64[D],
+        DATE_AND_TIME is datetime64[s], STRING is unicode, BYTE...LWORD are raw bytes (void),
+        other types are numbers or bool
+        :param c_types_declarations: declarations of the NVL
+        :param header_size: count of bytes before data of every frame, e.g. 20 for the whole packets
+        """
+        self.c_types_declarations = c_types_declarations
+        fields: list[tuple[Any, ...]] = [("_header", f"V{header_size}")] if header_size else []
+        for c_type in c_types_declarations:
+            if isinstance(c_type, CArray) and isinstance(c_type.c_type, CString):
+                fields.append((c_type.name, "u1", (c_type.count, c_type.c_type.size)))
+            elif isinstance(c_type, CArray):
+                fields.append((c_type.name, self._get_dtype(c_type.c_type), (c_type.count,)))
+            elif isinstance(c_type, CString):
+                fields.append((c_type.name, "u1", (c_type.size,)))
+            else:
+                fields.append((c_type.name, self._get_dtype(c_type)))
+        self.dtype = np.dtype(fields)
+
+    @staticmethod
+    def _get_dtype(c_type: CType) -> str:
+        if (kind := _NUMPY_KINDS.get(c_type.struct_format)) is None:
+            return f"V{c_type.size}"  # BYTE, WORD, DWORD, LWORD are raw bytes
+        return f"<{kind}{c_type.size}"
+
+    @property
+    def frame_size(self) -> int:
+        return self.dtype.itemsize
+
+    def decode(self, buffer: Any, count: int = -1) -> dict[str, np.ndarray]:
+        """
+        decode the contiguous buffer of frames
+        :param buffer: object with buffer protocol (bytes, bytearray, memoryview, mmap)
+        :param count: count of frames, -1 - all frames in the buffer
+        :return: columns of values by variable name
+        """
+        if count < 0 and len(memoryview(buffer).cast("B")) % self.frame_size:
+            raise DataWrongLen(f"The buffer length is not multiple of the frame size {self.frame_size}")
+        frames = np.frombuffer(buffer, dtype=self.dtype, count=count)
+        return {c_type.name: self._convert(c_type, frames[c_type.name]) for c_type in self.c_types_declarations}
+
+    def _convert(self, c_type: CType, column: np.ndarray) -> np.ndarray:
+        element = c_type.c_type if isinstance(c_type, CArray) else c_type
+        if isinstance(element, CBool):
+            return column != 0
+        if isinstance(element, CTimeOfDay) and np.any(column > MAX_MS_IN_DAY):
+            raise OutOfRange(f"The value is out of range."
+                             f"Codesys type {element.__class__.__name__} has to has values from 0 to {MAX_MS_IN_DAY}.")
+        if isinstance(element, CTime):
+            return column.astype("timedelta64[ms]")
+        if isinstance(element, CDate):
+            epoch = np.datetime64(datetime.date.fromtimestamp(0), "D")
+            return epoch + (column // SECONDS_IN_DAY).astype("timedelta64[D]")
+        if isinstance(element, CDateAndTime):
+            return column.astype("datetime64[s]")
+        if isinstance(element, CString):
+            return self._convert_string(column, element.size)
+        return column
+
+    @staticmethod
+    def _convert_string(column: np.ndarray, size: int) -> np.ndarray:
+        # the same as CString.convert: cut at the first "\x00", without "\x00" the last symbol is cut.
+        # The symbols are the last axis, for ARRAY OF STRING the axes are (frames, elements, symbols)
+        is_end = column == 0
+        length = np.where(is_end.any(axis=-1), is_end.argmax(axis=-1), size - 1)
+        cut = np.where(np.arange(size) < length[..., np.newaxis], column, 0).astype("u1")
+        return np.char.decode(np.ascontiguousarray(cut).view(f"S{size}")[..., 0], "ascii")
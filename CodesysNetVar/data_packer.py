@@ -1,4 +1,6 @@
+import datetime
 import re
+import time
 
 from loguru import logger
 
@@ -16,6 +18,7 @@ from codesys.data_types import (
     CUDInt,
     CULInt,
     CReal,
+    CLReal,
     CTime,
     CTimeOfDay,
     CDate,
@@ -25,29 +28,56 @@ from codesys.data_types import (
     CodesysType,
     CTypeDeclaration,
 )
+from codesys.frame_decoder import FrameDecoder
+from codesys.frame_assembler import FrameAssembler
 from network.parser import Rcv
+from settings.settings import settings
 from utils.exeptions import UnsupportedType
-from db_connector import create_table_and_orm_class
+from db_connector import Row
+from persistence import persistence, Sink
+from snapshot import SnapshotWriter, snapshot_name
+from last_values import last_values, ListValues
+from change_filter import create_change_filter
+from utils.statistics import statistic
 
 
 class DataPacker:
-    def __init__(self, nvl: NvlOptions):
+    def __init__(self, nvl: NvlOptions, db_writer: Sink | None = None, source: str | None = None):
         """
         prepare data types and packing data to variables classes
         :param nvl: nvl config
+        :param db_writer: sink of the rows, None - the frames are not stored
+        :param source: IP of the sender for the column "source" of the row, None - the list is not per source
         """
         self.nvl = nvl
+        self.source = source
         self.c_types_declarations = self.generate_instance_datatype(self.nvl.declarations)
-        self.OrmModel = create_table_and_orm_class(self.nvl.list_id, self.c_types_declarations)
+        self.frame_decoder = FrameDecoder(self.c_types_declarations) if settings.nvl.compiled_decoder else None
+        self.frame_assembler = FrameAssembler(nvl.list_id, self.c_types_declarations,
+                                              settings.nvl.unpack_timeout_ms, source)
+        self.frame_ts: datetime.datetime | None = None
+        self.decode_time = statistic.duration(f"decode/{nvl.list_id}", f"Time of decoding list {nvl.list_id}",
+                                              metric="cnv_decode_seconds", labels={"list_id": nvl.list_id})
+        self.db_writer = db_writer
+        self.change_filter = create_change_filter(nvl.list_id, self.c_types_declarations) if db_writer else None
+        self.snapshot: SnapshotWriter | None = None
+        if settings.nvl.snapshot:
+            size = sum(c_type.size for c_type in self.c_types_declarations)
+            self.snapshot = SnapshotWriter(snapshot_name(nvl.list_id, source), size)
+        self.last_values: ListValues | None = None
+        if settings.api.port is not None:
+            self.last_values = last_values.register(nvl.list_id, source, self.c_types_declarations)
         # logger.debug(self)
 
-    def generate_instance_datatype(self, declaration: list[NvlDeclarations]) -> CTypeDeclaration:
+    @classmethod
+    def generate_instance_datatype(cls, declaration: list[NvlDeclarations]) -> CTypeDeclaration:
         c_types_declarations = CTypeDeclaration()
         for dec_var in declaration:
-            c_types_declarations.append(self._get_inst_via_c_type(dec_var["name"], dec_var["type"]))
+            c_types_declarations.append(cls._get_inst_via_c_type(dec_var["name"], dec_var["type"]))
         return c_types_declarations
 
-    def _get_inst_via_c_type(self, name: str, c_type: list[str] | str) -> CodesysType:
+    @classmethod
+    def _get_inst_via_c_type(cls, name: str, c_type: list[str] | str) -> CodesysType:
         c_type = [c_type] if isinstance(c_type, str) else c_type
         match name, *c_type:
             case name, "BOOL":
@@ -74,6 +104,8 @@ class DataPacker:
                 return CULInt(name)
             case name, "REAL":
                 return CReal(name)
+            case name, "LREAL":
+                return CLReal(name)
             case name, "TIME":
                 return CTime(name)
             case name, "DATE":
@@ -88,46 +120,77 @@ class DataPacker:
                 return CString(name, size)
             case name, base_type, type_arr if "ARRAY" in base_type:
                 start, end = list(map(int, base_type[6:-1].split("..")))  # 'ARRAY[0..4]'
-                return CArray(name, self._get_inst_via_c_type("_", type_arr), end - start + 1)
+                return CArray(name, cls._get_inst_via_c_type("_", type_arr), end - start + 1)
             case _:
                 raise UnsupportedType(f"Data type {c_type} is not support")
 
     def put_data(self, rcv: Rcv) -> None:
+        start = time.perf_counter_ns()
         try:
             if self.nvl.pack:
-                is_last_packet = self._put_data_pack(rcv.data_raw)
+                is_new_row = self._put_data_pack(rcv.data_raw, rcv.ts, rcv.n_sends)
             else:
-                is_last_packet = self._put_data_unpack(rcv.n_package_in_list, rcv.data_raw)
-            logger.debug(f"DataPacker of {self.nvl.list_id} ID list: The data are put in Codesys class instances\n"
-                         + "\n".join([c_type.__repr__() for c_type in self.c_types_declarations]))
-            if is_last_packet and self.OrmModel:
-                self.write_to_orm()
+                is_new_row = self._put_data_unpack(rcv)
+            logger.opt(lazy=True).debug("DataPacker of {} ID list: The data are put in Codesys class instances\n{}",
+                                        lambda: self.nvl.list_id, self.__repr__)
+            if is_new_row and self.db_writer:
+                persistence.put(self.db_writer, self.get_row())
         except Exception as ex:
             logger.exception(ex)
             self.clear_data()
+        self.decode_time.add(time.perf_counter_ns() - start)
 
-    def _put_data_unpack(self, number: int, data_raw: bytes) -> bool:
-        elementary_c_types = self.c_types_declarations.get_elementary_type_list()
-        elementary_c_types[number].put(data_raw)
-        return number + 1 == len(elementary_c_types) and all(
-            [c_type.value for c_type in elementary_c_types]
-        )
+    def _put_data_unpack(self, rcv: Rcv) -> bool:
+        frame = self.frame_assembler.put(rcv.n_package_in_list, rcv.n_sends, rcv.data_raw, rcv.ts_ns, rcv.ts)
+        if frame is None:
+            return False
+        return self._put_data_pack(*frame, rcv.n_sends)
 
-    def _put_data_pack(self, r_data: bytes) -> bool:
+    def _put_data_pack(self, r_data: bytes | memoryview, ts: datetime.datetime, seq: int = 0) -> bool:
+        """
+        :return: True - the frame is a new row for DB
+        """
+        self.frame_ts = ts
+        is_repeated = False
+        if self.change_filter:
+            r_data = frame = bytes(r_data)
+            is_repeated = self.change_filter.is_repeated(frame)  # the variables have the values of this frame
+        if not is_repeated:
+            self._decode(r_data, ts)
+        if self.snapshot:
+            self.snapshot.publish(r_data)
+        if self.last_values:
+            self.last_values.update(r_data, ts, seq)
+        return self.change_filter.check(frame, ts) if self.change_filter else True
+
+    def _decode(self, r_data: bytes | memoryview, ts: datetime.datetime) -> None:
+        if self.frame_decoder:
+            self.frame_decoder.decode(r_data, ts)
+            return
         start = 0
         for c_type in self.c_types_declarations:
-            c_type.put(r_data[start: start + c_type.size])
+            c_type.put(r_data[start: start + c_type.size], ts)
             start += c_type.size
-        return True
 
-    def write_to_orm(self) -> None:
-        orm_model = self.OrmModel()
+    def get_row(self) -> Row:
+        """
+        values of all variables for a DB row, the time of row is the receive time of frame
+        """
+        row: Row = {"ts": self.frame_ts}
+        if self.source is not None:
+            row["source"] = self.source
         for c_type in self.c_types_declarations:
-            orm_model.update_value(c_type)
-        logger.debug(f"Start writing orm class to DB")
-        orm_model.write_to_db()
+            row[c_type.name] = list(c_type.value) if isinstance(c_type, CArray) else c_type.value
+        return row
+
+    def close(self) -> None:
+        if self.snapshot:
+            self.snapshot.close()
+            self.snapshot = None
 
     def clear_data(self) -> None:
+        if self.change_filter:
+            self.change_filter.previous = None
         for c_type in self.c_types_declarations:
             c_type.clear()
 
@@ -1,12 +1,18 @@
+import datetime
+import io
+import time
 from typing import TypeAlias, Any
 
-from sqlalchemy import Table, Column, Integer, MetaData, create_engine, DateTime
+from sqlalchemy import Table, Column, Integer, String, MetaData, create_engine, DateTime, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import mapper, create_session
 from sqlalchemy.sql import func
 from loguru import logger
 
 from settings.settings import settings
 from codesys.data_types import CodesysType, CTypeDeclaration
+from utils.statistics import statistic
+from utils.exeptions import RowsNotWritten
 
 if settings.storage.is_setup:
     engine = create_engine(settings.storage.url, echo=settings.logger.level_in_stdout == "DEBUG")
@@ -14,9 +20,34 @@ if settings.storage.is_setup:
     session = create_session(bind=engine, autocommit=False, autoflush=True)
 
 ListID: TypeAlias = int
+Row: TypeAlias = dict[str, Any]
 
 
-def create_table_and_orm_class(list_id: ListID, c_types_declarations: CTypeDeclaration) -> Any:  # todo how define type?
+def create_table(list_id: ListID, c_types_declarations: CTypeDeclaration, meta: MetaData | None = None,
+                 partition: bool = False) -> Table:
+    """
+    create the table of NVL in DB if it does not exist
+    :param list_id: ID of NVL
+    :param c_types_declarations: variables of NVL, one column per variable
+    :param meta: metadata bound to engine, the module metadata by default
+    :param partition: the table has the column "source" (IP of PLC) for the lists instantiated per source
+    """
+    meta = meta if meta is not None else metadata
+    t = Table(
+        f"{settings.storage.table_name_prefix}_{list_id}",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("ts", DateTime(timezone=True), default=func.now()),
+        *([Column("source", String(45), index=True)] if partition else []),
+        *(Column(c_type.name, c_type.sql_alchemy_type) for c_type in c_types_declarations),
+    )
+    meta.create_all(tables=[t])
+    logger.info("Created " + t.__repr__())
+    return t
+
+
+def create_table_and_orm_class(list_id: ListID, c_types_declarations: CTypeDeclaration,
+                               partition: bool = False) -> Any:  # todo how define type?
     if settings.storage.db_type is None:
         return None
 
@@ -36,14 +67,207 @@ def create_table_and_orm_class(list_id: ListID, c_types_declarations: CTypeDecla
             logger.debug(f"Write to DB is done")
             logger.debug({param: value for param, value in self.__dict__.items() if param[0] != "_"})
 
-    t = Table(
-        f"{settings.storage.table_name_prefix}_{list_id}",
-        metadata,
-        Column("id", Integer, primary_key=True),
-        Column("ts", DateTime(timezone=True), default=func.now()),
-        *(Column(c_type.name, c_type.sql_alchemy_type) for c_type in c_types_declarations),
-    )
-    metadata.create_all(tables=[t])
-    logger.info("Created " + t.__repr__())
-    mapper(Record, t)
+    mapper(Record, create_table(list_id, c_types_declarations, partition=partition))
     return Record
+
+
+class BatchWriter:
+    def __init__(self, table: Table, bind: Engine, batch_size: int = 100, interval_ms: int = 1000) -> None:
+        """
+        collect rows and write them by one executemany INSERT in one transaction
+        :param table: table of NVL
+        :param bind: engine of DB
+        :param batch_size: flush when the buffer has so many rows
+        :param interval_ms: flush when the oldest row in the buffer is older than this
+        """
+        self.table = table
+        self.name = table.name
+        self.bind = bind
+        self.batch_size = batch_size
+        self.interval_ns = interval_ms * 1_000_000
+        self.rows: list[Row] = []
+        self.first_row_ns = 0
+        self.insert = table.insert()
+        labels = {"table": table.name}
+        self.written = statistic.counter(f"db/{table.name}/rows", f"DB: rows written to {table.name}",
+                                         "cnv_db_rows_total", labels)
+        self.flushes = statistic.counter(f"db/{table.name}/flushes", f"DB: transactions to {table.name}",
+                                         "cnv_db_flushes_total", labels)
+        self.flush_time = statistic.duration(f"db/{table.name}/flush", f"Time of DB flush to {table.name}",
+                                             metric="cnv_db_flush_seconds", labels=labels)
+
+    def add(self, row: Row) -> None:
+        if not self.rows:
+            self.first_row_ns = time.monotonic_ns()
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size or self.is_expired():
+            self.flush()
+
+    def is_expired(self, now_ns: int | None = None) -> bool:
+        return bool(self.rows) and (now_ns or time.monotonic_ns()) - self.first_row_ns >= self.interval_ns
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        self.write(rows)
+
+    def write(self, rows: list[Row]) -> None:
+        """
+        write rows by one transaction
+        :raise RowsNotWritten: DB error, the exception has the rows
+        """
+        start = time.perf_counter_ns()
+        try:
+            self._write(rows)
+        except Exception as ex:
+            raise RowsNotWritten(f"{len(rows)} rows are not written to {self.name}: {ex}", rows) from ex
+        self.flush_time.add(time.perf_counter_ns() - start)
+        self.written.value += len(rows)
+        self.flushes.value += 1
+        logger.debug(f"Write {len(rows)} rows to {self.name} is done")
+
+    def _write(self, rows: list[Row]) -> None:
+        with self.bind.begin() as connection:
+            connection.execute(self.insert, rows)
+
+    def close(self) -> None:
+        self.flush()
+
+
+def _copy_text(value: Any) -> str:
+    """
+    text representation of the value for PostgreSQL, without escaping of COPY format
+    """
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "Infinity" if value > 0 else "-Infinity"
+        return repr(value)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return "{" + ",".join(_copy_array_item(item) for item in value) + "}"
+    return str(value)
+
+
+def _copy_array_item(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    text = _copy_text(value)
+    if isinstance(value, (int, float)):
+        return text
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+_COPY_ESCAPE = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def encode_copy_rows(rows: list[Row], columns: list[str]) -> str:
+    """
+    payload of COPY ... FROM STDIN in text format: one line per row, columns are separated by tab
+    :param rows: rows of values
+    :param columns: names of columns in order of COPY statement, the missed value is NULL
+    """
+    lines = []
+    for row in rows:
+        fields = []
+        for column in columns:
+            value = row.get(column)
+            fields.append("\\N" if value is None else _copy_text(value).translate(_COPY_ESCAPE))
+        lines.append("\t".join(fields))
+    return "\n".join(lines) + "\n"
+
+
+class CopyWriter(BatchWriter):
+    def __init__(self, table: Table, bind: Engine, batch_size: int = 100, interval_ms: int = 1000) -> None:
+        """
+        collect rows and write them by COPY ... FROM STDIN of psycopg2, the payload is built from the row values
+        without ORM objects. Other DB or driver - the rows are written by executemany INSERT as BatchWriter
+        :param table: table of NVL
+        :param bind: engine of DB
+        :param batch_size: flush when the buffer has so many rows
+        :param interval_ms: flush when the oldest row in the buffer is older than this
+        """
+        super().__init__(table, bind, batch_size, interval_ms)
+        self.columns = [column.name for column in table.columns if not column.primary_key]
+        preparer = bind.dialect.identifier_preparer
+        self.copy_sql = (f"COPY {preparer.format_table(table)} "
+                         f"({', '.join(preparer.quote(column) for column in self.columns)}) FROM STDIN")
+        self.is_copy = bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+        if not self.is_copy:
+            logger.warning(f"COPY is not supported by {bind.dialect.name}+{bind.dialect.driver}, "
+                           f"{table.name} is written by batch INSERT")
+
+    def _write(self, rows: list[Row]) -> None:
+        if not self.is_copy:
+            return super()._write(rows)
+        payload = io.StringIO(encode_copy_rows(rows, self.columns))
+        connection = self.bind.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(self.copy_sql, payload)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+
+class RowWriter:
+    def __init__(self, orm_class: Any) -> None:
+        """
+        write every row by own transaction through ORM class
+        :param orm_class: class from create_table_and_orm_class
+        """
+        self.orm_class = orm_class
+        self.name = inspect(orm_class).local_table.name
+
+    def add(self, row: Row) -> None:
+        self.write([row])
+
+    def write(self, rows: list[Row]) -> None:
+        """
+        :raise RowsNotWritten: DB error, the exception has the rows which are not written
+        """
+        for i, row in enumerate(rows):
+            record = self.orm_class()
+            for name, value in row.items():
+                record[name] = value
+            try:
+                record.write_to_db()
+            except Exception as ex:
+                session.rollback()
+                raise RowsNotWritten(f"{len(rows) - i} rows are not written to {self.name}: {ex}", rows[i:]) from ex
+
+    def is_expired(self, now_ns: int | None = None) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def create_db_writer(list_id: ListID, c_types_declarations: CTypeDeclaration,
+                     partition: bool = False) -> BatchWriter | RowWriter | None:
+    if settings.storage.db_type is None:
+        return None
+    if settings.storage.write_mode == "row":
+        return RowWriter(create_table_and_orm_class(list_id, c_types_declarations, partition))
+    if settings.storage.write_mode == "copy":
+        return CopyWriter(create_table(list_id, c_types_declarations, partition=partition), engine,
+                          settings.storage.batch_size, settings.storage.batch_interval_ms)
+    return BatchWriter(create_table(list_id, c_types_declarations, partition=partition), engine,
+                       settings.storage.batch_size, settings.storage.batch_interval_ms)
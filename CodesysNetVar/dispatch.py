@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TypeAlias
+
+from loguru import logger
+
+from codesys.nvl_parser import NvlParser, NvlOptions
+from data_packer import DataPacker
+from db_connector import create_db_writer
+from network.parser import Rcv
+from network.server import QueueMessage
+from network.sequence import SequenceTracker
+from persistence import persistence
+from utils.exeptions import PacketWrongLen
+from utils.statistics import statistic, Counter
+
+ListID: TypeAlias = int
+RouteKey: TypeAlias = tuple[str, ListID]  # source IP, list ID
+
+
+class NvlTemplate:
+    def __init__(self, nvl: NvlOptions, per_source: bool = False, max_sources: int = 1000) -> None:
+        """
+        DataPackers of one NVL config. A fixed list has one DataPacker for all senders and own table.
+        A template is instantiated for every sender (a fleet of identical PLCs with the same list ID): every source
+        has own DataPacker with own state of decoding, the rows of all sources go to one table with column "source"
+        :param nvl: NVL config
+        :param per_source: the config is a template
+        :param max_sources: max count of sources of the template, the packets of other sources are dropped
+        """
+        self.nvl = nvl
+        self.per_source = per_source
+        self.max_sources = max_sources
+        c_types_declarations = DataPacker.generate_instance_datatype(nvl.declarations)
+        self.db_writer = create_db_writer(nvl.list_id, c_types_declarations, partition=per_source)
+        if self.db_writer:
+            persistence.register(self.db_writer)
+        self.data_packers: dict[str | None, DataPacker] = {}
+        if not per_source:
+            self.data_packers[None] = DataPacker(nvl, db_writer=self.db_writer)
+
+    def get_data_packer(self, source: str) -> DataPacker | None:
+        """
+        :return: None - the template has max count of sources
+        """
+        if not self.per_source:
+            return self.data_packers[None]
+        if (data_packer := self.data_packers.get(source)) is None:
+            if len(self.data_packers) >= self.max_sources:
+                return None
+            data_packer = self.data_packers[source] = DataPacker(self.nvl, db_writer=self.db_writer, source=source)
+            logger.info(f"New source {source} of list {self.nvl.list_id}")
+        return data_packer
+
+    def close(self) -> None:
+        for data_packer in self.data_packers.values():
+            data_packer.close()
+
+
+@dataclass(slots=True)
+class Route:
+    data_packer: DataPacker
+    sequence_tracker: SequenceTracker
+
+
+class Dispatcher:
+    def __init__(self, templates: dict[ListID, NvlTemplate], drop_out_of_order: bool = False) -> None:
+        """
+        routing of packets by (source IP, list ID): one dict lookup per packet gives the DataPacker and
+        the SequenceTracker of the sender, the route is created by the first packet of the sender
+        :param templates: NVL configs by list ID
+        :param drop_out_of_order: see SequenceTracker
+        """
+        self.templates = templates
+        self.drop_out_of_order = drop_out_of_order
+        self.routes: dict[RouteKey, Route] = {}
+        self.unknown: Counter = statistic.counter("dispatch/unknown", "Dispatch: packets of unknown lists")
+        self.rejected: Counter = statistic.counter("dispatch/rejected", "Dispatch: packets of sources over limit")
+        self.malformed: Counter = statistic.counter("dispatch/malformed", "Dispatch: packets with wrong length")
+
+    @classmethod
+    def from_paths(cls, paths: list[Path], template_paths: list[Path],
+                   max_sources: int = 1000, drop_out_of_order: bool = False) -> "Dispatcher":
+        """
+        :param paths: .gvl files of fixed lists
+        :param template_paths: .gvl files of templates instantiated per source
+        """
+        templates = {}
+        for path, per_source in [(path, False) for path in paths] + [(path, True) for path in template_paths]:
+            nvl_config = NvlParser(path).parse()  # list IDs are unique over all files
+            templates[nvl_config.list_id] = NvlTemplate(nvl_config, per_source, max_sources)
+        return cls(templates, drop_out_of_order)
+
+    def process(self, data: QueueMessage) -> None:
+        """
+        parse, check the sequence and decode one datagram
+        """
+        try:
+            rcv = Rcv(message=data.message, client=data.client, ts_ns=data.ts_ns, ts=data.ts)
+        except PacketWrongLen as ex:
+            if not self.malformed.value:
+                logger.warning(f"{ex} (from {data.client}), such packets are dropped")
+            self.malformed.value += 1
+            return
+        logger.opt(lazy=True).debug("Result of parsing the message:\n{}", rcv.print)
+        if (route := self.route(rcv)) is None:
+            return
+        tracker = route.sequence_tracker
+        tracker.packets.value += 1
+        tracker.bytes.value += len(data.message)
+        if not tracker.check(rcv.n_sends):
+            return
+        route.data_packer.put_data(rcv)
+
+    def close(self) -> None:
+        for template in self.templates.values():
+            template.close()
+
+    def route(self, rcv: Rcv) -> Route | None:
+        """
+        :return: None - the packet is dropped
+        """
+        if (route := self.routes.get((rcv.client_address[0], rcv.id_list))) is None:
+            route = self.create_route(rcv.client_address[0], rcv.id_list)
+        return route
+
+    def create_route(self, source: str, list_id: ListID) -> Route | None:
+        if (template := self.templates.get(list_id)) is None:
+            if not self.unknown.value:
+                logger.warning(f"Packet of unknown list {list_id} from {source}, such packets are dropped")
+            self.unknown.value += 1
+            return None
+        if (data_packer := template.get_data_packer(source)) is None:
+            if not self.rejected.value:
+                logger.warning(f"List {list_id} has {template.max_sources} sources, packets of {source} are dropped")
+            self.rejected.value += 1
+            return None
+        tracker = SequenceTracker(source, list_id, pack=template.nvl.pack, drop_out_of_order=self.drop_out_of_order)
+        route = self.routes[(source, list_id)] = Route(data_packer, tracker)
+        return route
@@ -0,0 +1,206 @@
+import array
+import datetime
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, NamedTuple
+
+from loguru import logger
+
+from codesys.data_types import CTypeDeclaration
+from codesys.frame_index import FrameIndex
+
+CONTENT_TYPE = "application/json"
+
+
+class LastValue(NamedTuple):
+    list_id: int
+    source: str | None
+    path: str
+    value: Any
+    ts: datetime.datetime
+    seq: int  # counter of the packet of NVL (n_sends), the last packet of the frame for not packed NVL
+
+    def to_json(self) -> dict[str, Any]:
+        return {"list_id": self.list_id, "source": self.source, "path": self.path,
+                "value": _json_value(self.value), "ts": self.ts.isoformat(), "seq": self.seq}
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, array.array):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+class ListValues:
+    __slots__ = ("list_id", "source", "frame_index", "frame", "_memo")
+
+    def __init__(self, list_id: int, source: str | None, frame_index: FrameIndex) -> None:
+        """
+        the last frame of one list (of one source for a template). The decoding thread only replaces the frame,
+        the values are unpacked by the readers and remembered until the next frame
+        """
+        self.list_id = list_id
+        self.source = source
+        self.frame_index = frame_index
+        self.frame: tuple[bytes | memoryview, datetime.datetime, int] | None = None
+        self._memo: tuple[Any, dict[str, LastValue]] = (None, {})
+
+    def update(self, data: bytes | memoryview, ts: datetime.datetime, seq: int) -> None:
+        self.frame = (data, ts, seq)
+
+    def to_json(self) -> dict[str, Any]:
+        frame = self.frame
+        return {"list_id": self.list_id, "source": self.source,
+                "ts": frame[1].isoformat() if frame else None, "seq": frame[2] if frame else None}
+
+    def get(self, paths: list[str]) -> list[LastValue]:
+        """
+        values of one frame, the unknown paths are skipped
+        """
+        if (frame := self.frame) is None:
+            return []
+        memo = self._memo
+        if memo[0] is not frame:
+            memo = self._memo = (frame, {})  # the values of the previous frame are not used anymore
+        data, ts, seq = frame
+        values = []
+        for path in paths:
+            if (value := memo[1].get(path)) is None:
+                if path not in self.frame_index.fields:
+                    continue
+                value = memo[1][path] = LastValue(self.list_id, self.source, path,
+                                                  self.frame_index.unpack(data, path), ts, seq)
+            values.append(value)
+        return values
+
+
+class LastValueCache:
+    def __init__(self) -> None:
+        """
+        last values of all lists by (list ID, variable path). The decoding thread does not wait for readers:
+        a frame is one reference, the readers never take a lock
+        """
+        self.lists: dict[int, dict[str | None, ListValues]] = {}  # by list ID and source
+        self.frame_indexes: dict[int, FrameIndex] = {}
+
+    def register(self, list_id: int, source: str | None, c_types_declarations: CTypeDeclaration) -> ListValues:
+        """
+        :param list_id: list ID
+        :param source: IP of the sender of a template, None - the list is not per source
+        :param c_types_declarations: declarations of the NVL
+        """
+        if (frame_index := self.frame_indexes.get(list_id)) is None:
+            frame_index = self.frame_indexes[list_id] = FrameIndex(c_types_declarations)
+        list_values = self.lists.setdefault(list_id, {})[source] = ListValues(list_id, source, frame_index)
+        return list_values
+
+    def _select(self, list_id: int, source: str | None) -> list[ListValues]:
+        sources = self.lists.get(list_id, {})
+        if source is not None:
+            list_values = sources.get(source)
+            return [list_values] if list_values else []
+        return list(sources.values())  # a copy, the sources are added by the decoding thread
+
+    def get(self, list_id: int, paths: list[str], source: str | None = None) -> list[LastValue]:
+        """
+        :param paths: paths of the variables, the values of one source are from one frame
+        :param source: None - values of all sources of the list
+        """
+        return [value for list_values in self._select(list_id, source) for value in list_values.get(paths)]
+
+    def get_many(self, keys: list[tuple[int, str]], source: str | None = None) -> list[LastValue]:
+        paths_by_list: dict[int, list[str]] = {}
+        for list_id, path in keys:
+            paths_by_list.setdefault(list_id, []).append(path)
+        return [value for list_id, paths in paths_by_list.items() for value in self.get(list_id, paths, source)]
+
+    def find(self, list_id: int, prefix: str = "", source: str | None = None) -> list[LastValue]:
+        """
+        values of the paths which start with prefix, e.g. "arr[" - all elements of the array
+        """
+        frame_index = self.frame_indexes.get(list_id)
+        return self.get(list_id, frame_index.find_prefix(prefix), source) if frame_index else []
+
+
+last_values = LastValueCache()
+
+
+def parse_key(text: str) -> tuple[int, str]:
+    """
+    "<list ID>/<path>" to (list ID, path)
+    """
+    list_id, _, path = text.partition("/")
+    return int(list_id), path
+
+
+class LastValueServer:
+    def __init__(self, cache: LastValueCache, address: tuple[str, int]) -> None:
+        """
+        read only HTTP API of the last values in own daemon thread, JSON list of values in every response:
+            GET /values/<list ID>/<path>                  one variable or array element "arr[0]"
+            GET /values?key=<list ID>/<path>&key=...      several variables
+            GET /values?prefix=<list ID>/<prefix>         variables with path by prefix, "1/" - the whole list 1
+            GET /lists                                    lists and sources with the time of the last frame
+        ?source=<IP> selects one sender of a template
+        :param cache: source of the values
+        :param address: local address, localhost by default in settings
+        """
+        self.cache = cache
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa
+                url = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                source = query.get("source", [None])[0]
+                try:
+                    if url.path.startswith("/values/"):
+                        list_id, path = parse_key(urllib.parse.unquote(url.path[len("/values/"):]))
+                        values = cache.get(list_id, [path], source)
+                        if not values:
+                            self.send_error(404)
+                            return
+                        body = [value.to_json() for value in values]
+                    elif url.path == "/values":
+                        values = cache.get_many([parse_key(key) for key in query.get("key", [])], source)
+                        for prefix in query.get("prefix", []):
+                            values.extend(cache.find(*parse_key(prefix), source))
+                        body = [value.to_json() for value in values]
+                    elif url.path == "/lists":
+                        body = [v.to_json() for sources in list(cache.lists.values()) for v in list(sources.values())]
+                    else:
+                        self.send_error(404)
+                        return
+                except ValueError:  # list ID is not a number
+                    self.send_error(400)
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa
+                logger.debug(f"Values API: {self.address_string()} {format % args}")
+
+        self.http_server = ThreadingHTTPServer(address, Handler)
+        self.http_server.daemon_threads = True
+        host, port = self.http_server.server_address[:2]
+        self.address: tuple[str, int] = (str(host), port)
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name="values-api", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        logger.info(f"Last values on http://{self.address[0]}:{self.address[1]}/values")
+
+    def stop(self) -> None:
+        self.http_server.shutdown()
+        self.http_server.server_close()
@@ -0,0 +1,261 @@
+"""
+Load generator of NVL traffic without PLC.
+
+Run from the CodesysNetVar directory:
+    python loadgen.py generate external/exp.gvl --rate 100 --duration 10
+    python loadgen.py generate external/exp.gvl --lists 20 --sources 4 --rate 50
+    python loadgen.py replay archive/ --speed 10
+
+generate - packets of NVL from .gvl files (packed or not packed as in the file), values change every frame.
+replay - datagrams of the raw archive (CNV_ARCHIVE___MODE) with original or accelerated timing.
+"""
+import argparse
+import datetime
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+from archive import ArchiveReader
+from codesys.data_types import (
+    CBool,
+    CTime,
+    CDate,
+    CDateAndTime,
+    CString,
+    CArray,
+    CodesysType,
+    MAX_MS_IN_DAY,
+)
+from codesys.nvl_parser import NvlParser, NvlOptions
+from data_packer import DataPacker
+from network.parser import HEADER
+from settings.settings import settings
+
+CONSTANT = b"\x00-S3\x00\x00\x00\x00"  # identity and ID of Codesys network variables protocol
+N_SENDS_MODULO = 1 << 32
+
+
+def encode_value(c_type: CodesysType, i: int) -> bytes:
+    """
+    raw bytes of a valid value of the variable, the value depends on i
+    """
+    if isinstance(c_type, CArray):
+        return b"".join(encode_value(c_type.c_type, i + k) for k in range(c_type.count))
+    if isinstance(c_type, CString):
+        return str(i).encode()[: c_type.size - 1].ljust(c_type.size, b"\x00")
+    if isinstance(c_type, CBool):
+        return bytes([i % 2])
+    if isinstance(c_type, CTime):
+        return struct.pack("<I", i * 100 % MAX_MS_IN_DAY)
+    if isinstance(c_type, (CDate, CDateAndTime)):
+        return struct.pack("<I", 1_672_531_200 + i * 86_400)
+    fmt = c_type.struct_format
+    if fmt.endswith("s"):
+        return bytes([i % 256]) * c_type.size
+    if fmt in ("f", "d"):
+        return struct.pack("<" + fmt, i / 10)
+    bits = 8 * c_type.size - (1 if fmt.islower() else 0)
+    return struct.pack("<" + fmt, i % (1 << bits))
+
+
+class NvlTraffic:
+    def __init__(self, options: NvlOptions, list_id: int | None = None, variants: int = 16) -> None:
+        """
+        packets of one NVL, the data of frames are prepared once and used in cycle
+        :param options: NVL config
+        :param list_id: ID of list in packets, ID from config by default
+        :param variants: count of different frames
+        """
+        self.list_id = options.list_id if list_id is None else list_id
+        self.pack = options.pack
+        declaration = DataPacker.generate_instance_datatype(options.declarations)
+        self.variants: list[list[bytes]] = []
+        for i in range(variants):
+            if self.pack:
+                self.variants.append([b"".join(encode_value(c_type, i) for c_type in declaration)])
+            else:
+                self.variants.append(self.split_to_slots(declaration, i))
+        self.n_variables = sum(c_type.count if isinstance(c_type, CArray) else 1 for c_type in declaration)
+        self.n_sends = 0
+
+    @staticmethod
+    def split_to_slots(declaration: list[CodesysType], i: int) -> list[bytes]:
+        slots: list[bytes] = []
+        for c_type in declaration:
+            data = encode_value(c_type, i)
+            if isinstance(c_type, CArray):
+                size = c_type.c_type.size
+                slots.extend(data[k * size: (k + 1) * size] for k in range(c_type.count))
+            else:
+                slots.append(data)
+        return slots
+
+    def next_frame(self) -> list[bytes]:
+        """
+        packets of the next frame with the header of Rcv
+        """
+        bodies = self.variants[self.n_sends % len(self.variants)]
+        n_variables = self.n_variables if self.pack else 1
+        packets = [HEADER.pack(CONSTANT, self.list_id, number, n_variables, HEADER.size + len(body), self.n_sends)
+                   + body for number, body in enumerate(bodies)]
+        self.n_sends = (self.n_sends + 1) % N_SENDS_MODULO
+        return packets
+
+
+@dataclass
+class Result:
+    packets: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+
+    def __repr__(self) -> str:
+        rate = self.packets / self.elapsed if self.elapsed else 0.0
+        return (f"{self.packets} packets, {self.bytes / 1e6:.1f} MB in {self.elapsed:.2f} s: "
+                f"{rate:.0f} packets/s, {self.bytes * 8 / max(self.elapsed, 1e-9) / 1e6:.1f} Mbit/s")
+
+
+def wait_until(moment: float) -> None:
+    while (delay := moment - time.perf_counter()) > 0:
+        if delay > 0.002:
+            time.sleep(delay - 0.001)
+
+
+def source_address(k: int) -> str:
+    """
+    k-th address of 127.0.0.0/8: 127.0.0.1, 127.0.0.2 ... 127.0.1.0 ...
+    """
+    n = k + 1
+    return f"127.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def create_sockets(sources: int) -> list[socket.socket]:
+    """
+    one socket per PLC, several sources are bound to 127.0.0.1, 127.0.0.2 ...
+    """
+    sockets = []
+    for k in range(sources):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if sources > 1:
+            sock.bind((source_address(k), 0))
+        sockets.append(sock)
+    return sockets
+
+
+def generate(traffics: list[NvlTraffic], address: tuple[str, int], rate: float, duration: float,
+             sources: int = 1, cycles: int | None = None) -> Result:
+    """
+    every source sends a frame of every list rate times per second
+    :param traffics: lists
+    :param address: address of the service
+    :param rate: frames per second of each list, 0 - as fast as possible
+    :param duration: seconds
+    :param sources: count of PLCs
+    :param cycles: stop after so many frames of each list, None - only duration
+    """
+    sockets = create_sockets(sources)
+    result = Result()
+    pause = 1 / rate if rate else 0.0
+    start = next_cycle = time.perf_counter()
+    cycle = 0
+    try:
+        while time.perf_counter() - start < duration and (cycles is None or cycle < cycles):
+            cycle += 1
+            for traffic in traffics:
+                packets = traffic.next_frame()
+                for sock in sockets:
+                    for packet in packets:
+                        sock.sendto(packet, address)
+                        result.packets += 1
+                        result.bytes += len(packet)
+            if pause:
+                next_cycle += pause
+                wait_until(next_cycle)
+    finally:
+        for sock in sockets:
+            sock.close()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def replay(reader: ArchiveReader, address: tuple[str, int], speed: float,
+           start: datetime.datetime | None = None, end: datetime.datetime | None = None) -> Result:
+    """
+    :param reader: archive of raw datagrams
+    :param address: address of the service
+    :param speed: 1 - original timing, 10 - ten times faster, 0 - as fast as possible
+    :param start: first receive time of frames
+    :param end: last receive time of frames (not included)
+    """
+    result = Result()
+    first_ts_ns = None
+    begin = time.perf_counter()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for frame in reader.frames(start, end):
+            if first_ts_ns is None:
+                first_ts_ns = frame.ts_ns
+            if speed:
+                wait_until(begin + (frame.ts_ns - first_ts_ns) / 1e9 / speed)
+            sock.sendto(frame.payload, address)
+            result.packets += 1
+            result.bytes += len(frame.payload)
+    result.elapsed = time.perf_counter() - begin
+    return result
+
+
+def create_traffics(paths: list[Path], n_lists: int | None) -> list[NvlTraffic]:
+    """
+    lists from .gvl files, more lists than files are copies of the files with the next free IDs
+    """
+    if not paths:
+        raise ValueError("No .gvl files for the traffic")
+    options = [NvlParser(path).parse(check=False) for path in paths]
+    traffics = [NvlTraffic(option) for option in options]
+    next_id = max(option.list_id for option in options) + 1
+    for k in range(len(options), n_lists or 0):
+        traffics.append(NvlTraffic(options[k % len(options)], list_id=next_id))
+        next_id += 1
+    return traffics[: n_lists or len(traffics)]
+
+
+def parse_address(text: str) -> tuple[str, int]:
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", type=parse_address,
+                        default=(str(settings.network.local_ip), settings.network.local_port),
+                        help="host:port of the service, from .env by default")
+    commands = parser.add_subparsers(dest="command", required=True)
+    gen = commands.add_parser("generate", help="packets from .gvl files")
+    gen.add_argument("paths", type=Path, nargs="+", help=".gvl files")
+    gen.add_argument("--rate", type=float, default=10.0, help="frames per second of each list, 0 - max")
+    gen.add_argument("--duration", type=float, default=10.0, help="seconds")
+    gen.add_argument("--lists", type=int, default=None, help="count of lists, the files are copied with new IDs")
+    gen.add_argument("--sources", type=int, default=1, help="count of PLCs, bound to 127.0.0.1, 127.0.0.2 ...")
+    rep = commands.add_parser("replay", help="datagrams from the raw archive")
+    rep.add_argument("path", type=Path, help="directory of archive")
+    rep.add_argument("--speed", type=float, default=1.0, help="1 - original timing, 0 - max")
+    rep.add_argument("--start", type=datetime.datetime.fromisoformat, default=None)
+    rep.add_argument("--end", type=datetime.datetime.fromisoformat, default=None)
+    args = parser.parse_args()
+    logger.remove()
+
+    if args.command == "generate":
+        traffics = create_traffics(args.paths, args.lists)
+        print(f"{len(traffics)} lists ({', '.join(str(t.list_id) for t in traffics)}) "
+              f"from {args.sources} sources to {args.address[0]}:{args.address[1]}")
+        print(generate(traffics, args.address, args.rate, args.duration, args.sources))
+    else:
+        reader = ArchiveReader(args.path)
+        print(replay(reader, args.address, args.speed, args.start, args.end))
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
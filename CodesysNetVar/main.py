@@ -1,47 +1,66 @@
 import queue
-from typing import TypeAlias
-from pathlib import Path
 
 from loguru import logger
 
 from utils.loger_setup import loger_setup
 from settings.settings import settings
-from codesys.nvl_parser import NvlParser, NvlOptions
-from network.server import get_udp_thread_server, QueueMessage
-from network.parser import Rcv
-from data_packer import DataPacker
+from network.server import get_udp_server, QueueMessage
+from network.drop_monitor import DropMonitor
+from network.inbound_queue import create_inbound_queue
+from dispatch import Dispatcher
+from shard import ShardPool
+from persistence import persistence
+from archive import create_archive
+from last_values import last_values, LastValueServer
 from utils.statistics import statistic
+from utils.metrics import MetricsRenderer, MetricsServer
 
 loger_setup()
 
-ListID: TypeAlias = int
-
 
 class Main:
     def __init__(self) -> None:
-        self.nvl_configs = self.create_nvl_configs(settings.nvl.paths)
-        self.data_packers = self.create_data_packers(self.nvl_configs)
-        self.mq_from_client: queue.Queue = queue.Queue(100)
-        self.udp_server_thread = get_udp_thread_server(self.mq_from_client)
-
-    @staticmethod
-    def create_nvl_configs(nvl_paths: list[Path]) -> dict[ListID, NvlOptions]:
-        nvl_configs = {}
-        for path in nvl_paths:
-            nvl_config = NvlParser(path).parse()
-            nvl_configs[nvl_config.list_id] = nvl_config
-        return nvl_configs
+        self.dispatcher: Dispatcher | ShardPool
+        if settings.nvl.processes:
+            self.dispatcher = ShardPool.from_paths(settings.nvl.paths, settings.nvl.templates, settings.nvl.processes,
+                                                   settings.nvl.ring_mb << 20, settings.nvl.max_sources,
+                                                   settings.network.drop_out_of_order)
+        else:
+            self.dispatcher = Dispatcher.from_paths(settings.nvl.paths, settings.nvl.templates,
+                                                    settings.nvl.max_sources, settings.network.drop_out_of_order)
+        self.mq_from_client = create_inbound_queue(settings.network.queue_size, settings.network.queue_policy)
+        self.udp_server_thread = get_udp_server(self.mq_from_client)
+        self.archive = create_archive()
+        self.metrics_server = self.create_metrics_server(settings.metrics.port) \
+            if settings.metrics.port is not None else None
+        self.api_server = LastValueServer(last_values, (str(settings.api.host), settings.api.port)) \
+            if settings.api.port is not None else None
+        if self.api_server and settings.nvl.processes:
+            logger.warning("The lists are decoded in worker processes, the last values API has no values of them, "
+                           "use CNV_NVL___SNAPSHOT")
+        self.drop_monitor = DropMonitor(settings.network.local_port, settings.network.drop_check_interval_ms) \
+            if settings.network.drop_check_interval_ms else None
 
-    @staticmethod
-    def create_data_packers(nvl_configs: dict[ListID, NvlOptions]) -> dict[ListID, DataPacker]:
-        data_packers = {}
-        for list_id, config in nvl_configs.items():
-            dp = DataPacker(config)
-            data_packers[list_id] = dp
-        return data_packers
+    def create_metrics_server(self, port: int) -> MetricsServer:
+        renderer = MetricsRenderer(statistic)
+        renderer.add_gauge("cnv_queue_depth", "Messages waiting for decoding",
+                           lambda: len(self.mq_from_client.queue))  # without the mutex of the queue
+        renderer.add_gauge("cnv_persistence_queue_depth", "Rows waiting for the DB writer thread",
+                           lambda: len(persistence.mq.queue))
+        return MetricsServer(renderer, (str(settings.metrics.host), port))
 
     def run(self) -> None:
+        if isinstance(self.dispatcher, ShardPool):
+            self.dispatcher.start()  # the workers write to DB, the dispatcher process has no persistence
+        else:
+            persistence.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self.api_server:
+            self.api_server.start()
         self.udp_server_thread.start()
+        if self.drop_monitor:
+            self.drop_monitor.start()
         logger.info("The UDP server starting")
         while True:
             self.cycle()
@@ -68,18 +87,35 @@ class Main:
 
     @statistic.timer("Time of data processing")
     def data_processing(self, data: QueueMessage) -> None:
-        rcv = Rcv(message=data.message, client=data.client)
-        logger.debug(f"Result of parsing the message:\n{rcv.print()}")
-        self.data_packers[rcv.id_list].put_data(rcv)
+        if self.archive:
+            self.archive.append(data)
+            if settings.archive.mode == "only":
+                return
+        self.dispatcher.process(data)
 
 
 if __name__ == "__main__":
+    app = None
     try:
         app = Main()
         app.run()
     except KeyboardInterrupt:
         logger.info("\n" + statistic.print_stat_in_table())
+        logger.info(persistence)
     except BaseException as ex:
         logger.exception(ex)
     finally:
+        persistence.stop(timeout=10)
+        if app and isinstance(app.dispatcher, ShardPool):
+            app.dispatcher.stop(timeout=10)
+        elif app:
+            app.dispatcher.close()
+        if app and app.archive:
+            app.archive.close()
+        if app and app.metrics_server:
+            app.metrics_server.stop()
+        if app and app.api_server:
+            app.api_server.stop()
+        if app and app.drop_monitor:
+            app.drop_monitor.stop()
         exit()
@@ -0,0 +1,88 @@
+import threading
+from dataclasses import dataclass
+
+from loguru import logger
+
+from utils.statistics import statistic, Counter
+
+PROC_NET_UDP = ("/proc/net/udp", "/proc/net/udp6")
+
+
+@dataclass
+class UdpSocketStats:
+    drops: int = 0  # datagrams dropped by the kernel since the sockets were created
+    rx_queue: int = 0  # bytes waiting in the receive buffers now
+
+
+def read_udp_stats(port: int, paths: tuple[str, ...] = PROC_NET_UDP) -> UdpSocketStats | None:
+    """
+    the sum over the sockets bound to the local port (SO_REUSEPORT workers)
+    :return: None - the files are not available (not Linux)
+    """
+    stats = None
+    for path in paths:
+        try:
+            with open(path) as file:
+                lines = file.readlines()[1:]
+        except OSError:
+            continue
+        stats = stats or UdpSocketStats()
+        for line in lines:
+            fields = line.split()
+            if len(fields) > 12 and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                stats.drops += int(fields[-1])
+                stats.rx_queue += int(fields[4].split(":")[1], 16)
+    return stats
+
+
+class DropMonitor:
+    def __init__(self, port: int, interval_ms: int = 1000, paths: tuple[str, ...] = PROC_NET_UDP) -> None:
+        """
+        read the counters of the kernel for the receive sockets periodically in own thread: the drops are
+        datagrams lost before the service read them (the receive buffer was full), the max of the receive queue
+        shows how much of the buffer is used. Growth of the drops is logged as a warning
+        :param port: local port of the service
+        :param interval_ms: period of reading
+        :param paths: files of the kernel
+        """
+        self.port = port
+        self.interval = interval_ms / 1000
+        self.paths = paths
+        self.last_drops: int | None = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.serve_forever, name="drop-monitor", daemon=True)
+        self.drops: Counter = statistic.counter("network/kernel_drops", "Network: dropped by kernel (/proc/net/udp)",
+                                                "cnv_udp_kernel_drops_total")
+        self.max_rx_queue: Counter = statistic.counter("network/max_rx_queue", "Network: max bytes in receive buffer",
+                                                       "cnv_udp_rx_queue_max_bytes")
+
+    def check(self) -> int:
+        """
+        :return: new drops since the previous check
+        """
+        if (stats := read_udp_stats(self.port, self.paths)) is None:
+            return 0
+        self.max_rx_queue.value = max(self.max_rx_queue.value, stats.rx_queue)
+        if self.last_drops is None or stats.drops < self.last_drops:  # first check or the sockets were recreated
+            self.last_drops = stats.drops
+            return 0
+        delta, self.last_drops = stats.drops - self.last_drops, stats.drops
+        if delta:
+            self.drops.value += delta
+            logger.warning(f"Kernel dropped {delta} datagrams on port {self.port} (receive queue {stats.rx_queue} "
+                           f"bytes), increase CNV_NETWORK___RECEIVE_BUFFER")
+        return delta
+
+    def serve_forever(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def start(self) -> None:
+        if read_udp_stats(self.port, self.paths) is None:
+            logger.info("Kernel drops are not monitored, /proc/net/udp is not available")
+            return
+        self.check()
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
@@ -0,0 +1,97 @@
+import queue
+from collections import OrderedDict
+from typing import Any, Literal, TypeAlias
+
+from network.server import QueueMessage
+from utils.statistics import statistic, Counter
+
+QueuePolicy: TypeAlias = Literal["block", "drop_newest", "drop_oldest", "latest_per_list"]
+
+
+class DropNewestQueue(queue.Queue):
+    def __init__(self, maxsize: int = 0) -> None:
+        """
+        the queue is full - the new message is dropped, put() never blocks
+        """
+        super().__init__(maxsize)
+        self.dropped: Counter = statistic.counter("queue/dropped/drop_newest",
+                                                  "Inbound queue: dropped newest messages")
+
+    def put(self, item: Any, block: bool = True, timeout: float | None = None) -> None:
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self.dropped.value += 1
+                return
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class DropOldestQueue(queue.Queue):
+    def __init__(self, maxsize: int = 0) -> None:
+        """
+        the queue is full - the oldest message is dropped, put() never blocks
+        """
+        super().__init__(maxsize)
+        self.dropped: Counter = statistic.counter("queue/dropped/drop_oldest",
+                                                  "Inbound queue: dropped oldest messages")
+
+    def put(self, item: Any, block: bool = True, timeout: float | None = None) -> None:
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self._get()
+                self.unfinished_tasks -= 1  # task_done() will not be called for the dropped message
+                self.dropped.value += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class LatestPerListQueue(queue.Queue):
+    def __init__(self, maxsize: int = 0) -> None:
+        """
+        the queue keeps only the latest message per sender, list ID and number of packet (for not packed lists),
+        the older message is replaced in its place, so a slow consumer always gets the freshest frame of each list.
+        The queue is full (more different lists than maxsize) - the oldest message is dropped. put() never blocks
+        """
+        super().__init__(maxsize)
+        self.dropped: Counter = statistic.counter("queue/dropped/latest_per_list",
+                                                  "Inbound queue: replaced by latest messages")
+
+    def _init(self, maxsize: int) -> None:
+        self.queue: OrderedDict[tuple[str, bytes], QueueMessage] = OrderedDict()  # type: ignore
+
+    def _qsize(self) -> int:
+        return len(self.queue)
+
+    def _put(self, item: QueueMessage) -> None:
+        self.queue[(item.client[0], item.message[8:12])] = item  # list ID and number of packet
+
+    def _get(self) -> QueueMessage:
+        return self.queue.popitem(last=False)[1]
+
+    def put(self, item: QueueMessage, block: bool = True, timeout: float | None = None) -> None:
+        with self.not_full:
+            if (item.client[0], item.message[8:12]) in self.queue:
+                self._put(item)
+                self.dropped.value += 1
+                return
+            if 0 < self.maxsize <= self._qsize():
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped.value += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+def create_inbound_queue(maxsize: int, policy: QueuePolicy) -> queue.Queue:
+    match policy:
+        case "drop_newest":
+            return DropNewestQueue(maxsize)
+        case "drop_oldest":
+            return DropOldestQueue(maxsize)
+        case "latest_per_list":
+            return LatestPerListQueue(maxsize)
+        case _:
+            return queue.Queue(maxsize)
@@ -1,5 +1,11 @@
+import datetime
+import struct
+import time
+
 from utils.exeptions import PacketWrongLen
 
+HEADER = struct.Struct("<8sHHHHI")
+
 
 class Rcv:
     __slots__ = (
@@ -11,9 +17,12 @@ class Rcv:
         "count_bytes",
         "n_sends",
         "data_raw",
+        "ts_ns",
+        "ts",
     )
 
-    def __init__(self, message: bytes, client: tuple[str, int]) -> None:
+    def __init__(self, message: bytes, client: tuple[str, int],
+                 ts_ns: int | None = None, ts: datetime.datetime | None = None) -> None:
         """
         class receive data, parse data and check len of received data
         
@@ -32,24 +41,34 @@ class Rcv:
                                                       000000...
                                                                 ^ X byte - Data
 
+        The header is decoded with one precompiled struct, the data is a memoryview of the message (no copy)
 
         :param message: raw bytes received data
         :param client: senders address
+        :param ts_ns: receive time, monotonic clock in ns
+        :param ts: receive time, wall clock
         """
         self.client_address = client
-        self._constant = message[:8]
-        self.id_list = int.from_bytes(message[8:10], "little")
-        self.n_package_in_list = int.from_bytes(message[10:12], "little")
-        self.count_variable_in_packet = int.from_bytes(message[12:14], "little")
-        self.count_bytes = int.from_bytes(message[14:16], "little")
-        self.n_sends = int.from_bytes(message[16:20], "little")
-        self.data_raw = message[20:]
+        self.ts_ns = ts_ns or time.monotonic_ns()
+        self.ts = ts or datetime.datetime.now()
         self.check_packet(message)
-
-    def check_packet(self, message: bytes) -> None:
+        (
+            self._constant,
+            self.id_list,
+            self.n_package_in_list,
+            self.count_variable_in_packet,
+            self.count_bytes,
+            self.n_sends,
+        ) = HEADER.unpack_from(message)
+        self.data_raw = memoryview(message)[HEADER.size:]
         if len(message) != self.count_bytes:
             raise PacketWrongLen("The receive packet has wrong len")
 
+    @staticmethod
+    def check_packet(message: bytes) -> None:
+        if len(message) < HEADER.size:
+            raise PacketWrongLen("The receive packet is shorter than header")
+
     def print(self) -> str:
         text = f"""Unknown data {self._constant!r}
 ID list: {self.id_list!r}
@@ -57,6 +76,6 @@ Number of packets in unpacked data: {self.n_package_in_list!r}
 Number of variables in the package: {self.count_variable_in_packet!r}
 Package length: {self.count_bytes!r}
 Common Packet number: {self.n_sends!r}
-Data: {self.data_raw!r}
+Data: {bytes(self.data_raw)!r}
 """
         return text
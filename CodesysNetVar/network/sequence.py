@@ -0,0 +1,71 @@
+from loguru import logger
+
+from utils.statistics import statistic, Counter
+
+N_SENDS_MODULO = 1 << 32  # "Common Packet number" is DWORD
+MAX_REORDER_DISTANCE = 64  # the packet, which is older on more packets, is a restart of the sender
+
+
+class SequenceTracker:
+    def __init__(self, client_ip: str, list_id: int, pack: bool, drop_out_of_order: bool):
+        """
+        tracking of "Common Packet number" (n_sends) of the packets of one list from one sender.
+        Counts lost packets (gaps), duplicates, reordering and wraparound of the counter
+        :param client_ip: address of the sender
+        :param list_id: ID of the list
+        :param pack: NVL is packed, else all packets of one frame have the same n_sends
+        :param drop_out_of_order: the duplicates and the packets older than the last one are not processed
+        """
+        self.pack = pack
+        self.drop_out_of_order = drop_out_of_order
+        self.last: int | None = None
+        key, text = f"sequence/{client_ip}/{list_id}", f"{client_ip} list {list_id}:"
+        labels = {"source": client_ip, "list_id": list_id}
+
+        def counter(kind: str, description: str) -> Counter:
+            return statistic.counter(f"{key}/{kind}", f"{text} {description}", f"cnv_sequence_{kind}_total", labels)
+
+        self.lost = counter("lost", "lost packets")
+        self.duplicated = counter("duplicated", "duplicated packets")
+        self.reordered = counter("reordered", "reordered packets")
+        self.wraparound = counter("wraparound", "wraparound of packet number")
+        self.restarts = counter("restarts", "restarts of sender")
+        self.dropped = counter("dropped", "dropped out of order packets")
+        self.packets = statistic.counter(f"{key}/packets", f"{text} received packets",
+                                         "cnv_received_packets_total", labels)
+        self.bytes = statistic.counter(f"{key}/bytes", f"{text} received bytes", "cnv_received_bytes_total", labels)
+
+    def check(self, n_sends: int) -> bool:
+        """
+        :param n_sends: common packet number of the received packet
+        :return: False, if the packet has to be dropped
+        """
+        if self.last is None:
+            self.last = n_sends
+            return True
+        delta = (n_sends - self.last) % N_SENDS_MODULO
+        if delta == 0:
+            if not self.pack:
+                return True  # the next packet of the same frame
+            self.duplicated.value += 1
+            return self._skip()
+        if delta < N_SENDS_MODULO // 2:
+            if delta > 1:
+                self.lost.value += delta - 1
+            if n_sends < self.last:
+                self.wraparound.value += 1
+            self.last = n_sends
+            return True
+        if N_SENDS_MODULO - delta > MAX_REORDER_DISTANCE:
+            logger.warning(f"Packet number jumped back from {self.last} to {n_sends}, the sender was restarted")
+            self.restarts.value += 1
+            self.last = n_sends
+            return True
+        self.reordered.value += 1
+        return self._skip()
+
+    def _skip(self) -> bool:
+        if self.drop_out_of_order:
+            self.dropped.value += 1
+            return False
+        return True
@@ -1,18 +1,28 @@
 from typing import Any
+import asyncio
+import ctypes
+import datetime
+import errno
 import queue
+import socket
+import sys
+import time
 from socketserver import BaseRequestHandler, ThreadingUDPServer
 import threading
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from loguru import logger
 
 from settings.settings import settings
+from utils.statistics import statistic, Counter
 
 
 @dataclass
 class QueueMessage:
     client: tuple[str, int]
     message: bytes
+    ts_ns: int = field(default_factory=time.monotonic_ns)  # receive time for measuring intervals
+    ts: datetime.datetime = field(default_factory=datetime.datetime.now)  # receive time for storing
 
 
 def _get_handler_with_settings(mq_from_client: queue.Queue) -> Any:  # todo how define type?
@@ -36,10 +46,317 @@ def _get_handler_with_settings(mq_from_client: queue.Queue) -> Any:  # todo how
     return Handler
 
 
-def get_udp_thread_server(mq_from_client: queue.Queue) -> threading.Thread:
+SO_RCVBUFFORCE = getattr(socket, "SO_RCVBUFFORCE", 33)  # values of Linux
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)
+
+
+def _get_local_address() -> tuple[str, int]:
+    return str(settings.network.local_ip), settings.network.local_port
+
+
+def set_receive_buffer(sock: socket.socket, size: int | None = None, force: bool | None = None) -> int:
+    """
+    size of the kernel receive buffer of the socket. SO_RCVBUF is limited by net.core.rmem_max,
+    SO_RCVBUFFORCE is not, but requires CAP_NET_ADMIN
+    :param size: bytes, None - from settings, 0 - the default of the system
+    :param force: use SO_RCVBUFFORCE, None - from settings
+    :return: effective size, the kernel doubles the requested size for its bookkeeping
+    """
+    size = settings.network.receive_buffer if size is None else size
+    force = settings.network.receive_buffer_force if force is None else force
+    if size:
+        if force:
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, SO_RCVBUFFORCE, size)
+            except OSError as ex:
+                logger.warning(f"SO_RCVBUFFORCE is not permitted ({ex}), SO_RCVBUF is used")
+                force = False
+        if not force:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+    effective = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if size and effective < size:
+        logger.warning(f"Receive buffer is {effective} bytes instead of {size}, it is limited by net.core.rmem_max: "
+                       f"raise the sysctl or set CNV_NETWORK___RECEIVE_BUFFER_FORCE")
+    logger.info(f"Receive buffer of UDP socket is {effective} bytes")
+    return effective
+
+
+class _RxqOverflow:
+    def __init__(self) -> None:
+        """
+        datagrams dropped by the kernel for one socket with SO_RXQ_OVFL: the kernel attaches the total count of drops
+        of the socket to the next datagram, the counter gets the increments
+        """
+        self.last = 0
+        self.dropped: Counter = statistic.counter("network/rxq_overflow", "Network: dropped by kernel (SO_RXQ_OVFL)",
+                                                  "cnv_udp_rxq_overflow_total")
+
+    @staticmethod
+    def enable(sock: socket.socket) -> bool:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+        except OSError:
+            return False
+        return True
+
+    def update(self, total: int) -> None:
+        if total != self.last:
+            delta = (total - self.last) % (1 << 32)
+            self.last = total
+            self.dropped.value += delta  # the warning is logged by DropMonitor
+
+
+def get_udp_thread_server(mq_from_client: queue.Queue,
+                          address: tuple[str, int] | None = None) -> threading.Thread:
+    address = address or _get_local_address()
     _handler = _get_handler_with_settings(mq_from_client)
-    _upd_server = ThreadingUDPServer((str(settings.network.local_ip), settings.network.local_port), _handler)
-    logger.info(f"Create UDP server on {settings.network.local_ip}:{settings.network.local_port}")
+    _upd_server = ThreadingUDPServer(address, _handler)
+    set_receive_buffer(_upd_server.socket)
+    logger.info(f"Create UDP server on {address[0]}:{address[1]}")
     udp_server_thread = threading.Thread(target=_upd_server.serve_forever)
     udp_server_thread.daemon = True
     return udp_server_thread
+
+
+class DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, mq_from_client: queue.Queue) -> None:
+        """
+        asyncio protocol, every datagram is put in the queue straight from the event loop
+        without creating a thread per datagram
+        :param mq_from_client: queue for the received messages
+        """
+        self.mq_from_client = mq_from_client
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        self.mq_from_client.put(QueueMessage(client=addr, message=data))
+
+    def error_received(self, exc: Exception) -> None:
+        logger.error(f"UDP receive error: {exc!r}")
+
+
+def get_udp_asyncio_server(mq_from_client: queue.Queue,
+                           address: tuple[str, int] | None = None) -> threading.Thread:
+    address = address or _get_local_address()
+
+    def serve_forever() -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            set_receive_buffer(sock)
+            sock.bind(address)
+            loop.run_until_complete(loop.create_datagram_endpoint(lambda: DatagramProtocol(mq_from_client), sock=sock))
+            loop.run_forever()
+        except Exception as ex:
+            logger.exception(ex)
+        finally:
+            loop.close()
+
+    logger.info(f"Create asyncio UDP server on {address[0]}:{address[1]}")
+    udp_server_thread = threading.Thread(target=serve_forever)
+    udp_server_thread.daemon = True
+    return udp_server_thread
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+
+class _CMsgHdr(ctypes.Structure):
+    _fields_ = [("cmsg_len", ctypes.c_size_t), ("cmsg_level", ctypes.c_int), ("cmsg_type", ctypes.c_int)]
+
+
+MSG_WAITFORONE = 0x10000
+CONTROL_SIZE = socket.CMSG_SPACE(4)  # one cmsg of SO_RXQ_OVFL with uint32
+
+
+def _get_recvmmsg() -> Any:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        recvmmsg = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    return recvmmsg
+
+
+_recvmmsg = _get_recvmmsg()
+
+
+class _RecvMmsgReader:
+    def __init__(self, sock: socket.socket, batch_size: int, buffer_size: int) -> None:
+        """
+        read up to batch_size datagrams per syscall with recvmmsg(2) into preallocated buffers,
+        the count of kernel drops comes with the datagrams in SO_RXQ_OVFL control messages
+        """
+        self.sock = sock
+        self.fileno = sock.fileno()
+        self.batch_size = batch_size
+        self.buffer_size = buffer_size
+        self.overflow = _RxqOverflow() if _RxqOverflow.enable(sock) else None
+        self.controls = (ctypes.c_char * (batch_size * CONTROL_SIZE))()
+        self.buffer = (ctypes.c_char * (batch_size * buffer_size))()
+        self.view = memoryview(self.buffer).cast("B")
+        self.addresses = (_SockAddrIn * batch_size)()
+        self.iovecs = (_IoVec * batch_size)()
+        self.headers = (_MMsgHdr * batch_size)()
+        base = ctypes.addressof(self.buffer)
+        for i in range(batch_size):
+            self.iovecs[i].iov_base = base + i * buffer_size
+            self.iovecs[i].iov_len = buffer_size
+            hdr = self.headers[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self.addresses[i])
+            hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            hdr.msg_iovlen = 1
+            if self.overflow:
+                hdr.msg_control = ctypes.addressof(self.controls) + i * CONTROL_SIZE
+
+    def read(self) -> list[QueueMessage]:
+        for i in range(self.batch_size):
+            self.headers[i].msg_hdr.msg_namelen = ctypes.sizeof(_SockAddrIn)
+            self.headers[i].msg_hdr.msg_flags = 0
+            if self.overflow:
+                self.headers[i].msg_hdr.msg_controllen = CONTROL_SIZE
+        while (count := _recvmmsg(self.fileno, self.headers, self.batch_size, MSG_WAITFORONE, None)) < 0:
+            if (err := ctypes.get_errno()) != errno.EINTR:
+                raise OSError(err, f"recvmmsg: {errno.errorcode.get(err, err)}")
+        messages = []
+        ts_ns, ts = time.monotonic_ns(), datetime.datetime.now()
+        for i in range(count):
+            if self.overflow and self.headers[i].msg_hdr.msg_controllen:
+                self.read_overflow(i)
+            if self.headers[i].msg_hdr.msg_flags & socket.MSG_TRUNC:
+                logger.warning(f"Datagram is longer than {self.buffer_size} bytes and was dropped")
+                continue
+            address = self.addresses[i]
+            start = i * self.buffer_size
+            messages.append(QueueMessage(
+                client=(socket.inet_ntoa(bytes(address.sin_addr)), socket.ntohs(address.sin_port)),
+                message=bytes(self.view[start: start + self.headers[i].msg_len]),
+                ts_ns=ts_ns,
+                ts=ts,
+            ))
+        return messages
+
+    def read_overflow(self, i: int) -> None:
+        cmsg = _CMsgHdr.from_buffer(self.controls, i * CONTROL_SIZE)
+        if cmsg.cmsg_level == socket.SOL_SOCKET and cmsg.cmsg_type == SO_RXQ_OVFL:
+            offset = i * CONTROL_SIZE + socket.CMSG_LEN(0)
+            self.overflow.update(ctypes.c_uint32.from_buffer(self.controls, offset).value)  # type: ignore
+
+
+class _RecvMsgIntoReader:
+    def __init__(self, sock: socket.socket, batch_size: int, buffer_size: int) -> None:
+        """
+        read up to batch_size datagrams per wakeup with recvmsg_into into preallocated buffers:
+        blocks for the first datagram and takes the rest that are already in the socket buffer
+        """
+        self.sock = sock
+        self.buffer_size = buffer_size
+        self.buffers = [memoryview(bytearray(buffer_size)) for _ in range(batch_size)]
+        self.overflow = _RxqOverflow() if _RxqOverflow.enable(sock) else None
+        self.control_size = CONTROL_SIZE if self.overflow else 0
+
+    def read(self) -> list[QueueMessage]:
+        messages = []
+        flags = 0
+        for buffer in self.buffers:
+            try:
+                n_bytes, ancdata, msg_flags, client = self.sock.recvmsg_into([buffer], self.control_size, flags)
+            except BlockingIOError:
+                break
+            flags = socket.MSG_DONTWAIT
+            for level, kind, data in ancdata:
+                if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                    self.overflow.update(int.from_bytes(data[:4], sys.byteorder))  # type: ignore
+            if msg_flags & socket.MSG_TRUNC:
+                logger.warning(f"Datagram is longer than {self.buffer_size} bytes and was dropped")
+                continue
+            messages.append(QueueMessage(client=client, message=bytes(buffer[:n_bytes])))
+        return messages
+
+
+class BatchUdpReceiver:
+    def __init__(self, mq_from_client: queue.Queue,
+                 address: tuple[str, int] | None = None,
+                 workers: int | None = None,
+                 batch_size: int | None = None,
+                 buffer_size: int = ThreadingUDPServer.max_packet_size) -> None:
+        """
+        UDP receiver, which reads many datagrams per syscall (recvmmsg where available, else recvmsg_into).
+        With several workers every worker has own socket bound with SO_REUSEPORT to the same address,
+        the kernel balances senders between them
+        :param mq_from_client: queue for the received messages
+        :param address: local address, by default from settings
+        :param workers: count of receiver threads
+        :param batch_size: max count of datagrams per one read
+        :param buffer_size: max size of datagram
+        """
+        self.mq_from_client = mq_from_client
+        self.address = address or _get_local_address()
+        self.workers = workers or settings.network.receive_workers
+        self.batch_size = batch_size or settings.network.receive_batch_size
+        self.buffer_size = buffer_size
+        self.threads: list[threading.Thread] = []
+
+    def create_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.workers > 1:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        set_receive_buffer(sock)
+        sock.bind(self.address)
+        return sock
+
+    def start(self) -> None:
+        reader_class = _RecvMmsgReader if _recvmmsg else _RecvMsgIntoReader
+        for i in range(self.workers):
+            reader = reader_class(self.create_socket(), self.batch_size, self.buffer_size)
+            thread = threading.Thread(target=self.serve_forever, args=(reader,), name=f"udp-receiver-{i}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Create {self.workers} batch UDP receivers ({reader_class.__name__}) "
+                    f"on {self.address[0]}:{self.address[1]}")
+
+    def serve_forever(self, reader: _RecvMmsgReader | _RecvMsgIntoReader) -> None:
+        while True:
+            for qm in reader.read():
+                self.mq_from_client.put(qm)
+
+
+def get_udp_server(mq_from_client: queue.Queue) -> threading.Thread | BatchUdpReceiver:
+    match settings.network.receive_mode:
+        case "asyncio":
+            return get_udp_asyncio_server(mq_from_client)
+        case "batch":
+            return BatchUdpReceiver(mq_from_client)
+        case _:
+            return get_udp_thread_server(mq_from_client)
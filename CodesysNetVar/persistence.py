@@ -0,0 +1,250 @@
+import queue
+import time
+from threading import Thread
+from typing import Any, Literal, Protocol
+
+from loguru import logger
+
+from settings.settings import settings
+from spill import SpillBuffer, Row
+from utils.exeptions import RowsNotWritten
+from utils.statistics import statistic, Counter
+
+
+class Sink(Protocol):
+    name: str
+
+    def add(self, row: Row) -> None: ...
+
+    def write(self, rows: list[Row]) -> None: ...
+
+    def is_expired(self, now_ns: int | None = None) -> bool: ...
+
+    def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class PersistenceWorker:
+    def __init__(self, maxsize: int = 1000, idle_timeout: float = 0.1, spill: SpillBuffer | None = None,
+                 retry_ms: int = 5000, spill_batch_size: int = 100,
+                 queue_policy: Literal["block", "drop"] = "block") -> None:
+        """
+        write rows to sinks (DB writers) in own thread, so the decoding loop does not wait for every write.
+        The queue is full - the decoding loop waits for DB (policy "block") or the row is dropped and counted
+        (policy "drop").
+        DB error - the rows go to the spill on disk and DB is not used for retry_ms, then the spill is drained
+        by one batch between new rows
+        :param maxsize: max count of rows waiting for writing
+        :param idle_timeout: period of checking the time flush of sinks when there are no new rows, seconds
+        :param spill: spill buffer, None - the rows are lost when DB is not available
+        :param retry_ms: period of reconnect to DB after error
+        :param spill_batch_size: count of rows in one batch of spill while DB is not available
+        :param queue_policy: "block" - a slow DB slows down the decoding, "drop" - the decoding never waits for DB
+        """
+        self.mq: queue.Queue[tuple[Sink, Row] | None] = queue.Queue(maxsize)
+        self.idle_timeout = idle_timeout
+        self.drop_when_full = queue_policy == "drop"
+        self.spill = spill
+        self.retry_ns = retry_ms * 1_000_000
+        self.spill_batch_size = spill_batch_size
+        self.sinks: dict[str, Sink] = {}
+        self.pending: dict[str, list[Row]] = {}  # new rows while DB is not available
+        self.down_until_ns = 0
+        self.thread = Thread(target=self.serve_forever, name="persistence", daemon=True)
+        self.start_ns = 0
+        self.drain_ns = 0
+        self.rows: Counter = statistic.counter("persistence/rows", "Persistence: rows handed to DB writers")
+        self.dropped: Counter = statistic.counter("persistence/dropped", "Persistence: rows dropped, queue is full")
+        self.errors: Counter = statistic.counter("persistence/errors", "Persistence: errors of DB writers")
+        self.lost: Counter = statistic.counter("persistence/lost", "Persistence: rows lost by DB errors")
+        self.drained: Counter = statistic.counter("persistence/drained", "Persistence: rows drained from spill")
+        self.max_depth: Counter = statistic.counter("persistence/max_depth", "Persistence: max depth of queue",
+                                                    "cnv_persistence_queue_max_depth")
+
+    def register(self, sink: Sink) -> None:
+        """
+        the spilled rows of the sink can be drained before the sink gets a new row
+        """
+        self.sinks[sink.name] = sink
+
+    def start(self) -> None:
+        self.start_ns = time.monotonic_ns()
+        self.thread.start()
+
+    def put(self, sink: Sink, row: Row) -> None:
+        if not self.drop_when_full:
+            self.mq.put((sink, row))
+        else:
+            try:
+                self.mq.put_nowait((sink, row))
+            except queue.Full:
+                if not self.dropped.value:
+                    logger.warning(f"Persistence queue is full ({self.mq.maxsize} rows), DB is slow, "
+                                   f"such rows are dropped")
+                self.dropped.value += 1
+                return
+        if (depth := self.mq.qsize()) > self.max_depth.value:
+            self.max_depth.value = depth
+
+    def serve_forever(self) -> None:
+        while True:
+            try:
+                item = self.mq.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self.flush_expired()
+                self.spill_pending()
+                self.drain()
+                continue
+            if item is None:
+                self.mq.task_done()
+                break
+            sink, row = item
+            self.sinks.setdefault(sink.name, sink)
+            self.write_row(sink, row)
+            self.mq.task_done()
+            self.drain()
+        self.close_sinks()
+
+    @property
+    def is_db_down(self) -> bool:
+        return time.monotonic_ns() < self.down_until_ns
+
+    def write_row(self, sink: Sink, row: Row) -> None:
+        if self.is_db_down:
+            pending = self.pending.setdefault(sink.name, [])
+            pending.append(row)
+            if len(pending) >= self.spill_batch_size:
+                self.spill_rows(sink.name, self.pending.pop(sink.name))
+            return
+        try:
+            sink.add(row)
+            self.rows.value += 1
+        except RowsNotWritten as ex:
+            self.on_db_error(sink.name, ex)
+        except Exception as ex:
+            self.errors.value += 1
+            logger.exception(ex)
+
+    def on_db_error(self, name: str, ex: RowsNotWritten) -> None:
+        self.errors.value += 1
+        logger.error(ex)
+        self.spill_rows(name, ex.rows)
+        if self.spill is not None:
+            self.down_until_ns = time.monotonic_ns() + self.retry_ns
+
+    def spill_rows(self, name: str, rows: list[Row]) -> None:
+        if self.spill is None:
+            self.lost.value += len(rows)
+            return
+        try:
+            self.spill.append(name, rows)
+        except OSError as ex:
+            self.lost.value += len(rows)
+            logger.exception(ex)
+
+    def spill_pending(self) -> None:
+        for name in list(self.pending):
+            self.spill_rows(name, self.pending.pop(name))
+
+    def drain(self) -> None:
+        """
+        write one batch from the spill to DB
+        """
+        if self.spill is None or not len(self.spill) or self.is_db_down:
+            return
+        start = time.monotonic_ns()
+        if (batch := self.spill.peek()) is None:
+            return
+        name, rows = batch
+        if (sink := self.sinks.get(name)) is None:
+            logger.warning(f"{len(rows)} spilled rows of unknown {name} are skipped")
+            self.lost.value += len(rows)
+            self.spill.pop()
+            return
+        try:
+            sink.write(rows)
+        except Exception as ex:
+            self.errors.value += 1
+            logger.error(ex)
+            self.down_until_ns = time.monotonic_ns() + self.retry_ns
+            return
+        self.spill.pop()
+        self.drained.value += len(rows)
+        self.drain_ns += time.monotonic_ns() - start
+        if not len(self.spill):
+            logger.info(f"Spill is drained: {self.drained.value} rows, {self.drain_rows_per_second:.0f} rows/s")
+
+    def flush_expired(self) -> None:
+        if self.is_db_down:
+            return
+        now_ns = time.monotonic_ns()
+        for sink in self.sinks.values():
+            try:
+                if sink.is_expired(now_ns):
+                    sink.flush()
+            except RowsNotWritten as ex:
+                self.on_db_error(sink.name, ex)
+            except Exception as ex:
+                self.errors.value += 1
+                logger.exception(ex)
+
+    def close_sinks(self) -> None:
+        for sink in self.sinks.values():
+            try:
+                sink.close()
+            except RowsNotWritten as ex:
+                self.on_db_error(sink.name, ex)
+            except Exception as ex:
+                self.errors.value += 1
+                logger.exception(ex)
+        self.spill_pending()
+        if self.spill is not None:
+            self.spill.close()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        write all queued rows, final flush of sinks and stop the thread
+        :param timeout: max time of waiting, seconds
+        """
+        if not self.thread.is_alive():
+            return
+        self.mq.put(None, timeout=timeout)
+        self.thread.join(timeout)
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self.start_ns:
+            return 0.0
+        return self.rows.value / max(time.monotonic_ns() - self.start_ns, 1) * 1e9
+
+    @property
+    def drain_rows_per_second(self) -> float:
+        return self.drained.value / max(self.drain_ns, 1) * 1e9
+
+    def __repr__(self) -> str:
+        res = (f"Persistence: {self.rows.value} rows, {self.rows_per_second:.1f} rows/s, "
+               f"queue {self.mq.qsize()}/{self.mq.maxsize} (max {self.max_depth.value}), "
+               f"dropped {self.dropped.value}")
+        if self.spill is not None:
+            res += (f", spill {len(self.spill)} bytes, drained {self.drained.value} rows "
+                    f"({self.drain_rows_per_second:.0f} rows/s)")
+        return res
+
+
+def create_spill(shard: int | None = None) -> SpillBuffer | None:
+    """
+    :param shard: index of the shard worker, every worker has own directory "shard-<index>" in spill_path
+    """
+    if settings.storage.spill_path is None:
+        return None
+    directory = settings.storage.spill_path if shard is None else settings.storage.spill_path / f"shard-{shard}"
+    return SpillBuffer(directory, settings.storage.spill_max_mb << 20, settings.storage.spill_segment_mb << 20)
+
+
+# in multi-process mode the dispatcher process has no sinks, the spills are created by the shard workers
+persistence = PersistenceWorker(settings.storage.queue_size,
+                                spill=create_spill() if not settings.nvl.processes else None,
+                                retry_ms=settings.storage.retry_interval_ms,
+                                spill_batch_size=settings.storage.batch_size,
+                                queue_policy=settings.storage.queue_policy)
@@ -2,7 +2,7 @@ from typing import Any, Literal
 from ipaddress import IPv4Address
 from pathlib import Path
 
-from pydantic import BaseSettings, Field, FilePath
+from pydantic import BaseSettings, Field, FilePath, validator
 from loguru import logger
 
 BASE_DIRECTORY = Path(__file__).parent
@@ -17,6 +17,15 @@ class AdvancedSettings(BaseSettings):
 class Network(AdvancedSettings):
     local_ip: IPv4Address = Field(IPv4Address("127.0.0.1"))
     local_port: int = Field(1202)
+    receive_mode: Literal["asyncio", "batch", "thread"] = Field("asyncio")
+    receive_workers: int = Field(1)
+    receive_batch_size: int = Field(64)
+    drop_out_of_order: bool = Field(False)
+    queue_size: int = Field(100)
+    queue_policy: Literal["block", "drop_newest", "drop_oldest", "latest_per_list"] = Field("block")
+    receive_buffer: int | None = Field(None)
+    receive_buffer_force: bool = Field(False)
+    drop_check_interval_ms: int = Field(1000)
 
     class Config:
         env_prefix = "CNV_NETWORK___"
@@ -30,6 +39,18 @@ class Storage(AdvancedSettings):
     password: str = Field("")
     db_name: str = Field("mydb")
     table_name_prefix: str = Field("nvl")
+    write_mode: Literal["batch", "copy", "row"] = Field("batch")
+    batch_size: int = Field(100)
+    batch_interval_ms: int = Field(1000)
+    queue_size: int = Field(1000)
+    queue_policy: Literal["block", "drop"] = Field("block")
+    retry_interval_ms: int = Field(5000)
+    spill_path: Path | None = Field(None)
+    spill_max_mb: int = Field(1024)
+    spill_segment_mb: int = Field(16)
+    change_only: bool = Field(False)
+    deadbands: dict[str, float | str] = Field({})
+    heartbeat_ms: int = Field(60000)
 
     @property
     def url(self) -> str:
@@ -51,11 +72,50 @@ class Storage(AdvancedSettings):
 
 class NVL(AdvancedSettings):
     paths: list[Path] = Field(["external/exp.gvl"])
+    templates: list[Path] = Field([])
+    max_sources: int = Field(1000)
+    processes: int = Field(0)
+    ring_mb: int = Field(16)
+    compiled_decoder: bool = Field(True)
+    unpack_timeout_ms: int = Field(1000)
+    snapshot: bool = Field(False)
+
+    @validator("ring_mb")
+    def ring_mb_is_power_of_2(cls, value: int) -> int:
+        if value < 1 or value & (value - 1):
+            raise ValueError(f"Size of ring {value} MB must be power of 2")
+        return value
 
     class Config:
         env_prefix = "CNV_NVL___"
 
 
+class Archive(AdvancedSettings):
+    mode: Literal["off", "alongside", "only"] = Field("off")
+    path: Path = Field(Path("archive/"))
+    segment_mb: int = Field(64)
+    index_interval_ms: int = Field(1000)
+
+    class Config:
+        env_prefix = "CNV_ARCHIVE___"
+
+
+class Metrics(AdvancedSettings):
+    port: int | None = Field(None)
+    host: IPv4Address = Field(IPv4Address("127.0.0.1"))
+
+    class Config:
+        env_prefix = "CNV_METRICS___"
+
+
+class Api(AdvancedSettings):
+    port: int | None = Field(None)
+    host: IPv4Address = Field(IPv4Address("127.0.0.1"))
+
+    class Config:
+        env_prefix = "CNV_API___"
+
+
 class Logger(AdvancedSettings):
     level_in_stdout: Literal["DEBUG", "INFO", "WARNING", "ERROR"] | None = Field("DEBUG")
     level_in_file: Literal["DEBUG", "INFO", "WARNING", "ERROR"] | None = Field(None)
@@ -69,6 +129,9 @@ class Settings(BaseSettings):
     network = Network()
     storage = Storage()
     nvl = NVL()
+    archive = Archive()
+    metrics = Metrics()
+    api = Api()
     logger = Logger()
 
 
@@ -78,4 +141,7 @@ logger.info("List of env variables:")
 logger.info(settings.network.dict())
 logger.info(settings.storage.dict(exclude={"password"}))
 logger.info(settings.nvl.dict())
+logger.info(settings.archive.dict())
+logger.info(settings.metrics.dict())
+logger.info(settings.api.dict())
 logger.info(settings.logger.dict())
@@ -0,0 +1,233 @@
+import datetime
+import multiprocessing
+import socket
+import struct
+import time
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Event
+from pathlib import Path
+
+from loguru import logger
+
+from codesys.nvl_parser import NvlParser, NvlOptions
+from dispatch import Dispatcher, NvlTemplate
+from network.server import QueueMessage
+from persistence import persistence, create_spill
+from utils.loger_setup import loger_setup
+from utils.statistics import statistic, Counter
+
+RECORD = struct.Struct("<IH4sqq")  # length of datagram, port, IP, monotonic ns, epoch ns of receive
+WRAP = 0xFFFFFFFF  # length of the record: the rest of the ring is empty, the next record is at the start
+HEAD, TAIL, DONE = 0, 8, 16  # uint64 indexes in the header, every counter has own cache line
+DATA = 192  # offset of the ring in the block
+IDLE_SLEEP = 0.0005  # seconds, the worker polls the empty ring
+
+
+class SpscRing:
+    def __init__(self, name: str | None = None, size: int = 1 << 24) -> None:
+        """
+        ring of datagrams in shared memory for one producer (dispatcher) and one consumer (worker process).
+        The producer only moves head, the consumer only moves tail, the positions grow monotonically, so no lock
+        is needed: a record is written before head is published, it is read before tail is published
+        :param name: name of the existing block, None - create new block
+        :param size: bytes of the ring for a new block, power of 2
+        """
+        if name is None:
+            if size & (size - 1):
+                raise ValueError(f"Size of ring {size} must be power of 2")
+            self.shm = SharedMemory(create=True, size=DATA + size)
+        else:
+            self.shm = SharedMemory(name=name)
+        buf = self.shm.buf
+        assert buf is not None
+        self.buf = buf
+        if name is None:
+            self.buf[:DATA] = bytes(DATA)
+        self.name = self.shm.name
+        self.size = size if name is None else self.shm.size - DATA
+        self.size = 1 << (self.size.bit_length() - 1)  # the block may be rounded up to pages
+        self.mask = self.size - 1
+        self.index = self.buf[:DATA].cast("Q")
+        self.head = self.index[HEAD]
+        self.tail = self.index[TAIL]
+        self.addresses: dict[str, bytes] = {}  # packed IP of sources
+        self.last_ts: tuple[datetime.datetime | None, int] = (None, 0)  # the batch receiver shares ts of a read
+
+    def write(self, data: QueueMessage) -> bool:
+        """
+        :return: False - the ring is full, the datagram is not written
+        """
+        length = len(data.message)
+        total = (RECORD.size + length + 7) & ~7
+        head = self.head
+        offset = head & self.mask
+        padding = self.size - offset if offset + total > self.size else 0
+        if head + padding + total - self.index[TAIL] > self.size:
+            return False
+        if padding:
+            struct.pack_into("<I", self.buf, DATA + offset, WRAP)
+            head += padding
+            offset = 0
+        if (address := self.addresses.get(data.client[0])) is None:
+            address = self.addresses[data.client[0]] = socket.inet_aton(data.client[0])
+        if self.last_ts[0] is not data.ts:
+            self.last_ts = (data.ts, int(data.ts.timestamp() * 1e9))
+        start = DATA + offset
+        RECORD.pack_into(self.buf, start, length, data.client[1], address, data.ts_ns, self.last_ts[1])
+        self.buf[start + RECORD.size: start + RECORD.size + length] = data.message
+        self.head = head + total
+        self.index[HEAD] = self.head  # publish
+        return True
+
+    def read(self, max_count: int) -> list[QueueMessage]:
+        """
+        up to max_count datagrams, the space is released for the producer after the batch
+        """
+        messages: list[QueueMessage] = []
+        tail, head = self.tail, self.index[HEAD]
+        while tail != head and len(messages) < max_count:
+            offset = tail & self.mask
+            length, = struct.unpack_from("<I", self.buf, DATA + offset)
+            if length == WRAP:
+                tail += self.size - offset
+                continue
+            _, port, ip, ts_ns, epoch_ns = RECORD.unpack_from(self.buf, DATA + offset)
+            start = DATA + offset + RECORD.size
+            messages.append(QueueMessage(client=(socket.inet_ntoa(ip), port),
+                                         message=bytes(self.buf[start: start + length]),
+                                         ts_ns=ts_ns, ts=datetime.datetime.fromtimestamp(epoch_ns / 1e9)))
+            tail += (RECORD.size + length + 7) & ~7
+        if tail != self.tail:
+            self.tail = tail
+            self.index[TAIL] = tail  # release
+        return messages
+
+    @property
+    def done(self) -> int:
+        """
+        count of datagrams processed by the consumer
+        """
+        return self.index[DONE]
+
+    @done.setter
+    def done(self, value: int) -> None:
+        self.index[DONE] = value
+
+    def backlog(self) -> int:
+        """
+        bytes waiting for the consumer
+        """
+        return self.index[HEAD] - self.index[TAIL]
+
+    def close(self, unlink: bool = False) -> None:
+        self.index.release()
+        del self.buf
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def worker_main(index: int, ring_name: str, configs: list[tuple[NvlOptions, bool]], max_sources: int,
+                drop_out_of_order: bool, batch_size: int, ready: Event, stop: Event) -> None:
+    """
+    worker process: own Dispatcher with own DataPackers, DB writers, persistence thread and spill directory
+    """
+    loger_setup()
+    persistence.spill = create_spill(index)
+    ring = SpscRing(ring_name)
+    templates = {nvl.list_id: NvlTemplate(nvl, per_source, max_sources) for nvl, per_source in configs}
+    dispatcher = Dispatcher(templates, drop_out_of_order)
+    persistence.start()
+    ready.set()
+    logger.info(f"Shard {index} is started")
+    try:
+        while True:
+            messages = ring.read(batch_size)
+            if not messages:
+                if stop.is_set():
+                    break
+                time.sleep(IDLE_SLEEP)
+                continue
+            for data in messages:
+                try:
+                    dispatcher.process(data)
+                except Exception as ex:
+                    logger.exception(ex)
+            ring.done += len(messages)
+    finally:
+        persistence.stop(timeout=10)
+        dispatcher.close()
+        logger.info(f"Shard {index}:\n" + statistic.print_stat_in_table())
+        ring.close()
+
+
+class ShardPool:
+    def __init__(self, configs: list[tuple[NvlOptions, bool]], processes: int, ring_bytes: int = 1 << 24,
+                 max_sources: int = 1000, drop_out_of_order: bool = False, batch_size: int = 64) -> None:
+        """
+        the lists are decoded in worker processes: the dispatcher (the main process) sends every datagram to the
+        worker of its (source IP, list ID) through a ring in shared memory. A new pair goes to the worker with
+        the least pairs, so the state of a sender is in one worker and the load is balanced
+        :param configs: NVL configs and flag "per source" (template)
+        :param processes: count of worker processes
+        :param ring_bytes: size of the ring of one worker, power of 2
+        :param max_sources: see NvlTemplate
+        :param drop_out_of_order: see SequenceTracker
+        :param batch_size: max count of datagrams which the worker takes from the ring at once
+        """
+        context = multiprocessing.get_context("spawn")  # a fork would share the DB connections of the parent
+        self.rings = [SpscRing(size=ring_bytes) for _ in range(processes)]
+        self.stop_event = context.Event()
+        self.ready_events = [context.Event() for _ in range(processes)]
+        self.processes = [
+            context.Process(target=worker_main, name=f"shard-{i}", daemon=True,
+                            args=(i, ring.name, configs, max_sources, drop_out_of_order, batch_size,
+                                  self.ready_events[i], self.stop_event))
+            for i, ring in enumerate(self.rings)
+        ]
+        self.shards: dict[tuple[str, bytes], SpscRing] = {}
+        self.n_keys = [0] * processes
+        self.dropped: Counter = statistic.counter("shard/dropped", "Shards: dropped datagrams, the ring is full",
+                                                  "cnv_shard_dropped_total")
+
+    @classmethod
+    def from_paths(cls, paths: list[Path], template_paths: list[Path], processes: int, ring_bytes: int = 1 << 24,
+                   max_sources: int = 1000, drop_out_of_order: bool = False) -> "ShardPool":
+        configs = [(NvlParser(path).parse(), False) for path in paths]
+        configs += [(NvlParser(path).parse(), True) for path in template_paths]
+        return cls(configs, processes, ring_bytes, max_sources, drop_out_of_order)
+
+    def start(self, timeout: float = 60) -> None:
+        """
+        the workers are started one by one, so only one process creates the tables in DB at a time
+        """
+        for process, ready in zip(self.processes, self.ready_events):
+            process.start()
+            while not ready.wait(0.1):
+                if not process.is_alive() or (timeout := timeout - 0.1) <= 0:
+                    raise RuntimeError(f"Worker {process.name} is not started (exit code {process.exitcode})")
+        logger.info(f"{len(self.processes)} shard workers are started")
+
+    def process(self, data: QueueMessage) -> None:
+        key = (data.client[0], data.message[8:10])  # source IP, list ID
+        if (ring := self.shards.get(key)) is None:
+            i = self.n_keys.index(min(self.n_keys))
+            self.n_keys[i] += 1
+            ring = self.shards[key] = self.rings[i]
+        if not ring.write(data):
+            self.dropped.value += 1
+
+    def processed(self) -> int:
+        return sum(ring.done for ring in self.rings)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        the workers process the rest of the rings and flush the DB writers
+        """
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.rings:
+            ring.close(unlink=True)
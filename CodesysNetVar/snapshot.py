@@ -0,0 +1,140 @@
+import struct
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+from codesys.frame_index import FrameIndex
+from codesys.nvl_parser import NvlOptions
+from utils.exeptions import DataWrongLen, SnapshotNotConsistent
+
+VERSION, TS, SIZE = 0, 1, 2  # uint64 indexes in the header
+DATA = 64  # offset of the frame in the block
+MAX_RETRIES = 10_000  # attempts of the reader while the writer is changing the frame
+RETRY_SLEEP = 0.00001  # seconds, the reader gives the writer time to finish the frame
+
+
+def snapshot_name(list_id: int, source: str | None = None) -> str:
+    """
+    name of the shared memory block of the list (/dev/shm/cnv_<list_id>[_<source>])
+    """
+    return f"cnv_{list_id}" if source is None else f"cnv_{list_id}_{source.replace('.', '_')}"
+
+
+class SnapshotWriter:
+    def __init__(self, name: str, size: int) -> None:
+        """
+        the last frame of the list in shared memory for other processes on the host. The frame is copied as raw
+        bytes (the layout is the declaration of the NVL), so publishing costs one copy. Seqlock: the version is odd
+        while the frame is written, the reader repeats the read if the version was odd or changed during the read
+        :param name: name of the block
+        :param size: bytes of the frame
+        """
+        try:
+            self.shm = SharedMemory(name=name, create=True, size=DATA + size)
+        except FileExistsError:  # left by the killed service
+            SharedMemory(name=name).unlink()
+            self.shm = SharedMemory(name=name, create=True, size=DATA + size)
+        self.name = name
+        buf = self.shm.buf
+        assert buf is not None
+        self.index = buf[:DATA].cast("Q")
+        self.index[VERSION] = 0
+        self.index[SIZE] = size
+        self.data = buf[DATA: DATA + size]
+
+    def publish(self, frame: bytes | memoryview) -> None:
+        """
+        :param frame: data of the packed frame
+        """
+        index = self.index
+        index[VERSION] += 1
+        self.data[:] = frame
+        index[TS] = time.time_ns()
+        index[VERSION] += 1
+
+    def close(self) -> None:
+        self.index.release()
+        self.data.release()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class SnapshotReader:
+    def __init__(self, nvl: NvlOptions, source: str | None = None, name: str | None = None) -> None:
+        """
+        read the last values of the list published by the service (CNV_NVL___SNAPSHOT). The values are unpacked
+        directly from shared memory without lock and without copy of the frame
+        :param nvl: NVL config of the list, the same as of the service
+        :param source: IP of the sender for a template (CNV_NVL___TEMPLATES)
+        :param name: name of the block, None - snapshot_name
+        """
+        from data_packer import DataPacker  # DataPacker imports the writer
+
+        c_types_declarations = DataPacker.generate_instance_datatype(nvl.declarations)
+        self.shm = SharedMemory(name=name or snapshot_name(nvl.list_id, source))
+        resource_tracker.unregister(self.shm._name, "shared_memory")  # type: ignore  # the block of the service
+        self.frame_index = FrameIndex(c_types_declarations)
+        buf = self.shm.buf
+        assert buf is not None
+        size, = struct.unpack_from("Q", buf, SIZE * 8)
+        if size != self.frame_index.size:
+            self.shm.close()
+            raise DataWrongLen(f"The snapshot has {size} bytes of frame. "
+                               f"NVL has to has {self.frame_index.size} bytes.")
+        self.buf = buf
+        self.index = buf[:DATA].cast("Q")
+
+    @property
+    def version(self) -> int:
+        """
+        2 * count of published frames, 0 - nothing is published yet
+        """
+        return self.index[VERSION]
+
+    @property
+    def ts_ns(self) -> int:
+        """
+        time of publishing of the last frame, ns since epoch
+        """
+        return self.index[TS]
+
+    def get(self, name: str) -> Any:
+        """
+        :param name: name of the variable or "name[i]" of array element
+        :return: value of the variable, None - nothing is published yet
+        """
+        index = self.index
+        for _ in range(MAX_RETRIES):
+            version = index[VERSION]
+            try:
+                value = self.frame_index.unpack(self.buf, name, DATA)
+            except ValueError:  # the value is from two frames
+                if index[VERSION] == version:
+                    raise
+            if version & 1 or index[VERSION] != version:
+                time.sleep(RETRY_SLEEP)
+                continue
+            return value if version else None
+        raise SnapshotNotConsistent(f"The frame of {self.shm.name} is changed all the time")
+
+    def read(self) -> dict[str, Any]:
+        """
+        values of all variables of one frame
+        """
+        index = self.index
+        for _ in range(MAX_RETRIES):
+            version = index[VERSION]
+            frame = bytes(self.buf[DATA: DATA + self.frame_index.size])
+            if version & 1 or index[VERSION] != version:
+                time.sleep(RETRY_SLEEP)
+                continue
+            if not version:
+                return dict.fromkeys(self.frame_index.variables)
+            return {name: self.frame_index.unpack(frame, name) for name in self.frame_index.variables}
+        raise SnapshotNotConsistent(f"The frame of {self.shm.name} is changed all the time")
+
+    def close(self) -> None:
+        self.index.release()
+        del self.buf
+        self.shm.close()
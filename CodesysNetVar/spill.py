@@ -0,0 +1,142 @@
+import os
+import pickle
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, TypeAlias
+
+from loguru import logger
+
+from utils.exeptions import SpillCorrupted
+from utils.statistics import statistic, Counter
+
+Row: TypeAlias = dict[str, Any]
+RECORD_HEADER = struct.Struct("<II")  # length of payload, crc32 of payload
+SEGMENT_SUFFIX = ".spill"
+READ_OFFSET_FILE = "read_offset"
+
+
+class SpillBuffer:
+    def __init__(self, directory: Path, max_bytes: int, segment_bytes: int = 16 << 20) -> None:
+        """
+        durable FIFO of row batches on disk: append-only segment files, every batch is fsynced.
+        The size is more than max_bytes - the oldest segments are evicted. Segments of the last run are kept
+        and drained too, the read offset is saved by close(), so after a crash a batch can be written twice
+        :param directory: directory for segment files
+        :param max_bytes: capacity of all segments
+        :param segment_bytes: a new segment is started when the current one is bigger
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.segments: list[Path] = sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}"))
+        self.size = sum(segment.stat().st_size for segment in self.segments)
+        self.write_file: BinaryIO | None = None
+        self.read_offset = self.next_offset = self._load_read_offset()
+        self.spilled: Counter = statistic.counter("spill/rows", "Spill: rows written to disk")
+        self.evicted: Counter = statistic.counter("spill/evicted_bytes", "Spill: bytes evicted, oldest first")
+        if self.segments:
+            logger.warning(f"Spill has {len(self.segments)} segments ({self.size} bytes) of the last run")
+
+    def _load_read_offset(self) -> int:
+        path = self.directory.joinpath(READ_OFFSET_FILE)
+        if not path.exists():
+            return 0
+        name, offset = path.read_text().split()
+        path.unlink()
+        return int(offset) if self.segments and self.segments[0].name == name else 0
+
+    def __len__(self) -> int:
+        """
+        size of not drained data, bytes
+        """
+        return self.size - self.read_offset
+
+    def _new_segment(self) -> BinaryIO:
+        if self.write_file:
+            self.write_file.close()
+        number = int(self.segments[-1].stem) + 1 if self.segments else 0
+        path = self.directory.joinpath(f"{number:012d}{SEGMENT_SUFFIX}")
+        write_file = self.write_file = open(path, "ab")
+        self.segments.append(path)
+        return write_file
+
+    def append(self, key: str, rows: list[Row]) -> None:
+        """
+        write the batch and fsync it
+        :param key: name of sink (table) of rows
+        :param rows: rows of batch
+        """
+        payload = pickle.dumps((key, rows), protocol=pickle.HIGHEST_PROTOCOL)
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        if (write_file := self.write_file) is None or write_file.tell() >= self.segment_bytes:
+            write_file = self._new_segment()
+        write_file.write(record)
+        write_file.flush()
+        os.fsync(write_file.fileno())
+        self.size += len(record)
+        self.spilled.value += len(rows)
+        self._evict()
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and len(self.segments) > 1:
+            evicted = self.segments[0].stat().st_size - self.read_offset
+            self._remove_oldest()
+            self.evicted.value += evicted
+            logger.warning(f"Spill is over {self.max_bytes} bytes, {evicted} bytes are evicted")
+
+    def _remove_oldest(self) -> None:
+        segment = self.segments.pop(0)
+        if self.write_file and self.write_file.name == str(segment):
+            self.write_file.close()
+            self.write_file = None
+        self.size -= segment.stat().st_size
+        segment.unlink()
+        self.read_offset = self.next_offset = 0
+
+    def peek(self) -> tuple[str, list[Row]] | None:
+        """
+        the oldest batch, it stays in the spill until pop()
+        :return: name of sink and rows or None if the spill is empty
+        """
+        while self.segments:
+            try:
+                record = self._read(self.segments[0], self.read_offset)
+            except SpillCorrupted as ex:
+                logger.warning(f"{ex}, the rest of {self.segments[0].name} is skipped")
+                record = None
+            if record is not None:
+                return record
+            self._remove_oldest()
+        return None
+
+    def _read(self, segment: Path, offset: int) -> tuple[str, list[Row]] | None:
+        with open(segment, "rb") as f:
+            f.seek(offset)
+            header = f.read(RECORD_HEADER.size)
+            if not header:
+                return None
+            if len(header) < RECORD_HEADER.size:
+                raise SpillCorrupted(f"Header of record at {offset} of {segment.name} is cut")
+            length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            raise SpillCorrupted(f"Record at {offset} of {segment.name} is broken")
+        self.next_offset = offset + RECORD_HEADER.size + length
+        return pickle.loads(payload)
+
+    def pop(self) -> None:
+        """
+        the batch from peek() is written, it is removed from the spill
+        """
+        self.read_offset = self.next_offset
+        if self.segments and self.read_offset >= self.segments[0].stat().st_size:
+            self._remove_oldest()  # the drained segment is not read again after restart
+
+    def close(self) -> None:
+        if self.write_file:
+            self.write_file.close()
+            self.write_file = None
+        if self.segments and self.read_offset:
+            self.directory.joinpath(READ_OFFSET_FILE).write_text(f"{self.segments[0].name} {self.read_offset}")
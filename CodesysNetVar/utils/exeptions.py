@@ -36,3 +36,23 @@ class NVLFileNotFound(FileNotFoundError):
 
 class OutOfRange(ValueError):
     """Values of this data type are out of range"""
+
+
+class PacketWrongNumber(ValueError):
+    """Number of packet is out of NVL"""
+
+
+class RowsNotWritten(IOError):
+    """Rows are not written to DB, the rows are kept for the next attempt"""
+
+    def __init__(self, message: str, rows: list) -> None:
+        super().__init__(message)
+        self.rows = rows
+
+
+class SpillCorrupted(ValueError):
+    """Record of the spill file is broken"""
+
+
+class SnapshotNotConsistent(RuntimeError):
+    """The snapshot is changed during every attempt of reading"""
@@ -0,0 +1,146 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from typing import Any, Callable
+
+from loguru import logger
+
+from utils.statistics import Statistics, Counter, Duration, statistic, _bucket_index
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+HISTOGRAM_BOUNDS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)  # seconds
+_NOT_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def metric_name(name: str) -> str:
+    return "cnv_" + _NOT_NAME.sub("_", name).strip("_")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str], **extra: str) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items.items()) + "}"
+
+
+def _value(value: float) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class Gauge:
+    def __init__(self, name: str, description: str, read: Callable[[], float | None], kind: str = "gauge") -> None:
+        """
+        the value is read at the scrape
+        :param name: name of the metric
+        :param description: HELP of the metric
+        :param read: returns the value, None - the value is not available
+        :param kind: type of the metric, "counter" for monotonic values from the outside (kernel)
+        """
+        self.name = name
+        self.description = description
+        self.read = read
+        self.kind = kind
+
+
+class MetricsRenderer:
+    def __init__(self, statistics: Statistics = statistic) -> None:
+        """
+        Prometheus text format of the counters and the durations of statistics and of the registered gauges.
+        The values are read without locks: the hot path only increments the ints and the lists of buckets,
+        the renderer copies them (atomic under GIL), so a scrape never blocks the decoding
+        """
+        self.statistics = statistics
+        self.gauges: list[Gauge] = []
+
+    def add_gauge(self, name: str, description: str, read: Callable[[], float | None], kind: str = "gauge") -> None:
+        self.gauges.append(Gauge(name, description, read, kind))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        self._render_counters(lines, list(self.statistics.counters.values()))
+        self._render_durations(lines, list(self.statistics.durations.values()))
+        for gauge in self.gauges:
+            try:
+                value = gauge.read()
+            except Exception as ex:
+                logger.warning(f"Metric {gauge.name} is not read: {ex!r}")
+                continue
+            if value is None:
+                continue
+            lines.append(f"# HELP {gauge.name} {gauge.description}")
+            lines.append(f"# TYPE {gauge.name} {gauge.kind}")
+            lines.append(f"{gauge.name} {_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_counters(lines: list[str], counters: list[Counter]) -> None:
+        families: dict[str, list[Counter]] = {}
+        for counter in counters:
+            families.setdefault(counter.metric or metric_name(counter.name) + "_total", []).append(counter)
+        for name, family in families.items():
+            if not family[0].labels:
+                lines.append(f"# HELP {name} {_escape(family[0].description)}")
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines.extend(f"{name}{_labels(counter.labels)} {counter.value}" for counter in family)
+
+    @staticmethod
+    def _render_durations(lines: list[str], durations: list[Duration]) -> None:
+        families: dict[str, list[Duration]] = {}
+        for duration in durations:
+            families.setdefault(duration.metric or "cnv_duration_seconds", []).append(duration)
+        for name, family in families.items():
+            lines.append(f"# TYPE {name} histogram")
+            for duration in family:
+                labels = duration.labels if duration.metric else {"name": duration.func_name}
+                count, sum_ns, cumulative = duration.count, duration.sum_ns, list(accumulate(duration.buckets[:]))
+                for bound in HISTOGRAM_BOUNDS:
+                    index = min(_bucket_index(round(bound * 1e9)), len(cumulative)) - 1
+                    n = cumulative[index] if index >= 0 else 0
+                    lines.append(f"{name}_bucket{_labels(labels, le=f'{bound:g}')} {min(n, count)}")
+                lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {sum_ns / 1e9!r}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+
+
+class MetricsServer:
+    def __init__(self, renderer: MetricsRenderer, address: tuple[str, int]) -> None:
+        """
+        HTTP endpoint GET /metrics in own daemon thread
+        :param renderer: source of the metrics
+        :param address: local address, localhost by default in settings
+        """
+        self.renderer = renderer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = renderer.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa
+                logger.debug(f"Metrics: {self.address_string()} {format % args}")
+
+        self.http_server = ThreadingHTTPServer(address, Handler)
+        self.http_server.daemon_threads = True
+        host, port = self.http_server.server_address[:2]
+        self.address: tuple[str, int] = (str(host), port)
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name="metrics", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+        logger.info(f"Metrics on http://{self.address[0]}:{self.address[1]}/metrics")
+
+    def stop(self) -> None:
+        self.http_server.shutdown()
+        self.http_server.server_close()
@@ -1,99 +1,231 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import time
 from functools import wraps
+from typing import Any
+
+SUB_BUCKET_BITS = 7  # relative error of percentiles is less than 2 ** -(SUB_BUCKET_BITS - 1) ~ 1.6%
+HALF_SUB_BUCKETS = 1 << (SUB_BUCKET_BITS - 1)
+MAX_SHIFT = 48  # durations up to ~3 days in ns
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def _bucket_index(value_ns: int) -> int:
+    """
+    log-linear bucket (HDR histogram): exact below 2 ** SUB_BUCKET_BITS ns, then HALF_SUB_BUCKETS per power of 2
+    """
+    shift = value_ns.bit_length() - SUB_BUCKET_BITS
+    if shift <= 0:
+        return value_ns
+    return shift * HALF_SUB_BUCKETS + (value_ns >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    """
+    middle of the range of values of the bucket, ns
+    """
+    if index < 2 * HALF_SUB_BUCKETS:
+        return index
+    shift = index // HALF_SUB_BUCKETS - 1
+    return ((index - shift * HALF_SUB_BUCKETS) << shift) + (1 << (shift - 1))
 
 
 @dataclass
 class Duration:
     func_name: str
     description: str
-    durations: list[float]
-    average_duration: float = 0.0
-    max_duration: float = 0.0
-    min_duration: float = 0.0
+    count: int = 0
+    sum_ns: int = 0
+    min_ns: int = 0
+    max_ns: int = 0
+    first_ns: int = 0  # monotonic time of the first sample for the rate
+    buckets: list[int] = field(default_factory=lambda: [0] * ((MAX_SHIFT + 2) * HALF_SUB_BUCKETS), repr=False)
+    metric: str = ""  # name of the metric family in utils/metrics.py, "" - common family of durations
+    labels: dict[str, str] = field(default_factory=dict)
+
+    def add(self, value_ns: int) -> None:
+        """
+        O(1) update of the histogram by one duration
+        """
+        if self.count:
+            if value_ns < self.min_ns:
+                self.min_ns = value_ns
+            elif value_ns > self.max_ns:
+                self.max_ns = value_ns
+        else:
+            self.min_ns = self.max_ns = value_ns
+            self.first_ns = time.monotonic_ns()
+        self.count += 1
+        self.sum_ns += value_ns
+        shift = value_ns.bit_length() - SUB_BUCKET_BITS
+        self.buckets[value_ns if shift <= 0 else shift * HALF_SUB_BUCKETS + (value_ns >> shift)] += 1
+
+    def percentile(self, percent: float) -> float:
+        """
+        :param percent: from 0 to 100
+        :return: duration in seconds
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(max(_bucket_value(index), self.min_ns), self.max_ns) / 1e9
+        return self.max_ns / 1e9
+
+    @property
+    def average_duration(self) -> float:
+        return self.sum_ns / self.count / 1e9 if self.count else 0.0
+
+    @property
+    def min_duration(self) -> float:
+        return self.min_ns / 1e9
+
+    @property
+    def max_duration(self) -> float:
+        return self.max_ns / 1e9
+
+    @property
+    def rate(self) -> float:
+        """
+        calls per second since the first call
+        """
+        elapsed = time.monotonic_ns() - self.first_ns
+        return self.count / elapsed * 1e9 if self.count and elapsed > 0 else 0.0
 
     def __repr__(self) -> str:
         return self.func_name + "|" + self.description + ":\n" + f"Average duration [{self.average_duration}]\n" + \
-               f"Min [{self.min_duration}]  |  Max [{self.max_duration}]"
+               f"Min [{self.min_duration}]  |  Max [{self.max_duration}]\n" + \
+               "  ".join(f"p{p:g} [{self.percentile(p)}]" for p in PERCENTILES) + \
+               f"\nCount [{self.count}]  |  Rate [{self.rate:.1f}/s]"
+
+
+@dataclass
+class Counter:
+    name: str
+    description: str
+    value: int = 0
+    metric: str = ""  # name of the metric family in utils/metrics.py, "" - derived from the name
+    labels: dict[str, str] = field(default_factory=dict)
+
+    def __repr__(self) -> str:
+        return self.name + "|" + self.description + f": {self.value}"
 
 
 class Statistics:
     def __init__(self) -> None:
-        self.durations: list[Duration] = []
+        self.durations: dict[str, Duration] = {}
+        self.counters: dict[str, Counter] = {}
 
-    def put_duration_storage(self, func_name: str, description: str, runtime: float, total: bool) -> None:
+    def counter(self, name: str, description: str,
+                metric: str = "", labels: dict[str, Any] | None = None) -> Counter:
+        """
+        register the counter once and increment its value on the hot path: counter.value += 1
+        :param name: unique name of the counter
+        :param description: text for the table
+        :param metric: name of the metric family for the metrics endpoint, the counters of one family differ by labels
+        :param labels: for example {"source": "192.168.56.35", "list_id": 1}
+        :return: counter
+        """
+        if (counter := self.counters.get(name)) is None:
+            counter = self.counters[name] = Counter(name=name, description=description, metric=metric,
+                                                    labels={k: str(v) for k, v in (labels or {}).items()})
+        return counter
+
+    def duration(self, func_name: str, description: str, total: bool = False,
+                 metric: str = "", labels: dict[str, Any] | None = None) -> Duration:
+        """
+        register the histogram of durations once, it is updated by duration.add(ns)
+        :param func_name: unique name
+        :param description: text for the table
+        :param total: the duration of the whole cycle, the other durations are shown in % of it
+        :param metric: name of the metric family for the metrics endpoint
+        :param labels: labels of the histogram in the family
+        """
         if total:
             func_name = "___Total"
             description = "Total runtime:"
-        if duration := self.get_duration_by_name(func_name):
-            duration.durations.append(runtime)
-        else:
-            duration = Duration(func_name=func_name, description=description, durations=[runtime])
-            self.durations.append(duration)
-        self.calculate_duration(duration)
+        if (duration := self.durations.get(func_name)) is None:
+            duration = self.durations[func_name] = Duration(
+                func_name=func_name, description=description, metric=metric,
+                labels={k: str(v) for k, v in (labels or {}).items()}
+            )
+        return duration
 
-    def get_duration_by_name(self, func_name: str) -> Duration | None:
-        for duration in self.durations:
-            if duration.func_name == func_name:
-                return duration
-        return None
+    def put_duration_storage(self, func_name: str, description: str, runtime: float, total: bool) -> None:
+        self.duration(func_name, description, total).add(round(runtime * 1e9))
 
-    @staticmethod
-    def calculate_duration(duration: Duration) -> None:
-        if len(duration.durations) > 100:
-            duration.durations.sort()
-            duration.durations.pop(49)
-        duration.max_duration = max(duration.durations)
-        duration.min_duration = min(duration.durations)
-        duration.average_duration = sum(duration.durations) / len(duration.durations)
+    def get_duration_by_name(self, func_name: str) -> Duration | None:
+        return self.durations.get(func_name)
 
     def print_stat_in_table(self) -> str:
         total_dr = self.get_duration_by_name("___Total")
         if not total_dr:
             return "Not a single cycle was performed"
-        """ Example
+        """ Example (P50 ... RATE/S are cut)
                                 Statistic of runtime
-        +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-                                        |  AVR [ %total ]  |   MIN   |   MAX   
-        _______________________________________________________________________
-        Delay of new packet from socket | 123.123 [ 100% ] | 123.123 | 123.123 
-        Time of data processing         | 123.123 [ 100% ] | 123.123 | 123.123 
-        _______________________________________________________________________
-        Total                           | 123.123 [ 100% ] | 123.123 | 123.123 
+        +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+                                        |  AVR [ %total ]  |   MIN   |   MAX   |   P50   |   P90   
+        ___________________________________________________________________________________________
+        Delay of new packet from socket | 123.123 [ 100% ] | 123.123 | 123.123 | 123.123 | 123.123 
+        Time of data processing         | 123.123 [ 100% ] | 123.123 | 123.123 | 123.123 | 123.123 
+        ___________________________________________________________________________________________
+        Total                           | 123.123 [ 100% ] | 123.123 | 123.123 | 123.123 | 123.123 
         """
-        len_of_description = max([len(d.description) for d in self.durations])
-        width = len_of_description + 40  # len_values := 40
+        len_of_description = max([len(d.description) for d in self.durations.values()])
+        width = len_of_description + 100  # len_values := 100
         title = f"{{:^{width}}}".format("Statistic of runtime")
         del_plus = "+" * width
         del_minus = "-" * width
-        headlines = " " * len_of_description + " |  AVR [ %total ]  |   MIN   |   MAX   "
+        headlines = " " * len_of_description + " |  AVR [ %total ]  |   MIN   |   MAX   |   P50   |   P90   " \
+                                               "|   P99   |  P99.9  |   COUNT   |  RATE/S  "
         res = f"{title}\n{del_plus}\n{headlines}\n{del_minus}\n"
-        for dr in self.durations:
+        for dr in self.durations.values():
             if dr.func_name == total_dr.func_name:
                 continue
-            res += f"{{:<{len_of_description}}}".format(dr.description)
-            res += " | {:^7.3f} [{:^6.0%}] | {:^7.3f} | {:^7.3f} \n".format(
-                dr.average_duration,
-                dr.average_duration/total_dr.average_duration,
-                dr.min_duration,
-                dr.max_duration)
+            res += self._duration_row(dr, total_dr, len_of_description)
         res += f"{del_minus}\n"
-        res += f"{{:<{len_of_description}}}".format(total_dr.description)
-        res += " | {:^7.3f} [{:^6.0%}] | {:^7.3f} | {:^7.3f} \n".format(
-            total_dr.average_duration,
-            1,
-            total_dr.min_duration,
-            total_dr.max_duration)
+        res += self._duration_row(total_dr, total_dr, len_of_description)
+        res += self.print_counters_in_table()
+        return res
+
+    @staticmethod
+    def _duration_row(dr: Duration, total_dr: Duration, len_of_description: int) -> str:
+        res = f"{{:<{len_of_description}}}".format(dr.description)
+        res += " | {:^7.3f} [{:^6.0%}] | {:^7.3f} | {:^7.3f} ".format(
+            dr.average_duration,
+            dr.average_duration / total_dr.average_duration if total_dr.average_duration else 0,
+            dr.min_duration,
+            dr.max_duration)
+        res += "".join("| {:^7.3f} ".format(dr.percentile(p)) for p in PERCENTILES)
+        res += "| {:^9} | {:^8.1f} \n".format(dr.count, dr.rate)
+        return res
+
+    def print_counters_in_table(self) -> str:
+        if not self.counters:
+            return ""
+        """ Example
+                          Counters
+        +++++++++++++++++++++++++++++++++++++++++++++
+        192.168.56.1 list 1: lost packets |       12
+        """
+        len_of_description = max([len(c.description) for c in self.counters.values()])
+        width = len_of_description + 13  # len_values := 13
+        res = "\n" + f"{{:^{width}}}".format("Counters") + "\n" + "+" * width + "\n"
+        for counter in self.counters.values():
+            res += f"{{:<{len_of_description}}}".format(counter.description) + f" | {counter.value:>10}\n"
         return res
 
     def timer(self, description: str = '', total: bool = False):
         def decorator(func):
+            duration = self.duration(f"{func.__module__}.{func.__qualname__}", description, total)  # registered once
+
             @wraps(func)
             def _wrapper(*args, **kwargs):
-                start = time.perf_counter()
+                start = time.perf_counter_ns()
                 result = func(*args, **kwargs)
-                runtime = time.perf_counter() - start
-                self.put_duration_storage(str(func), description, runtime, total)
+                duration.add(time.perf_counter_ns() - start)
                 return result
             return _wrapper
         return decorator
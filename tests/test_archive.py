@@ -0,0 +1,61 @@
+import datetime
+import struct
+from pathlib import Path
+
+from archive import FrameArchive, ArchiveReader, RECORD_HEADER, SEGMENT_HEADER
+from network.parser import Rcv
+from network.server import QueueMessage
+
+START = datetime.datetime(2023, 5, 1, 12, 0, 0)
+
+
+def create_message(i: int, list_id: int = 1) -> QueueMessage:
+    message = struct.pack("<8sHHHHI", b"\x00-S3\x00\x00\x00\x00", list_id, 0, 1, 24, i) + struct.pack("<I", i)
+    return QueueMessage((f"10.0.0.{i % 3 + 1}", 1202 + i % 2), message,
+                        ts=START + datetime.timedelta(milliseconds=100 * i))
+
+
+def write_archive(path: Path, count: int, segment_bytes: int = 1024) -> list[QueueMessage]:
+    archive = FrameArchive(path, segment_bytes=segment_bytes, index_interval_ms=500)
+    messages = [create_message(i, list_id=i % 2 + 1) for i in range(count)]
+    for qm in messages:
+        archive.append(qm)
+    archive.close()
+    return messages
+
+
+def test_all_frames(tmp_path: Path):
+    messages = write_archive(tmp_path, 100)
+    reader = ArchiveReader(tmp_path)
+    assert len(reader.segments()) > 1
+    frames = list(reader.frames())
+    assert [(f.ts, f.client, f.list_id, bytes(f.payload)) for f in frames] == \
+           [(qm.ts, qm.client, int.from_bytes(qm.message[8:10], "little"), qm.message) for qm in messages]
+    assert all(isinstance(f.payload, memoryview) for f in frames)
+    del frames
+    reader.close()
+
+
+def test_time_range(tmp_path: Path):
+    write_archive(tmp_path, 100)
+    reader = ArchiveReader(tmp_path)
+    start, end = START + datetime.timedelta(seconds=3.05), START + datetime.timedelta(seconds=7)
+    rcvs = [Rcv(bytes(f.payload), f.client) for f in reader.frames(start, end)]
+    assert [struct.unpack("<I", rcv.data_raw)[0] for rcv in rcvs] == list(range(31, 70))  # re-decode
+    assert list(reader.frames(end=START)) == []
+    assert len(list(reader.frames(start=START + datetime.timedelta(seconds=9.9)))) == 1
+    reader.close()
+
+
+def test_live_segment(tmp_path: Path):
+    archive = FrameArchive(tmp_path, segment_bytes=1 << 20)
+    for i in range(10):
+        archive.append(create_message(i))
+    reader = ArchiveReader(tmp_path)
+    assert len(list(reader.frames())) == 10
+    segment = reader.segments()[0]
+    assert segment.stat().st_size == 1 << 20
+    reader.close()
+    archive.close()
+    assert segment.stat().st_size == SEGMENT_HEADER.size + 10 * (RECORD_HEADER.size + 24)
+    assert FrameArchive(tmp_path).number == 1  # a new run starts a new segment
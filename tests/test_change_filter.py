@@ -0,0 +1,111 @@
+import datetime
+import math
+import struct
+
+import pytest
+from hypothesis import given, strategies as st
+
+from change_filter import ChangeFilter, Deadband, parse_deadband, create_change_filter
+from codesys.data_types import CInt, CReal, CLReal, CArray, CTypeDeclaration
+from codesys.nvl_parser import NvlOptions
+from data_packer import DataPacker
+from loadgen import NvlTraffic
+from network.parser import Rcv
+from settings.settings import settings
+from utils.exeptions import UnsupportedType
+
+TS = datetime.datetime(2023, 1, 1)
+FRAME = struct.Struct("<hfd2f")
+
+
+def create_declaration() -> CTypeDeclaration:
+    declaration = CTypeDeclaration()
+    declaration.append(CInt("state"))
+    declaration.append(CReal("temperature"))
+    declaration.append(CLReal("pressure"))
+    declaration.append(CArray("levels", CReal("_"), 2))
+    return declaration
+
+
+def test_parse_deadband():
+    assert parse_deadband(0.5) == Deadband(absolute=0.5)
+    assert parse_deadband("2%") == Deadband(percent=2)
+    assert parse_deadband("1.5") == Deadband(absolute=1.5)
+
+
+def test_only_changes_are_stored():
+    change_filter = ChangeFilter(1, create_declaration())
+    frames = [FRAME.pack(1, 20, 1, 0, 0)] * 3 + [FRAME.pack(2, 20, 1, 0, 0)] * 2
+    assert [change_filter.check(memoryview(frame), TS) for frame in frames] == [True, False, False, True, False]
+
+
+def test_deadbands():
+    deadbands = {"temperature": Deadband(absolute=0.5), "pressure": Deadband(percent=10),
+                 "levels": Deadband(absolute=1)}
+    change_filter = ChangeFilter(1, create_declaration(), deadbands)
+    assert change_filter.check(FRAME.pack(1, 20, 100, 0, 0), TS)
+    assert not change_filter.check(FRAME.pack(1, 20.4, 109, 0.9, -0.9), TS)
+    assert change_filter.check(FRAME.pack(1, 20.6, 100, 0, 0), TS)  # the difference to the stored 20
+    assert change_filter.check(FRAME.pack(1, 20.6, 111, 0, 0), TS)
+    assert change_filter.check(FRAME.pack(1, 20.6, 111, 0, 1.5), TS)
+    assert change_filter.check(FRAME.pack(1, 20.6, math.nan, 0, 1.5), TS)
+    assert change_filter.check(FRAME.pack(2, 20.6, math.nan, 0, 1.5), TS)  # the variable without deadband
+
+
+def test_heartbeat():
+    change_filter = ChangeFilter(1, create_declaration(), heartbeat_ms=1000)
+    frame = FRAME.pack(1, 20, 1, 0, 0)
+    times = [TS + datetime.timedelta(milliseconds=ms) for ms in (0, 500, 999, 1000, 1500, 2100)]
+    assert [change_filter.check(frame, ts) for ts in times] == [True, False, False, True, False, True]
+
+
+def test_deadband_of_not_real():
+    with pytest.raises(UnsupportedType):
+        ChangeFilter(1, create_declaration(), {"state": Deadband(absolute=1)})
+
+
+@given(st.lists(st.floats(min_value=-1000, max_value=1000, width=32), min_size=1, max_size=100),
+       st.floats(min_value=0, max_value=100))
+def test_skipped_values_are_in_deadband(values: list[float], band: float):
+    declaration = CTypeDeclaration()
+    declaration.append(CReal("value"))
+    change_filter = ChangeFilter(1, declaration, {"value": Deadband(absolute=band)})
+    stored = None
+    for value in values:
+        if change_filter.check(struct.pack("<f", value), TS):
+            stored = value
+        else:
+            assert abs(value - stored) <= band
+
+
+@pytest.fixture
+def change_only(monkeypatch):
+    monkeypatch.setattr(settings.storage, "change_only", True)
+    monkeypatch.setattr(settings.storage, "deadbands", {"7/var_real": "5%", "8/var_real": 1})
+    monkeypatch.setattr(settings.storage, "heartbeat_ms", 0)
+
+
+def test_create_change_filter(change_only):
+    declaration = CTypeDeclaration()
+    declaration.append(CReal("var_real"))
+    assert create_change_filter(7, declaration).deadbands[0][2] == Deadband(percent=5)
+    assert create_change_filter(9, declaration).deadbands == []
+
+
+class ListSink:
+    def __init__(self) -> None:
+        self.name = "sink"
+
+
+def test_data_packer(change_only, monkeypatch):
+    rows = []
+    monkeypatch.setattr("data_packer.persistence.put", lambda sink, row: rows.append(row))
+    options = NvlOptions(declarations=[{"name": "var_int", "type": ["INT"]}, {"name": "var_real", "type": ["REAL"]}],
+                         list_id=7, pack=True, checksum=False, acknowledge=False, ip_address="127.0.0.1", port=1202)
+    data_packer = DataPacker(options, db_writer=ListSink())  # type: ignore
+    traffic = NvlTraffic(options, variants=2)
+    for _ in range(3):
+        packet = traffic.next_frame()[0]
+        for _ in range(3):
+            data_packer.put_data(Rcv(packet, ("10.0.0.1", 1202)))
+    assert [row["var_int"] for row in rows] == [0, 1, 0]
@@ -214,11 +214,10 @@ def test_dt_real_wrong_len(value: bytes):
         c_real.put(value)
 
 
-@pytest.mark.skip("Test has failed")
 @given(st.floats(width=64))
 def test_dt_lreal(value: float):
     c_lreal = CLReal("some_name")
-    binary_val = bytearray(struct.pack("f", value))
+    binary_val = bytearray(struct.pack("d", value))
     c_lreal.put(binary_val)
     if math.isnan(value):
         assert math.isnan(c_lreal.value)
@@ -402,3 +401,37 @@ def test_dt_array_wrong_len(value: bytes):
     c_array = CArray("some_name", CInt("_"), count=len(value) + 3)
     with pytest.raises(DataWrongLen):
         c_array.put(value)
+
+
+@given(st.lists(elements=st.floats(width=32, allow_nan=False), min_size=1))
+def test_dt_array_elements_put(value: list[float]):
+    c_array = CArray("some_name", CReal("_"), len(value))
+    for i, el in enumerate(value):
+        c_array.structure[i].put(struct.pack("<f", el))
+    assert c_array.value == value
+    assert [el.value for el in c_array.structure] == value
+
+
+@given(st.lists(elements=st.integers(min_value=-32768, max_value=32767), min_size=1))
+def test_dt_array_structure_is_lazy(value: list[int]):
+    c_array = CArray("some_name", CInt("_"), len(value))
+    c_array.put(b"".join(el.to_bytes(2, "little", signed=True) for el in value))
+    assert c_array._structure is None
+    assert c_array.value is c_array.value  # the list is built once per put
+    assert [el.value for el in c_array.structure] == value
+
+
+@given(st.lists(elements=st.text(alphabet=string.ascii_letters, max_size=5), min_size=1))
+def test_dt_array_string(value: list[str]):
+    binary_val = b"".join(el.encode().ljust(6, b"\x00") for el in value)
+    c_array = CArray("some_name", CString("_", 5), len(value))
+    c_array.put(binary_val)
+    assert c_array.value == value
+
+
+@given(st.lists(elements=st.integers(min_value=0, max_value=86399999), min_size=1))
+def test_dt_array_time(value: list[int]):
+    binary_val = b"".join(el.to_bytes(4, "little") for el in value)
+    c_array = CArray("some_name", CTime("_"), len(value))
+    c_array.put(binary_val)
+    assert c_array.value == [CTime("_").convert(el) for el in value]
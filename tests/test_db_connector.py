@@ -0,0 +1,114 @@
+import datetime
+import os
+
+import pytest
+from sqlalchemy import create_engine, MetaData, select, func
+
+from codesys.data_types import CInt, CReal, CBool, CString, CArray, CTypeDeclaration
+from db_connector import create_table, BatchWriter, CopyWriter, encode_copy_rows
+
+
+def create_writer(batch_size: int = 10, interval_ms: int = 1000) -> BatchWriter:
+    engine = create_engine("sqlite://")
+    declaration = CTypeDeclaration()
+    for c_type in (CInt("var_int"), CReal("var_real"), CBool("var_bool")):
+        declaration.append(c_type)
+    table = create_table(1, declaration, MetaData(bind=engine))
+    return BatchWriter(table, engine, batch_size, interval_ms)
+
+
+def create_row(i: int) -> dict:
+    return {"ts": datetime.datetime(2023, 1, 1) + datetime.timedelta(seconds=i),
+            "var_int": i, "var_real": i / 2, "var_bool": bool(i % 2)}
+
+
+def count_rows(writer: BatchWriter) -> int:
+    with writer.bind.connect() as connection:
+        return connection.execute(select(func.count()).select_from(writer.table)).scalar()
+
+
+def test_flush_on_size():
+    writer = create_writer(batch_size=10)
+    for i in range(25):
+        writer.add(create_row(i))
+    assert count_rows(writer) == 20
+    assert len(writer.rows) == 5
+    writer.close()
+    assert count_rows(writer) == 25
+    with writer.bind.connect() as connection:
+        rows = connection.execute(select(writer.table).order_by(writer.table.c.id)).all()
+    assert [(r.ts, r.var_int, r.var_real, r.var_bool) for r in rows] == \
+           [tuple(create_row(i).values()) for i in range(25)]
+
+
+def test_flush_on_time():
+    writer = create_writer(batch_size=1000, interval_ms=0)
+    writer.add(create_row(0))
+    assert count_rows(writer) == 1
+    writer = create_writer(batch_size=1000, interval_ms=60_000)
+    writer.add(create_row(0))
+    assert not writer.is_expired()
+    assert writer.is_expired(writer.first_row_ns + 60_000_000_000)
+    writer.close()
+
+
+def test_partition_column():
+    engine = create_engine("sqlite://")
+    declaration = CTypeDeclaration()
+    declaration.append(CInt("var_int"))
+    writer = BatchWriter(create_table(2, declaration, MetaData(bind=engine), partition=True), engine, 100)
+    for i in range(10):
+        writer.add({"ts": datetime.datetime(2023, 1, 1), "source": f"10.0.0.{i % 2}", "var_int": i})
+    writer.flush()
+    with engine.connect() as connection:
+        query = select(writer.table.c.var_int).where(writer.table.c.source == "10.0.0.1")
+        assert [row.var_int for row in connection.execute(query)] == [1, 3, 5, 7, 9]
+
+
+def test_encode_copy_rows():
+    rows = [
+        {"ts": datetime.datetime(2023, 1, 2, 3, 4, 5, 6), "b": True, "i": -5, "f": 0.1, "s": "a\tb\\c\nd",
+         "raw": b"\x01\xff", "d": datetime.date(2023, 1, 2), "t": datetime.time(1, 2, 3, 4000)},
+        {"ts": None, "b": False, "f": float("nan"), "s": "", "arr": [1.5, None, float("-inf")],
+         "arr_s": ['x"y', "z\\", None], "arr_b": [True, False]},
+    ]
+    columns = ["ts", "b", "i", "f", "s", "raw", "d", "t", "arr", "arr_s", "arr_b"]
+    assert encode_copy_rows(rows, columns) == (
+        "2023-01-02T03:04:05.000006\tt\t-5\t0.1\ta\\tb\\\\c\\nd\t\\\\x01ff\t2023-01-02\t01:02:03.004000"
+        "\t\\N\t\\N\t\\N\n"
+        "\\N\tf\t\\N\tNaN\t\t\\N\t\\N\t\\N\t{1.5,NULL,-Infinity}\t{\"x\\\\\"y\",\"z\\\\\\\\\",NULL}\t{t,f}\n"
+    )
+
+
+def test_copy_writer_falls_back_to_insert():
+    writer = create_writer()
+    copy_writer = CopyWriter(writer.table, writer.bind, batch_size=10)
+    assert not copy_writer.is_copy
+    assert copy_writer.columns == ["ts", "var_int", "var_real", "var_bool"]
+    for i in range(10):
+        copy_writer.add(create_row(i))
+    assert count_rows(copy_writer) == 10
+
+
+@pytest.mark.skipif(not os.environ.get("CNV_TEST_POSTGRES_URL"), reason="CNV_TEST_POSTGRES_URL is not set")
+def test_copy_writer_postgresql():
+    engine = create_engine(os.environ["CNV_TEST_POSTGRES_URL"])
+    declaration = CTypeDeclaration()
+    for c_type in (CInt("var_int"), CReal("var_real"), CBool("var_bool"), CString("var_str", 20),
+                   CArray("var_arr", CInt("_"), 3)):
+        declaration.append(c_type)
+    meta = MetaData(bind=engine)
+    table = create_table(999_013, declaration, meta)
+    try:
+        writer = CopyWriter(table, engine, batch_size=1000)
+        assert writer.is_copy
+        rows = [dict(create_row(i), var_str=f"s\t{i}\\", var_arr=[i, None, -i]) for i in range(100)]
+        for row in rows:
+            writer.add(row)
+        writer.close()
+        with engine.connect() as connection:
+            got = connection.execute(select(table).order_by(table.c.id)).all()
+        assert [(r.var_int, r.var_real, r.var_bool, r.var_str, r.var_arr) for r in got] == \
+               [(r["var_int"], r["var_real"], r["var_bool"], r["var_str"], r["var_arr"]) for r in rows]
+    finally:
+        meta.drop_all(tables=[table])
@@ -0,0 +1,68 @@
+from codesys.nvl_parser import NvlOptions
+from dispatch import Dispatcher, NvlTemplate
+from loadgen import NvlTraffic
+from network.parser import Rcv
+from network.server import QueueMessage
+
+
+def create_options(list_id: int) -> NvlOptions:
+    return NvlOptions(declarations=[{"name": "var_int", "type": ["INT"]}, {"name": "var_real", "type": ["REAL"]}],
+                      list_id=list_id, pack=True, checksum=False, acknowledge=False, ip_address="127.0.0.1", port=1202)
+
+
+def create_dispatcher(max_sources: int = 1000) -> Dispatcher:
+    return Dispatcher({1: NvlTemplate(create_options(1)),
+                       2: NvlTemplate(create_options(2), per_source=True, max_sources=max_sources)})
+
+
+def receive(dispatcher: Dispatcher, traffic: NvlTraffic, source: str) -> Rcv:
+    rcv = Rcv(traffic.next_frame()[0], (source, 1202))
+    route = dispatcher.route(rcv)
+    assert route.sequence_tracker.check(rcv.n_sends)
+    route.data_packer.put_data(rcv)
+    return rcv
+
+
+def test_fixed_list_is_shared():
+    dispatcher = create_dispatcher()
+    traffic = NvlTraffic(create_options(1))
+    rcv_1, rcv_2 = receive(dispatcher, traffic, "10.0.0.1"), receive(dispatcher, traffic, "10.0.0.2")
+    route_1, route_2 = dispatcher.route(rcv_1), dispatcher.route(rcv_2)
+    assert route_1.data_packer is route_2.data_packer
+    assert route_1.sequence_tracker is not route_2.sequence_tracker
+    assert "source" not in route_1.data_packer.get_row()
+
+
+def test_template_per_source():
+    dispatcher = create_dispatcher()
+    traffic = NvlTraffic(create_options(2))
+    sources = [f"10.0.{k // 256}.{k % 256}" for k in range(300)]
+    for source in sources:
+        receive(dispatcher, traffic, source)
+    data_packers = dispatcher.templates[2].data_packers
+    assert len(data_packers) == len(dispatcher.routes) == 300
+    for n, source in enumerate(sources):
+        row = data_packers[source].get_row()
+        assert row["source"] == source
+        assert row["var_int"] == n % len(traffic.variants)  # own state of every source
+
+
+def test_unknown_and_rejected():
+    dispatcher = create_dispatcher(max_sources=2)
+    dispatcher.unknown.value = dispatcher.rejected.value = 0
+    assert dispatcher.route(Rcv(NvlTraffic(create_options(3)).next_frame()[0], ("10.0.0.1", 1202))) is None
+    packet = NvlTraffic(create_options(2)).next_frame()[0]
+    assert all(dispatcher.route(Rcv(packet, (f"10.0.0.{k}", 1202))) for k in range(2))
+    assert dispatcher.route(Rcv(packet, ("10.0.0.9", 1202))) is None
+    assert (dispatcher.unknown.value, dispatcher.rejected.value) == (1, 1)
+    assert dispatcher.route(Rcv(packet, ("10.0.0.0", 1202))) is not None  # known sources keep their routes
+
+
+def test_malformed():
+    dispatcher = create_dispatcher()
+    dispatcher.malformed.value = 0
+    packet = NvlTraffic(create_options(1)).next_frame()[0]
+    for message in (b"junk", packet[:-1]):
+        dispatcher.process(QueueMessage(client=("10.0.0.1", 1202), message=message))
+    assert dispatcher.malformed.value == 2
+    assert dispatcher.routes == {}
@@ -0,0 +1,38 @@
+from network.drop_monitor import read_udp_stats, DropMonitor
+
+HEADER = "   sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode " \
+         "ref pointer drops\n"
+
+
+def write_proc(path, drops: tuple[int, int], rx_queue: int = 0x200) -> None:
+    path.write_text(
+        HEADER
+        + f"  1: 0100007F:04B2 00000000:0000 07 00000000:{rx_queue:08X} 00:00000000 00000000 0 0 1 2 0000 {drops[0]}\n"
+        + f"  2: 0200007F:04B2 00000000:0000 07 00000000:00000100 00:00000000 00000000 0 0 2 2 0000 {drops[1]}\n"
+        + "  3: 0100007F:04B3 00000000:0000 07 00000000:00000100 00:00000000 00000000 0 0 3 2 0000 100\n"
+    )
+
+
+def test_read_udp_stats(tmp_path):
+    path = tmp_path / "udp"
+    write_proc(path, (12, 3))
+    stats = read_udp_stats(1202, (str(path),))
+    assert (stats.drops, stats.rx_queue) == (15, 0x300)
+    assert read_udp_stats(1, (str(path),)).drops == 0
+    assert read_udp_stats(1202, (str(tmp_path / "missed"),)) is None
+
+
+def test_monitor(tmp_path):
+    path = tmp_path / "udp"
+    write_proc(path, (10, 0))
+    monitor = DropMonitor(1202, paths=(str(path),))
+    monitor.drops.value = monitor.max_rx_queue.value = 0
+    assert monitor.check() == 0  # drops before the start are not counted
+    write_proc(path, (15, 2), rx_queue=0x1000)
+    assert monitor.check() == 7
+    write_proc(path, (1, 0))  # the sockets were recreated
+    assert monitor.check() == 0
+    write_proc(path, (4, 0))
+    assert monitor.check() == 3
+    assert monitor.drops.value == 10
+    assert monitor.max_rx_queue.value == 0x1100
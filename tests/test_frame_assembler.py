@@ -0,0 +1,80 @@
+import datetime
+
+import pytest
+
+from hypothesis import given, strategies as st
+
+from codesys.data_types import CBool, CInt, CReal, CArray, CTypeDeclaration
+from codesys.frame_assembler import FrameAssembler, MAX_PENDING_FRAMES
+from utils.exeptions import DataWrongLen, PacketWrongNumber
+
+TS = datetime.datetime(2022, 11, 1)
+MS = 1_000_000
+
+
+def create_assembler(timeout_ms: int = 1000) -> FrameAssembler:
+    declaration = CTypeDeclaration()
+    for c_type in (CBool("flag"), CInt("integer"), CArray("array", CReal("_"), 3)):
+        declaration.append(c_type)
+    assembler = FrameAssembler(1, declaration, timeout_ms)
+    for counter in (assembler.completed, assembler.incomplete, assembler.expired, assembler.duplicates):
+        counter.value = 0
+    return assembler
+
+
+SLOTS = [b"\x00", b"\x00\x00", b"\x00\x00\x00\x00", b"\x00\x00\x80\x3f", b"\x00\x00\x00\x40"]
+
+
+@given(st.permutations(range(len(SLOTS))))
+def test_frame_complete_in_any_order(order: list[int]):
+    assembler = create_assembler()
+    results = [assembler.put(number, 7, SLOTS[number], 0, TS) for number in order]
+    assert results[:-1] == [None] * (len(SLOTS) - 1)
+    assert results[-1] == (b"".join(SLOTS), TS)  # zero and False values complete the frame too
+    assert assembler.completed.value == 1
+    assert not assembler.pending
+
+
+def test_frames_interleaved():
+    assembler = create_assembler()
+    for number in range(len(SLOTS) - 1):
+        assert assembler.put(number, 1, SLOTS[number], 0, TS) is None
+        assert assembler.put(number, 2, SLOTS[number], 0, TS) is None
+    assert assembler.put(len(SLOTS) - 1, 2, SLOTS[-1], 0, TS) is not None
+    assert assembler.put(len(SLOTS) - 1, 1, SLOTS[-1], 0, TS) is not None
+    assert assembler.completed.value == 2
+
+
+def test_duplicate_slot():
+    assembler = create_assembler()
+    assembler.put(0, 1, b"\x01", 0, TS)
+    assert assembler.put(0, 1, b"\x00", 0, TS) is None
+    assert assembler.duplicates.value == 1
+    for number in range(1, len(SLOTS)):
+        frame = assembler.put(number, 1, SLOTS[number], 0, TS)
+    assert frame[0][:1] == b"\x01"
+
+
+def test_frame_expired():
+    assembler = create_assembler(timeout_ms=100)
+    assembler.put(0, 1, SLOTS[0], 0, TS)
+    assembler.put(0, 2, SLOTS[0], 50 * MS, TS)
+    assembler.put(1, 2, SLOTS[1], 150 * MS, TS)
+    assert assembler.expired.value == 1
+    assert list(assembler.pending) == [2]
+
+
+def test_too_many_pending_frames():
+    assembler = create_assembler()
+    for n_sends in range(MAX_PENDING_FRAMES + 3):
+        assembler.put(0, n_sends, SLOTS[0], 0, TS)
+    assert assembler.incomplete.value == 3
+    assert len(assembler.pending) == MAX_PENDING_FRAMES
+
+
+def test_wrong_packet():
+    assembler = create_assembler()
+    with pytest.raises(PacketWrongNumber):
+        assembler.put(len(SLOTS), 1, b"\x00", 0, TS)
+    with pytest.raises(DataWrongLen):
+        assembler.put(1, 1, b"\x00", 0, TS)
@@ -0,0 +1,129 @@
+import datetime
+import string
+from typing import Callable
+
+import pytest
+
+from hypothesis import given, strategies as st
+
+from codesys.data_types import (
+    CBool,
+    CByte,
+    CWord,
+    CDWord,
+    CLWord,
+    CInt,
+    CUInt,
+    CDInt,
+    CLInt,
+    CUDInt,
+    CULInt,
+    CReal,
+    CLReal,
+    CTime,
+    CTimeOfDay,
+    CDate,
+    CDateAndTime,
+    CString,
+    CArray,
+    CType,
+    CTypeDeclaration,
+)
+from codesys.frame_decoder import FrameDecoder
+from utils.exeptions import DataWrongLen
+
+ELEMENTARY_TYPES: list[Callable[[str], CType]] = [
+    CBool, CByte, CWord, CDWord, CLWord, CInt, CUInt, CDInt, CLInt, CUDInt, CULInt, CReal, CLReal,
+    CTime, CTimeOfDay, CDate, CDateAndTime,
+]
+
+declaration_item = st.one_of(
+    st.tuples(st.sampled_from(ELEMENTARY_TYPES + [lambda name: CString(name, 5), lambda name: CString(name, 80)]),
+              st.none()),
+    st.tuples(st.sampled_from(ELEMENTARY_TYPES), st.integers(min_value=1, max_value=10)),
+)
+
+
+def build_declaration(items: list[tuple[Callable[[str], CType], int | None]]) -> CTypeDeclaration:
+    declaration = CTypeDeclaration()
+    for i, (c_type, count) in enumerate(items):
+        declaration.append(c_type(f"var_{i}") if count is None else CArray(f"var_{i}", c_type("_"), count))
+    return declaration
+
+
+def decode_legacy(declaration: CTypeDeclaration, data: bytes) -> list[str]:
+    start = 0
+    for c_type in declaration:
+        c_type.put(data[start: start + c_type.size])
+        start += c_type.size
+    return [repr(c_type.value) for c_type in declaration]
+
+
+def decode_compiled(declaration: CTypeDeclaration, data: bytes) -> list[str]:
+    FrameDecoder(declaration).decode(memoryview(data))
+    return [repr(c_type.value) for c_type in declaration]
+
+
+def decode_or_exception(decode: Callable[[CTypeDeclaration, bytes], list[str]],
+                        declaration: CTypeDeclaration, data: bytes) -> list[str] | type:
+    try:
+        return decode(declaration, data)
+    except Exception as ex:
+        return type(ex)
+
+
+def valid_bytes(c_type: CType) -> st.SearchStrategy[bytes]:
+    if isinstance(c_type, CArray):
+        return st.lists(valid_bytes(c_type.c_type), min_size=c_type.count, max_size=c_type.count).map(b"".join)
+    if isinstance(c_type, CTime):
+        return st.integers(min_value=0, max_value=86399999).map(lambda v: v.to_bytes(4, "little"))
+    if isinstance(c_type, CString):
+        return st.text(alphabet=string.ascii_letters, max_size=c_type.size - 1).map(
+            lambda v: v.encode().ljust(c_type.size, b"\x00"))
+    return st.binary(min_size=c_type.size, max_size=c_type.size)
+
+
+@given(st.lists(declaration_item, min_size=1, max_size=20), st.data())
+def test_frame_decoder_equal_legacy(items, data):
+    raw = b"".join(data.draw(valid_bytes(c_type)) for c_type in build_declaration(items))
+    legacy = decode_legacy(build_declaration(items), raw)
+    compiled = decode_compiled(build_declaration(items), raw)
+    assert compiled == legacy
+
+
+@given(st.lists(declaration_item, min_size=1, max_size=20), st.data())
+def test_frame_decoder_equal_legacy_any_bytes(items, data):
+    size = sum(c_type.size for c_type in build_declaration(items))
+    raw = data.draw(st.binary(min_size=size, max_size=size))
+    legacy = decode_or_exception(decode_legacy, build_declaration(items), raw)
+    compiled = decode_or_exception(decode_compiled, build_declaration(items), raw)
+    assert compiled == legacy
+
+
+@given(st.lists(declaration_item, min_size=1, max_size=20))
+def test_frame_decoder_size(items):
+    declaration = build_declaration(items)
+    assert FrameDecoder(declaration).size == sum(c_type.size for c_type in declaration)
+
+
+@given(st.lists(declaration_item, min_size=1, max_size=20), st.integers(min_value=1, max_value=10))
+def test_frame_decoder_wrong_len(items, extra):
+    declaration = build_declaration(items)
+    decoder = FrameDecoder(declaration)
+    with pytest.raises(DataWrongLen):
+        decoder.decode(bytes(decoder.size + extra))
+
+
+@given(st.lists(declaration_item, min_size=1, max_size=20), st.data())
+def test_frame_decoder_one_timestamp_per_frame(items, data):
+    declaration = build_declaration(items)
+    raw = b"".join(data.draw(valid_bytes(c_type)) for c_type in declaration)
+    ts = datetime.datetime(2022, 11, 1, 12, 0)
+    FrameDecoder(declaration).decode(raw, ts)
+    assert all(c_type.ts is ts for c_type in declaration)
+
+
+@pytest.mark.parametrize("c_type", ELEMENTARY_TYPES + [lambda name: CString(name, 5),
+                                                       lambda name: CArray(name, CInt("_"), 2)])
+def test_c_types_have_slots(c_type):
+    assert not hasattr(c_type("some_name"), "__dict__")
@@ -0,0 +1,72 @@
+import queue
+import struct
+
+import pytest
+from hypothesis import given, strategies as st
+
+from network.inbound_queue import create_inbound_queue, DropNewestQueue, DropOldestQueue, LatestPerListQueue
+from network.server import QueueMessage
+
+
+def create_message(list_id: int, number: int = 0, value: int = 0, ip: str = "127.0.0.1") -> QueueMessage:
+    header = struct.pack("<8sHHHHI", b"\x00-S3\x00\x00\x00\x00", list_id, number, 1, 4, value)
+    return QueueMessage((ip, 1202), header)
+
+
+def test_factory():
+    assert type(create_inbound_queue(10, "block")) is queue.Queue
+    assert isinstance(create_inbound_queue(10, "drop_newest"), DropNewestQueue)
+    assert isinstance(create_inbound_queue(10, "drop_oldest"), DropOldestQueue)
+    assert isinstance(create_inbound_queue(10, "latest_per_list"), LatestPerListQueue)
+
+
+@given(st.integers(min_value=1, max_value=20), st.integers(min_value=0, max_value=50))
+def test_drop_newest(size: int, count: int):
+    mq = DropNewestQueue(size)
+    mq.dropped.value = 0
+    for i in range(count):
+        mq.put(create_message(1, value=i))
+    assert mq.qsize() == min(size, count)
+    assert mq.dropped.value == max(0, count - size)
+    assert [struct.unpack_from("<I", mq.get().message, 16)[0] for _ in range(mq.qsize())] == \
+           list(range(min(size, count)))
+
+
+@given(st.integers(min_value=1, max_value=20), st.integers(min_value=0, max_value=50))
+def test_drop_oldest(size: int, count: int):
+    mq = DropOldestQueue(size)
+    mq.dropped.value = 0
+    for i in range(count):
+        mq.put(create_message(1, value=i))
+    assert mq.dropped.value == max(0, count - size)
+    assert [struct.unpack_from("<I", mq.get().message, 16)[0] for _ in range(mq.qsize())] == \
+           list(range(max(0, count - size), count))
+
+
+def test_latest_per_list():
+    mq = LatestPerListQueue(3)
+    mq.dropped.value = 0
+    for i in range(5):
+        mq.put(create_message(1, value=i))
+        mq.put(create_message(2, value=i))
+        mq.put(create_message(1, number=1, value=i))  # not packed list, other packet
+    mq.put(create_message(1, value=5, ip="127.0.0.2"))  # the same list of other sender, the oldest is dropped
+    assert mq.qsize() == 3
+    assert mq.dropped.value == 4 * 3 + 1
+    assert mq.unfinished_tasks == 3
+    got = [mq.get() for _ in range(3)]
+    assert [(m.client[0], struct.unpack_from("<HHxxxxI", m.message, 8)) for m in got] == \
+           [("127.0.0.1", (2, 0, 4)), ("127.0.0.1", (1, 1, 4)), ("127.0.0.2", (1, 0, 5))]
+    with pytest.raises(queue.Empty):
+        mq.get_nowait()
+
+
+@pytest.mark.parametrize("policy", ["drop_newest", "drop_oldest", "latest_per_list"])
+def test_put_never_blocks(policy):
+    mq = create_inbound_queue(1, policy)
+    for i in range(10):
+        mq.put(create_message(i), timeout=0.001)
+    assert mq.qsize() == 1
+    mq.get()
+    mq.task_done()
+    mq.join()
@@ -0,0 +1,137 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from codesys.data_types import CInt, CArray, CTime, CTypeDeclaration
+from codesys.frame_decoder import FrameDecoder
+from codesys.frame_index import FrameIndex
+from codesys.nvl_parser import NvlOptions
+from data_packer import DataPacker
+from last_values import LastValueCache, LastValueServer
+from loadgen import NvlTraffic
+from network.parser import Rcv
+from settings.settings import settings
+
+DECLARATIONS = [
+    {"name": "var_int", "type": ["INT"]},
+    {"name": "var_real", "type": ["LREAL"]},
+    {"name": "var_string", "type": ["STRING(10)"]},
+    {"name": "var_array", "type": ["ARRAY[0..2]", "DINT"]},
+    {"name": "var_times", "type": ["ARRAY[1..2]", "TIME"]},
+]
+
+
+def create_options(list_id: int) -> NvlOptions:
+    return NvlOptions(declarations=DECLARATIONS, list_id=list_id, pack=True, checksum=False, acknowledge=False,
+                      ip_address="127.0.0.1", port=1202)
+
+
+def test_get_via_name():
+    declaration = CTypeDeclaration([CInt("a")])
+    declaration.append(CArray("b", CTime("_"), 2))
+    declaration.append(CInt("a"))
+    assert declaration.get_via_name("a") is declaration[0]
+    assert declaration.get_via_name("b") is declaration[1]
+    assert declaration.get_via_name("c") is None
+    declaration.extend([CInt("c")])
+    declaration[0] = CInt("d")
+    declaration += [CInt("e")]
+    del declaration[1]
+    assert [declaration.get_via_name(name) for name in "abcde"] == \
+           [declaration[1], None, declaration[2], declaration[0], declaration[3]]
+    declaration.pop()
+    declaration.insert(0, CInt("e"))
+    declaration.remove(declaration[1])
+    assert [declaration.get_via_name(name) for name in "ade"] == [declaration[1], None, declaration[0]]
+
+
+def test_frame_index():
+    options = create_options(1)
+    declaration = DataPacker.generate_instance_datatype(options.declarations)
+    frame_index = FrameIndex(declaration)
+    assert frame_index.variables == [d["name"] for d in DECLARATIONS]
+    assert frame_index.find_prefix("var_times[") == ["var_times[0]", "var_times[1]"]
+    assert len(frame_index.find_prefix("")) == len(DECLARATIONS) + 3 + 2
+    frame = NvlTraffic(options).next_frame()[0][20:]
+    FrameDecoder(declaration).decode(frame)
+    for c_type in declaration.get_elementary_type_list() + list(declaration):
+        value = frame_index.unpack(frame, c_type.name)
+        assert (value.tolist() if hasattr(value, "tolist") else value) == c_type.value
+
+
+@pytest.fixture
+def cache_with_values(monkeypatch) -> tuple[LastValueCache, list[DataPacker]]:
+    cache = LastValueCache()
+    monkeypatch.setattr(settings.api, "port", 0)
+    monkeypatch.setattr("data_packer.last_values", cache)
+    data_packers = [DataPacker(create_options(1)),
+                    DataPacker(create_options(2), source="10.0.0.1"), DataPacker(create_options(2), source="10.0.0.2")]
+    for data_packer in data_packers:
+        traffic = NvlTraffic(data_packer.nvl)
+        for _ in range(int(data_packer.source[-1]) if data_packer.source else 1):
+            data_packer.put_data(Rcv(traffic.next_frame()[0], (data_packer.source or "10.0.0.9", 1202)))
+    return cache, data_packers
+
+
+def test_cache(cache_with_values):
+    cache, data_packers = cache_with_values
+    value = cache.get(1, ["var_array[1]"])[0]
+    assert value.value == data_packers[0].c_types_declarations.get_via_name("var_array").value[1]
+    assert value.ts == data_packers[0].frame_ts
+    assert cache.get(1, ["var_array[1]"])[0] is value  # the value is unpacked once per frame
+    assert cache.get(1, ["unknown"]) == []
+    assert [v.source for v in cache.get(2, ["var_int"])] == ["10.0.0.1", "10.0.0.2"]
+    assert [v.value for v in cache.get(2, ["var_int"], "10.0.0.2")] == [1]
+    assert [v.path for v in cache.find(2, "var_array", "10.0.0.1")] == \
+           ["var_array", "var_array[0]", "var_array[1]", "var_array[2]"]
+    assert len(cache.get_many([(1, "var_int"), (2, "var_real"), (3, "var_int")])) == 3
+
+
+def test_cache_does_not_block_decoding(cache_with_values):
+    cache, data_packers = cache_with_values
+    data_packer, traffic, stop = data_packers[0], NvlTraffic(data_packers[0].nvl), threading.Event()
+    frames: list[int] = []
+
+    def read() -> None:
+        while not stop.is_set():
+            values = cache.find(1)
+            frames.append(len({(v.ts, v.seq) for v in values}))
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(2000):
+            data_packer.put_data(Rcv(traffic.next_frame()[0], ("10.0.0.9", 1202)))
+    finally:
+        stop.set()
+        reader.join()
+    assert frames and set(frames) == {1}  # all values of a response are from one frame
+
+
+def get(server: LastValueServer, path: str) -> list | dict:
+    with urllib.request.urlopen(f"http://{server.address[0]}:{server.address[1]}{path}", timeout=5) as response:
+        assert response.headers["Content-Type"] == "application/json"
+        return json.loads(response.read())
+
+
+def test_server(cache_with_values):
+    cache, _ = cache_with_values
+    server = LastValueServer(cache, ("127.0.0.1", 0))
+    server.start()
+    try:
+        assert [v["value"] for v in get(server, "/values/2/var_int?source=10.0.0.2")] == [1]
+        assert len(get(server, "/values/1/var_times%5B0%5D")) == 1
+        assert len(get(server, "/values?key=1/var_int&key=1/var_real")) == 2
+        assert len(get(server, "/values?prefix=2/var_string")) == 2
+        assert len(get(server, "/values?prefix=1/")) == len(DECLARATIONS) + 5
+        assert {(v["list_id"], v["source"]) for v in get(server, "/lists")} == \
+               {(1, None), (2, "10.0.0.1"), (2, "10.0.0.2")}
+        for path, code in [("/values/1/unknown", 404), ("/values/x/var_int", 400), ("/other", 404)]:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                get(server, path)
+            assert error.value.code == code
+    finally:
+        server.stop()
@@ -0,0 +1,88 @@
+import datetime
+import queue
+import socket
+from pathlib import Path
+
+import pytest
+
+from archive import FrameArchive, ArchiveReader
+from codesys.frame_assembler import FrameAssembler
+from codesys.frame_decoder import FrameDecoder
+from codesys.nvl_parser import NvlParser
+from data_packer import DataPacker
+from loadgen import NvlTraffic, create_traffics, replay, generate
+from network.parser import Rcv
+from network.server import QueueMessage
+
+path_nvls_ok = sorted(Path("set_of_nvl_files_for_test").glob("*_ok_*.gvl"))
+
+
+def receive_all(sock: socket.socket) -> list[bytes]:
+    messages = []
+    sock.settimeout(0.5)
+    try:
+        while True:
+            messages.append(sock.recv(65536))
+    except socket.timeout:
+        pass
+    return messages
+
+
+@pytest.fixture
+def receiver():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        yield sock
+
+
+@pytest.mark.parametrize("pack", [True, False])
+@pytest.mark.parametrize("path", path_nvls_ok)
+def test_packets_are_decoded(path: Path, pack: bool):
+    options = NvlParser(path).parse(check=False).copy(update={"pack": pack})
+    traffic = NvlTraffic(options)
+    declaration = DataPacker.generate_instance_datatype(options.declarations)
+    decoder = FrameDecoder(declaration)
+    assembler = FrameAssembler(options.list_id, declaration, 1000)
+    for n_sends in range(3):
+        rcvs = [Rcv(packet, ("127.0.0.1", 1202)) for packet in traffic.next_frame()]
+        assert all(rcv.id_list == options.list_id and rcv.n_sends == n_sends for rcv in rcvs)
+        if options.pack:
+            assert len(rcvs) == 1
+            decoder.decode(rcvs[0].data_raw)
+        else:
+            frames = [assembler.put(r.n_package_in_list, r.n_sends, r.data_raw, 0, datetime.datetime.now())
+                      for r in rcvs]
+            assert frames[:-1] == [None] * (len(rcvs) - 1)
+            decoder.decode(frames[-1][0])
+        assert declaration[0].value is not None
+
+
+def test_lists():
+    traffics = create_traffics(path_nvls_ok[:2], 5)
+    assert len({t.list_id for t in traffics}) == 5
+    assert len(create_traffics(path_nvls_ok, 1)) == 1
+    with pytest.raises(ValueError):
+        create_traffics([], 5)
+
+
+def test_generate(receiver: socket.socket):
+    traffics = create_traffics(path_nvls_ok[:1], 2)
+    result = generate(traffics, receiver.getsockname(), rate=100, duration=0.1)
+    messages = receive_all(receiver)
+    assert len(messages) == result.packets > 0
+    assert {Rcv(m, ("127.0.0.1", 0)).id_list for m in messages} == {t.list_id for t in traffics}
+
+
+def test_replay(tmp_path: Path, receiver: socket.socket):
+    archive = FrameArchive(tmp_path)
+    traffic = create_traffics(path_nvls_ok[:1], 1)[0]
+    start = datetime.datetime.now()
+    sent = [traffic.next_frame()[0] for _ in range(20)]
+    for i, packet in enumerate(sent):
+        archive.append(QueueMessage(("10.0.0.1", 1202), packet, ts=start + datetime.timedelta(milliseconds=10 * i)))
+    archive.close()
+    reader = ArchiveReader(tmp_path)
+    result = replay(reader, receiver.getsockname(), speed=2)
+    reader.close()
+    assert 0.09 < result.elapsed < 1
+    assert receive_all(receiver) == sent
@@ -0,0 +1,76 @@
+import urllib.error
+import urllib.request
+
+import pytest
+from hypothesis import given, strategies as st
+
+from utils.metrics import MetricsRenderer, MetricsServer, HISTOGRAM_BOUNDS
+from utils.statistics import Statistics
+
+
+def parse(text: str) -> dict[str, float]:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_counters_with_labels():
+    statistics = Statistics()
+    statistics.counter("sequence/10.0.0.1/1/lost", "lost", "cnv_sequence_lost_total",
+                       {"source": "10.0.0.1", "list_id": 1}).value = 3
+    statistics.counter("sequence/10.0.0.2/1/lost", "lost", "cnv_sequence_lost_total",
+                       {"source": "10.0.0.2", "list_id": 1}).value = 5
+    statistics.counter("persistence/rows", "Persistence: rows").value = 7
+    text = MetricsRenderer(statistics).render()
+    samples = parse(text)
+    assert samples['cnv_sequence_lost_total{source="10.0.0.1",list_id="1"}'] == 3
+    assert samples['cnv_sequence_lost_total{source="10.0.0.2",list_id="1"}'] == 5
+    assert samples["cnv_persistence_rows_total"] == 7
+    assert text.count("# TYPE cnv_sequence_lost_total counter") == 1
+
+
+@given(st.lists(st.integers(min_value=0, max_value=20 * 10 ** 9), min_size=1, max_size=200))
+def test_histogram(values: list[int]):
+    statistics = Statistics()
+    duration = statistics.duration("decode/1", "decode", metric="cnv_decode_seconds", labels={"list_id": 1})
+    for value in values:
+        duration.add(value)
+    samples = parse(MetricsRenderer(statistics).render())
+    assert samples['cnv_decode_seconds_count{list_id="1"}'] == len(values)
+    assert samples['cnv_decode_seconds_bucket{list_id="1",le="+Inf"}'] == len(values)
+    previous = 0.0
+    for bound in HISTOGRAM_BOUNDS:
+        n = samples[f'cnv_decode_seconds_bucket{{list_id="1",le="{bound:g}"}}']
+        assert previous <= n
+        # a bucket of the histogram near the bound is counted in the next bound
+        assert sum(v < bound * 1e9 * 0.98 for v in values) <= n <= sum(v <= bound * 1e9 for v in values)
+        previous = n
+
+
+def test_gauges():
+    renderer = MetricsRenderer(Statistics())
+    renderer.add_gauge("cnv_queue_depth", "depth", lambda: 4)
+    renderer.add_gauge("cnv_none", "not available", lambda: None)
+    renderer.add_gauge("cnv_error", "error", lambda: 1 / 0)
+    samples = parse(renderer.render())
+    assert samples == {"cnv_queue_depth": 4}
+
+
+def test_server():
+    statistics = Statistics()
+    statistics.counter("persistence/rows", "rows").value = 1
+    server = MetricsServer(MetricsRenderer(statistics), ("127.0.0.1", 0))
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.address[1]}"
+        with urllib.request.urlopen(url + "/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert parse(response.read().decode())["cnv_persistence_rows_total"] == 1
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other", timeout=5)
+    finally:
+        server.stop()
+
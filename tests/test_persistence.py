@@ -0,0 +1,109 @@
+import datetime
+import struct
+import time
+from typing import Literal
+
+from codesys.data_types import CReal, CInt, CTypeDeclaration
+from codesys.frame_decoder import FrameDecoder
+from persistence import PersistenceWorker
+
+
+class SlowSink:
+    def __init__(self, delay: float) -> None:
+        self.name = f"sink_{id(self)}"
+        self.delay = delay
+        self.rows: list[dict] = []
+        self.closed = False
+
+    def add(self, row: dict) -> None:
+        time.sleep(self.delay)
+        self.rows.append(row)
+
+    def write(self, rows: list[dict]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def is_expired(self, now_ns: int | None = None) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FailingSink(SlowSink):
+    def add(self, row: dict) -> None:
+        raise ConnectionError("DB is not available")
+
+
+def create_worker(maxsize: int, queue_policy: Literal["block", "drop"] = "block") -> PersistenceWorker:
+    worker = PersistenceWorker(maxsize, idle_timeout=0.01, queue_policy=queue_policy)
+    for counter in (worker.rows, worker.dropped, worker.errors, worker.max_depth):
+        counter.value = 0
+    return worker
+
+
+def decode_frames(worker: PersistenceWorker, sink: SlowSink, n_frames: int) -> float:
+    """
+    the decoding loop of DataPacker: decode the frame and hand the row to persistence
+    """
+    declaration = CTypeDeclaration()
+    for i in range(50):
+        declaration.append(CReal(f"real_{i}") if i % 2 else CInt(f"int_{i}"))
+    decoder = FrameDecoder(declaration)
+    data = struct.pack("<" + "hf" * 25, *(v for i in range(25) for v in (i, i / 2)))
+    start = time.perf_counter()
+    for _ in range(n_frames):
+        decoder.decode(data, datetime.datetime.now())
+        worker.put(sink, {c_type.name: c_type.value for c_type in declaration})
+    return time.perf_counter() - start
+
+
+def test_rows_are_written_in_order():
+    worker = create_worker(100)
+    sink = SlowSink(0)
+    worker.start()
+    for i in range(50):
+        worker.put(sink, {"i": i})
+    worker.stop(timeout=5)
+    assert not worker.thread.is_alive()
+    assert [row["i"] for row in sink.rows] == list(range(50))
+    assert sink.closed
+    assert worker.rows.value == 50
+    assert worker.dropped.value == 0
+
+
+def test_slow_sink_does_not_block_decoding():
+    n_frames = 2000
+    slow_worker, slow_sink = create_worker(100, "drop"), SlowSink(0.01)  # 100 rows/s DB
+    slow_worker.start()
+    slow = decode_frames(slow_worker, slow_sink, n_frames)
+    assert slow < n_frames * slow_sink.delay / 10  # never waits for the sink
+    assert slow_worker.dropped.value > 0
+    assert slow_worker.max_depth.value == 100
+    slow_worker.stop(timeout=5)
+    assert len(slow_sink.rows) + slow_worker.dropped.value == n_frames
+
+
+def test_slow_sink_blocks_decoding():
+    worker, sink = create_worker(10), SlowSink(0.001)
+    worker.start()
+    decode_frames(worker, sink, 200)
+    worker.stop(timeout=5)
+    assert len(sink.rows) == 200  # a slow DB is not a reason to lose rows
+    assert worker.dropped.value == 0
+    assert worker.max_depth.value == 10
+
+
+def test_sink_error_does_not_stop_worker():
+    worker = create_worker(10)
+    failing, sink = FailingSink(0), SlowSink(0)
+    worker.start()
+    worker.put(failing, {"i": 0})
+    worker.put(sink, {"i": 1})
+    worker.stop(timeout=5)
+    assert worker.errors.value == 1
+    assert sink.rows == [{"i": 1}]
+    assert failing.closed and sink.closed
@@ -0,0 +1,42 @@
+import pytest
+
+from hypothesis import given, strategies as st
+
+from network.parser import Rcv, HEADER
+from utils.exeptions import PacketWrongLen
+
+CLIENT = ("127.0.0.1", 1202)
+u16 = st.integers(min_value=0, max_value=0xFFFF)
+
+
+def build_message(constant: bytes, id_list: int, n_package: int, count_var: int, n_sends: int, data: bytes) -> bytes:
+    return HEADER.pack(constant, id_list, n_package, count_var, HEADER.size + len(data), n_sends) + data
+
+
+@given(st.binary(min_size=8, max_size=8), u16, u16, u16, st.integers(min_value=0, max_value=0xFFFFFFFF),
+       st.binary(max_size=1000))
+def test_rcv(constant: bytes, id_list: int, n_package: int, count_var: int, n_sends: int, data: bytes):
+    message = build_message(constant, id_list, n_package, count_var, n_sends, data)
+    rcv = Rcv(message, CLIENT)
+    assert rcv.client_address == CLIENT
+    assert rcv._constant == constant
+    assert rcv.id_list == id_list
+    assert rcv.n_package_in_list == n_package
+    assert rcv.count_variable_in_packet == count_var
+    assert rcv.count_bytes == len(message)
+    assert rcv.n_sends == n_sends
+    assert isinstance(rcv.data_raw, memoryview)
+    assert rcv.data_raw == data
+
+
+@given(st.binary(max_size=HEADER.size - 1))
+def test_rcv_too_short(message: bytes):
+    with pytest.raises(PacketWrongLen):
+        Rcv(message, CLIENT)
+
+
+@given(st.binary(max_size=100), st.integers(min_value=1, max_value=100))
+def test_rcv_wrong_len(data: bytes, extra: int):
+    message = build_message(b"\x00" * 8, 1, 0, 1, 0, data)
+    with pytest.raises(PacketWrongLen):
+        Rcv(message + b"\x00" * extra, CLIENT)
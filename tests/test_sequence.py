@@ -0,0 +1,73 @@
+from hypothesis import given, strategies as st
+
+from network.sequence import SequenceTracker, N_SENDS_MODULO, MAX_REORDER_DISTANCE
+
+n_sends = st.integers(min_value=0, max_value=N_SENDS_MODULO - 1)
+
+
+def create_tracker(pack: bool = True, drop: bool = False) -> SequenceTracker:
+    tracker = SequenceTracker("test", 1, pack=pack, drop_out_of_order=drop)
+    for counter in (tracker.lost, tracker.duplicated, tracker.reordered, tracker.wraparound, tracker.restarts,
+                    tracker.dropped):
+        counter.value = 0
+    return tracker
+
+
+@given(n_sends, st.integers(min_value=1, max_value=1000))
+def test_in_order(start: int, count: int):
+    tracker = create_tracker()
+    assert all(tracker.check((start + i) % N_SENDS_MODULO) for i in range(count))
+    assert tracker.lost.value == tracker.duplicated.value == tracker.reordered.value == 0
+    assert tracker.wraparound.value == (1 if start + count > N_SENDS_MODULO else 0)
+
+
+@given(n_sends, st.integers(min_value=1, max_value=1000))
+def test_gap(start: int, gap: int):
+    tracker = create_tracker()
+    tracker.check(start)
+    tracker.check((start + gap + 1) % N_SENDS_MODULO)
+    assert tracker.lost.value == gap
+
+
+@given(n_sends)
+def test_duplicate(start: int):
+    tracker = create_tracker(drop=True)
+    assert tracker.check(start)
+    assert not tracker.check(start)
+    assert tracker.duplicated.value == 1
+    assert tracker.dropped.value == 1
+
+
+@given(n_sends)
+def test_unpacked_frame_is_not_duplicate(start: int):
+    tracker = create_tracker(pack=False, drop=True)
+    assert tracker.check(start)
+    assert tracker.check(start)
+    assert tracker.duplicated.value == 0
+
+
+@given(n_sends, st.integers(min_value=1, max_value=MAX_REORDER_DISTANCE))
+def test_reordered(start: int, distance: int):
+    tracker = create_tracker(drop=True)
+    tracker.check(start)
+    assert not tracker.check((start - distance) % N_SENDS_MODULO)
+    assert tracker.reordered.value == 1
+    assert tracker.check((start + 1) % N_SENDS_MODULO)
+
+
+def test_restart_of_sender():
+    tracker = create_tracker(drop=True)
+    tracker.check(100_000)
+    assert tracker.check(0)
+    assert tracker.restarts.value == 1
+    assert tracker.check(1)
+    assert tracker.lost.value == 0
+
+
+def test_counters_in_table():
+    from utils.statistics import Statistics
+    statistics = Statistics()
+    statistics.counter("a", "192.168.56.1 list 1: lost packets").value += 5
+    statistics.put_duration_storage("f", "function", 1.0, total=True)
+    table = statistics.print_stat_in_table()
+    assert "192.168.56.1 list 1: lost packets |          5" in table
@@ -0,0 +1,90 @@
+import queue
+import socket
+import sys
+
+import pytest
+
+import network.server
+from network.server import (
+    get_udp_thread_server,
+    get_udp_asyncio_server,
+    set_receive_buffer,
+    BatchUdpReceiver,
+    QueueMessage,
+    _RecvMmsgReader,
+    _RecvMsgIntoReader,
+)
+
+
+def get_free_address() -> tuple[str, int]:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()
+
+
+@pytest.mark.parametrize("get_server", [get_udp_thread_server, get_udp_asyncio_server, BatchUdpReceiver])
+def test_server_put_datagrams_in_queue(get_server):
+    address = get_free_address()
+    mq: queue.Queue = queue.Queue(100)
+    get_server(mq, address).start()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        for i in range(10):
+            # the loop may still be binding when the first datagrams are sent
+            sock.sendto(b"ping", address)
+            try:
+                message = mq.get(timeout=0.2)
+                break
+            except queue.Empty:
+                pass
+        else:
+            pytest.fail("Server didn't receive a datagram")
+        assert isinstance(message, QueueMessage)
+        assert message.message == b"ping"
+        assert message.client == sock.getsockname()
+
+
+@pytest.mark.parametrize("use_recvmmsg", [True, False])
+def test_batch_receiver_reads_burst(monkeypatch, use_recvmmsg):
+    if use_recvmmsg and network.server._recvmmsg is None:
+        pytest.skip("recvmmsg is not available")
+    if not use_recvmmsg:
+        monkeypatch.setattr(network.server, "_recvmmsg", None)
+    address = get_free_address()
+    mq: queue.Queue = queue.Queue()
+    BatchUdpReceiver(mq, address, workers=2, batch_size=8).start()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for i in range(100):
+            sock.sendto(i.to_bytes(2, "little"), address)
+        received = sorted(int.from_bytes(mq.get(timeout=1).message, "little") for _ in range(100))
+    assert received == list(range(100))
+
+
+def test_set_receive_buffer():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        default = set_receive_buffer(sock, 0)
+        assert set_receive_buffer(sock, 1 << 16, force=False) >= 1 << 16  # doubled by the kernel
+        assert set_receive_buffer(sock, 1 << 16, force=True) >= 1 << 16  # falls back without CAP_NET_ADMIN
+        assert default > 0
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="SO_RXQ_OVFL is Linux only")
+@pytest.mark.parametrize("reader_class", [_RecvMmsgReader, _RecvMsgIntoReader])
+def test_rxq_overflow(reader_class):
+    if reader_class is _RecvMmsgReader and network.server._recvmmsg is None:
+        pytest.skip("recvmmsg is not available")
+    receiver = BatchUdpReceiver(queue.Queue(), get_free_address(), workers=1, batch_size=64)
+    sock = receiver.create_socket()
+    set_receive_buffer(sock, 4096, force=False)  # a few datagrams, the rest is dropped by the kernel
+    reader = reader_class(sock, receiver.batch_size, receiver.buffer_size)
+    reader.overflow.dropped.value = 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        for i in range(200):
+            sender.sendto(bytes(1000), receiver.address)
+    received = len(reader.read())
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        sender.sendto(b"last", receiver.address)  # carries the count of drops
+    messages = reader.read()
+    sock.close()
+    assert messages[-1].message == b"last"
+    assert 0 < reader.overflow.dropped.value == 200 - received - len(messages) + 1
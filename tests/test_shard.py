@@ -0,0 +1,95 @@
+import datetime
+import time
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from pydantic import ValidationError
+
+from codesys.nvl_parser import NvlOptions
+from loadgen import NvlTraffic
+from network.server import QueueMessage
+from settings.settings import NVL
+from shard import SpscRing, ShardPool, RECORD
+
+
+def create_message(i: int, size: int) -> QueueMessage:
+    return QueueMessage(client=(f"10.0.0.{i % 256}", 1202 + i % 7), message=bytes([i % 256]) * size,
+                        ts_ns=i, ts=datetime.datetime(2023, 1, 1) + datetime.timedelta(microseconds=i))
+
+
+def test_ring_round_trip():
+    ring = SpscRing(size=4096)
+    reader = SpscRing(ring.name)
+    try:
+        sent = [create_message(i, 100 + i) for i in range(10)]
+        assert all(ring.write(message) for message in sent)
+        assert reader.read(100) == sent
+        assert reader.read(100) == []
+        assert ring.backlog() == 0
+    finally:
+        reader.close()
+        ring.close(unlink=True)
+
+
+def test_ring_mb_is_power_of_2():
+    assert NVL(ring_mb=8).ring_mb == 8
+    with pytest.raises(ValidationError):
+        NVL(ring_mb=10)
+
+
+def test_ring_full():
+    ring = SpscRing(size=1024)
+    reader = SpscRing(ring.name)
+    try:
+        written = 0
+        while ring.write(create_message(written, 100)):
+            written += 1
+        assert written == 1024 // ((RECORD.size + 100 + 7) & ~7)
+        assert len(reader.read(2)) == 2
+        assert ring.write(create_message(written, 100))  # the space is released, the record wraps
+        assert len(reader.read(100)) == written - 1
+    finally:
+        reader.close()
+        ring.close(unlink=True)
+
+
+@settings(max_examples=50)
+@given(st.lists(st.tuples(st.integers(min_value=0, max_value=600), st.integers(min_value=0, max_value=5)),
+                min_size=1, max_size=200))
+def test_ring_fifo(steps: list[tuple[int, int]]):
+    ring = SpscRing(size=2048)
+    reader = SpscRing(ring.name)
+    try:
+        sent, received = [], []
+        for i, (size, n_read) in enumerate(steps):
+            message = create_message(i, size)
+            if ring.write(message):
+                sent.append(message)
+            received += reader.read(n_read)
+        received += reader.read(len(steps))
+        assert received == sent
+    finally:
+        reader.close()
+        ring.close(unlink=True)
+
+
+def test_pool():
+    options = NvlOptions(declarations=[{"name": "var_int", "type": ["INT"]}], list_id=1, pack=True, checksum=False,
+                         acknowledge=False, ip_address="127.0.0.1", port=1202)
+    pool = ShardPool([(options, True)], processes=2, ring_bytes=1 << 16)
+    pool.start()
+    try:
+        traffic = NvlTraffic(options)
+        for n in range(10):
+            packet = traffic.next_frame()[0]
+            for k in range(20):
+                pool.process(QueueMessage(client=(f"10.0.0.{k}", 1202), message=packet))
+        deadline = time.monotonic() + 30
+        while pool.processed() < 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.processed() == 200
+        assert pool.n_keys == [10, 10]
+        assert {pool.shards[(f"10.0.0.{k}", b"\x01\x00")].name for k in range(20)} == {r.name for r in pool.rings}
+    finally:
+        pool.stop()
+    assert all(process.exitcode == 0 for process in pool.processes)
@@ -0,0 +1,93 @@
+import array
+import struct
+import threading
+
+import pytest
+
+from codesys.nvl_parser import NvlOptions
+from data_packer import DataPacker
+from loadgen import NvlTraffic
+from network.parser import Rcv
+from settings.settings import settings
+from snapshot import SnapshotReader, SnapshotWriter, snapshot_name
+from utils.exeptions import DataWrongLen
+
+DECLARATIONS = [
+    {"name": "var_bool", "type": ["BOOL"]},
+    {"name": "var_int", "type": ["INT"]},
+    {"name": "var_real", "type": ["LREAL"]},
+    {"name": "var_time", "type": ["TIME"]},
+    {"name": "var_string", "type": ["STRING(10)"]},
+    {"name": "var_array", "type": ["ARRAY[0..2]", "DINT"]},
+    {"name": "var_times", "type": ["ARRAY[1..2]", "TIME"]},
+]
+
+
+def create_options(list_id: int, declarations: list | None = None) -> NvlOptions:
+    return NvlOptions(declarations=declarations or DECLARATIONS, list_id=list_id, pack=True, checksum=False,
+                      acknowledge=False, ip_address="127.0.0.1", port=1202)
+
+
+@pytest.fixture
+def snapshot_enabled(monkeypatch):
+    monkeypatch.setattr(settings.nvl, "snapshot", True)
+
+
+def test_snapshot_of_data_packer(snapshot_enabled):
+    options = create_options(901)
+    data_packer = DataPacker(options, source="10.0.0.1")
+    reader = SnapshotReader(options, source="10.0.0.1")
+    try:
+        assert reader.version == 0
+        assert reader.get("var_int") is None
+        assert set(reader.read()) == {declaration["name"] for declaration in DECLARATIONS}
+        traffic = NvlTraffic(options)
+        for _ in range(3):
+            data_packer.put_data(Rcv(traffic.next_frame()[0], ("10.0.0.1", 1202)))
+            values = reader.read()
+            for c_type in data_packer.c_types_declarations:
+                value = reader.get(c_type.name)
+                assert value == values[c_type.name]
+                assert (list(value) if isinstance(value, array.array) else value) == c_type.value
+        assert reader.version == 6
+        assert reader.ts_ns > 0
+    finally:
+        reader.close()
+        data_packer.close()
+
+
+def test_snapshot_layout_mismatch(snapshot_enabled):
+    data_packer = DataPacker(create_options(902))
+    try:
+        with pytest.raises(DataWrongLen):
+            SnapshotReader(create_options(902, [{"name": "var_int", "type": ["INT"]}]))
+    finally:
+        data_packer.close()
+
+
+def test_snapshot_is_consistent():
+    """
+    every frame has two equal values, the reader never sees values of different frames
+    """
+    options = create_options(903, [{"name": "a", "type": ["ULINT"]}, {"name": "b", "type": ["ULINT"]}])
+    writer = SnapshotWriter(snapshot_name(903), 16)
+    reader = SnapshotReader(options)
+    stop = threading.Event()
+
+    def publish() -> None:
+        i = 0
+        while not stop.is_set():
+            i += 1
+            writer.publish(struct.pack("<QQ", i, i))
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+    try:
+        for _ in range(20_000):
+            values = reader.read()
+            assert values["a"] == values["b"]
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+        writer.close()
@@ -0,0 +1,125 @@
+import time
+from pathlib import Path
+
+from hypothesis import given, settings as h_settings, strategies as st, HealthCheck
+
+import persistence
+from persistence import PersistenceWorker
+from settings.settings import settings
+from spill import SpillBuffer
+from utils.exeptions import RowsNotWritten
+
+
+def create_spill(directory: Path, max_bytes: int = 1 << 20, segment_bytes: int = 1024) -> SpillBuffer:
+    return SpillBuffer(directory, max_bytes, segment_bytes)
+
+
+def drain_all(spill: SpillBuffer) -> list[tuple[str, list[dict]]]:
+    batches = []
+    while (batch := spill.peek()) is not None:
+        batches.append(batch)
+        spill.pop()
+    return batches
+
+
+@h_settings(suppress_health_check=[HealthCheck.function_scoped_fixture], deadline=None, max_examples=20)
+@given(st.lists(st.lists(st.integers(), min_size=1, max_size=50), max_size=30))
+def test_fifo(tmp_path: Path, batches: list[list[int]]):
+    spill = create_spill(tmp_path / str(time.monotonic_ns()))
+    for i, values in enumerate(batches):
+        spill.append(f"nvl_{i % 3}", [{"value": v} for v in values])
+    assert drain_all(spill) == [(f"nvl_{i % 3}", [{"value": v} for v in values]) for i, values in enumerate(batches)]
+    assert len(spill) == 0
+    assert spill.segments == []
+
+
+def test_restart(tmp_path: Path):
+    spill = create_spill(tmp_path)
+    for i in range(10):
+        spill.append("nvl_1", [{"i": i}])
+    spill.peek()
+    spill.pop()
+    spill.close()
+    spill = create_spill(tmp_path)
+    assert [rows[0]["i"] for _, rows in drain_all(spill)] == list(range(1, 10))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_eviction(tmp_path: Path):
+    spill = create_spill(tmp_path, max_bytes=4096, segment_bytes=1024)
+    spill.evicted.value = 0
+    for i in range(200):
+        spill.append("nvl_1", [{"i": i}])
+    assert spill.size <= 4096 + 1024
+    assert spill.evicted.value > 0
+    values = [rows[0]["i"] for _, rows in drain_all(spill)]
+    assert values == list(range(200 - len(values), 200))  # the oldest are evicted
+
+
+def test_broken_tail(tmp_path: Path):
+    spill = create_spill(tmp_path)
+    for i in range(3):
+        spill.append("nvl_1", [{"i": i}])
+    spill.close()
+    segment = spill.segments[-1]
+    segment.write_bytes(segment.read_bytes()[:-3])  # crash during the last write
+    spill = create_spill(tmp_path)
+    assert [rows[0]["i"] for _, rows in drain_all(spill)] == [0, 1]
+
+
+class FlakySink:
+    def __init__(self) -> None:
+        self.name = "nvl_1"
+        self.is_down = False
+        self.rows: list[dict] = []
+
+    def add(self, row: dict) -> None:
+        self.write([row])
+
+    def write(self, rows: list[dict]) -> None:
+        if self.is_down:
+            raise RowsNotWritten("DB is not available", rows)
+        self.rows.extend(rows)
+
+    def is_expired(self, now_ns: int | None = None) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def test_worker_spills_and_drains(tmp_path: Path):
+    sink = FlakySink()
+    worker = PersistenceWorker(1000, idle_timeout=0.01, spill=create_spill(tmp_path), retry_ms=50,
+                               spill_batch_size=10)
+    worker.register(sink)
+    worker.start()
+    for i in range(100):
+        if i == 20:
+            sink.is_down = True
+        if i == 60:
+            worker.mq.join()
+            sink.is_down = False
+        worker.put(sink, {"i": i})
+    deadline = time.monotonic() + 5
+    while (len(worker.spill) or len(sink.rows) < 100) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    worker.stop(timeout=5)
+    assert sorted(row["i"] for row in sink.rows) == list(range(100))
+    assert worker.drained.value > 0
+    assert worker.lost.value == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_of_shards(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(settings.storage, "spill_path", tmp_path)
+    spills = [persistence.create_spill(i) for i in range(2)]
+    for i, spill in enumerate(spills):
+        spill.append("sink", [{"shard": i}])
+    assert [drain_all(spill) for spill in spills] == [[("sink", [{"shard": 0}])], [("sink", [{"shard": 1}])]]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["shard-0", "shard-1"]
+    for spill in spills:
+        spill.close()
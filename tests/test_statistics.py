@@ -0,0 +1,51 @@
+import math
+
+from hypothesis import given, strategies as st
+
+from utils.statistics import Statistics, Duration, PERCENTILES, _bucket_index, _bucket_value, SUB_BUCKET_BITS
+
+durations_ns = st.integers(min_value=0, max_value=10 ** 12)
+
+
+@given(durations_ns)
+def test_bucket(value: int):
+    index = _bucket_index(value)
+    assert abs(_bucket_value(index) - value) <= value * 2 ** -(SUB_BUCKET_BITS - 1)
+    assert _bucket_index(value + 1) >= index
+
+
+@given(st.lists(durations_ns, min_size=1, max_size=500))
+def test_percentiles(values: list[int]):
+    duration = Duration("f", "function")
+    for value in values:
+        duration.add(value)
+    ordered = sorted(values)
+    assert duration.count == len(values)
+    assert duration.min_ns == ordered[0] and duration.max_ns == ordered[-1]
+    assert math.isclose(duration.average_duration, sum(values) / len(values) / 1e9)
+    for percent in PERCENTILES:
+        exact = ordered[max(1, round(len(values) * percent / 100)) - 1]
+        assert abs(duration.percentile(percent) * 1e9 - exact) <= exact * 2 ** -(SUB_BUCKET_BITS - 1) + 1
+
+
+def test_timer_registered_once():
+    statistics = Statistics()
+
+    @statistics.timer("Time of f")
+    def f(x: int) -> int:
+        return x + 1
+
+    assert len(statistics.durations) == 1
+    duration = next(iter(statistics.durations.values()))
+    assert [f(i) for i in range(100)] == list(range(1, 101))
+    assert len(statistics.durations) == 1
+    assert duration.count == 100 and duration.description == "Time of f"
+    assert duration.rate > 0
+
+
+def test_table():
+    statistics = Statistics()
+    statistics.timer(total=True)(lambda: None)()
+    statistics.timer("Time of data processing")(lambda: None)()
+    table = statistics.print_stat_in_table()
+    assert "P99.9" in table and "Time of data processing" in table and "Total runtime:" in table
@@ -0,0 +1,118 @@
+import datetime
+import string
+from typing import Any, Callable
+
+import pytest
+
+from hypothesis import given, strategies as st
+
+np = pytest.importorskip("numpy")
+
+from codesys.data_types import (  # noqa: E402
+    CBool,
+    CByte,
+    CWord,
+    CDWord,
+    CLWord,
+    CInt,
+    CUInt,
+    CDInt,
+    CLInt,
+    CUDInt,
+    CULInt,
+    CReal,
+    CLReal,
+    CTime,
+    CTimeOfDay,
+    CDate,
+    CDateAndTime,
+    CString,
+    CArray,
+    CType,
+    CTypeDeclaration,
+)
+from codesys.frame_decoder import FrameDecoder  # noqa: E402
+from codesys.vector_decoder import VectorDecoder  # noqa: E402
+from utils.exeptions import DataWrongLen, OutOfRange  # noqa: E402
+
+ELEMENTARY_TYPES: list[Callable[[str], CType]] = [
+    CBool, CByte, CWord, CDWord, CLWord, CInt, CUInt, CDInt, CLInt, CUDInt, CULInt, CReal, CLReal,
+    CTime, CTimeOfDay, CDate, CDateAndTime,
+]
+
+declaration_item = st.one_of(
+    st.tuples(st.sampled_from(ELEMENTARY_TYPES + [lambda name: CString(name, 5), lambda name: CString(name, 80)]),
+              st.none()),
+    st.tuples(st.sampled_from(ELEMENTARY_TYPES + [lambda name: CString(name, 5)]),
+              st.integers(min_value=1, max_value=10)),
+)
+
+
+def build_declaration(items: list[tuple[Callable[[str], CType], int | None]]) -> CTypeDeclaration:
+    declaration = CTypeDeclaration()
+    for i, (c_type, count) in enumerate(items):
+        declaration.append(c_type(f"var_{i}") if count is None else CArray(f"var_{i}", c_type("_"), count))
+    return declaration
+
+
+def valid_bytes(c_type: CType) -> st.SearchStrategy[bytes]:
+    if isinstance(c_type, CArray):
+        return st.lists(valid_bytes(c_type.c_type), min_size=c_type.count, max_size=c_type.count).map(b"".join)
+    if isinstance(c_type, CTime):
+        return st.integers(min_value=0, max_value=86399999).map(lambda v: v.to_bytes(4, "little"))
+    if isinstance(c_type, CString):
+        return st.one_of(
+            st.text(alphabet=string.ascii_letters, max_size=c_type.size - 1).map(
+                lambda v: v.encode().ljust(c_type.size, b"\x00")),
+            st.text(alphabet=string.ascii_letters, min_size=c_type.size, max_size=c_type.size).map(str.encode),
+        )
+    return st.binary(min_size=c_type.size, max_size=c_type.size)
+
+
+def to_python(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return [to_python(v) for v in value]
+    if isinstance(value, np.timedelta64):
+        return (datetime.datetime.min + datetime.timedelta(milliseconds=int(value.astype("int64")))).time()
+    if isinstance(value, np.void):
+        return value.tobytes()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+@given(st.lists(declaration_item, min_size=1, max_size=20), st.integers(min_value=1, max_value=5), st.data())
+def test_vector_decoder_equal_frame_decoder(items, n_frames, data):
+    declaration = build_declaration(items)
+    frames = [b"".join(data.draw(valid_bytes(c_type)) for c_type in declaration) for _ in range(n_frames)]
+    columns = VectorDecoder(declaration).decode(b"".join(frames))
+    decoder = FrameDecoder(declaration)
+    for i, frame in enumerate(frames):
+        decoder.decode(frame)
+        for c_type in declaration:
+            assert repr(to_python(columns[c_type.name][i])) == repr(c_type.value)
+
+
+def test_vector_decoder_with_header():
+    declaration = build_declaration([(CInt, None), (CReal, 2)])
+    header = b"h" * 20
+    frames = header + b"\x01\x00" + bytes(8) + header + b"\xff\xff" + bytes(8)
+    columns = VectorDecoder(declaration, header_size=len(header)).decode(frames)
+    assert columns["var_0"].tolist() == [1, -1]
+    assert columns["var_1"].shape == (2, 2)
+
+
+def test_vector_decoder_wrong_len():
+    decoder = VectorDecoder(build_declaration([(CInt, None)]))
+    with pytest.raises(DataWrongLen):
+        decoder.decode(bytes(3))
+
+
+def test_vector_decoder_tod_out_of_range():
+    decoder = VectorDecoder(build_declaration([(CTimeOfDay, None)]))
+    with pytest.raises(OutOfRange):
+        decoder.decode((86400000).to_bytes(4, "little"))
+
+
+def test_vector_decoder_array_of_string():
+    decoder = VectorDecoder(build_declaration([(lambda name: CString(name, 4), 2)]))
+    columns = decoder.decode(b"ab\x00\x00\x00cd\x00\x00\x00" + b"abcdefgh\x00\x00")
+    assert columns["var_0"].tolist() == [["ab", "cd"], ["abcd", "fgh"]]